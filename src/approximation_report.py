@@ -0,0 +1,73 @@
+import contextlib
+import io
+import os
+import timeit
+from argparse import ArgumentParser
+
+import numpy
+
+import formula_2
+from scheduler import APPROXIMATE, BACKENDS, FORMULATIONS, read_instance, from_rows, write_table
+from solve_many import get_tasks
+
+# Quality against time of the approximation mode (formula_2.solve_approximate): every instance is solved with every
+# epsilon, and the total time is compared with the optimum in the file (the real ratio) and with the bound the mode
+# proved (the guaranteed ratio). Writes one row per instance and epsilon to approximation_results.csv (or
+# .npz/.parquet, see scheduler/results.py) and prints per epsilon how many schedules were proven within it, the mean
+# and worst ratios and the time.
+
+EXPERIMENT_PATHS = ["../experiment_instances", "../experiment_instances_2"]
+RESULTS_PATH = "../approximation_results.csv"
+EPSILONS = [0.1, 0.05, 0.02, 0.01, 0.005, 0.001]
+TIME_LIMIT = 10.  # seconds per instance and epsilon
+COLUMNS = ["case_number", "Num_images", "Num_blackouts", "epsilon", "status", "optimal_time", "total_time", "bound",
+           "ratio", "guaranteed_ratio", "time"]
+
+
+def main(paths=EXPERIMENT_PATHS, epsilons=EPSILONS, formulation="compact", backend="scip", time_limit=TIME_LIMIT,
+         output_path=RESULTS_PATH):
+    rows = []
+    for path in get_tasks(paths):
+        pictures, blackouts, optimum, _ = read_instance(path)
+        if not pictures or not blackouts or not optimum:
+            continue
+        name = os.path.splitext(os.path.basename(path))[0]
+        for epsilon in epsilons:
+            start = timeit.default_timer()
+            with contextlib.redirect_stdout(io.StringIO()):
+                schedule = formula_2.solve_approximate((pictures, blackouts), epsilon, formulation, backend,
+                                                       time_limit)
+            elapsed = timeit.default_timer() - start
+            guaranteed = schedule.total_time / schedule.bound if schedule.bound > 0 else numpy.inf
+            rows.append((name, len(pictures), len(blackouts), epsilon, schedule.status, optimum, schedule.total_time,
+                         schedule.bound, schedule.total_time / optimum, guaranteed, elapsed))
+        print(f"{name}: " + ", ".join(f"{row[3]} {row[8]:.4f} ({row[10]:.2f}s)" for row in rows[-len(epsilons):]))
+
+    table = from_rows(COLUMNS, rows)
+    for (name, decimals) in (("total_time", 3), ("bound", 3), ("ratio", 5), ("guaranteed_ratio", 5), ("time", 3)):
+        table[name] = table[name].round(decimals)
+    write_table(output_path, table)
+    if not rows:
+        return
+
+    print(f"{len(rows) // len(epsilons)} instances, written to {output_path}")
+    for epsilon in epsilons:
+        selected = [row for row in rows if row[3] == epsilon]
+        ratios = numpy.array([row[8] for row in selected])
+        times = numpy.array([row[10] for row in selected])
+        proven = sum(row[4] == APPROXIMATE for row in selected)
+        print(f"epsilon {epsilon}: {proven} of {len(selected)} proven, ratio mean {ratios.mean():.5f} worst "
+              f"{ratios.max():.5f}, time {times.sum():.2f}s in total, median {numpy.median(times):.3f}s")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Compare the quality and time of the approximation mode for several epsilons.")
+    parser.add_argument("paths", nargs="*", default=EXPERIMENT_PATHS, help="instance folders, files or globs")
+    parser.add_argument("--epsilons", type=float, nargs="+", default=EPSILONS)
+    parser.add_argument("--formulation", choices=list(FORMULATIONS), default="compact")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="scip")
+    parser.add_argument("--time-limit", type=float, default=TIME_LIMIT, help="seconds per instance and epsilon")
+    parser.add_argument("--output", dest="output_path", default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    main(args.paths, args.epsilons, args.formulation, args.backend, args.time_limit, args.output_path)
@@ -0,0 +1,267 @@
+import contextlib
+import glob
+import io
+import json
+import math
+import os
+import platform
+import re
+import subprocess
+import sys
+import timeit
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+
+import numpy
+import ortools
+import scipy
+from scipy.stats import mannwhitneyu
+
+import formula_2
+from scheduler import BACKENDS, FORMULATIONS, PROVED_BY_BOUND, SolveStats, read_instance, validate
+from solve_many import get_tasks
+
+# Benchmarks parsing, building the model, solving and validating on every instance, and stores the results per git
+# revision in ../benchmarks/<revision>.json, with the machine and the library versions they were measured on (runs of
+# the same revision add to it).
+# Every instance is run `warmup` times without measuring and then `repetitions` times; the raw times are kept along
+# with their median, p95 and variance. The results are compared with an earlier run (the latest one of another
+# revision, or --baseline): a phase is a regression when its median is more than `threshold` slower and the times
+# differ significantly (Mann-Whitney U test), and an instance whose total time changed is reported too.
+# An instance that is not solved to optimality within the time limit is run once and only its status is kept.
+# The instances are the experiment folders by default, and can be any folders, globs or .jsonl lists of gen_suite.py.
+
+BENCHMARK_PATHS = ["../experiment_instances", "../experiment_instances_2"]
+RESULTS_DIR = "../benchmarks"
+PHASES = ["parse", "build", "solve", "validate"]
+WARMUP = 1
+REPETITIONS = 5
+TIME_LIMIT = 30  # seconds per solve
+THRESHOLD = 0.1  # relative slowdown of the median
+ALPHA = 0.05  # significance of the difference between the times
+MIN_DIFFERENCE = 1e-3  # seconds, differences below this are noise whatever the ratio
+TOLERANCE = 1e-6
+
+
+def git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+# The commit the code is at, with -dirty if tracked files were changed since
+def get_revision():
+    revision = git("rev-parse", "--short", "HEAD") or "unknown"
+    return revision + ("-dirty" if git("status", "--porcelain", "--untracked-files=no") else "")
+
+
+def get_environment(formulation, backend, warmup, repetitions, time_limit):
+    return {
+        "revision": get_revision(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "scipy": scipy.__version__,
+        "ortools": ortools.__version__,
+        "formulation": formulation,
+        "backend": backend,
+        "warmup": warmup,
+        "repetitions": repetitions,
+        "time_limit": time_limit,
+    }
+
+
+# Name of an instance in the results: its folder and file name
+def case_name(path):
+    return os.path.join(os.path.basename(os.path.dirname(path)), os.path.basename(path))
+
+
+# One run on an instance: the time of every phase, the status and the total time
+def measure(path, formulation, backend, time_limit):
+    start = timeit.default_timer()
+    pictures, blackouts, _, _ = read_instance(path)
+    parse_time = timeit.default_timer() - start
+    if not pictures or not blackouts:
+        return ({}, "TRIVIAL", None)
+
+    stats = SolveStats()
+    start = timeit.default_timer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        schedule = formula_2.solve_anytime((pictures, blackouts), formulation, backend, time_limit, stats=stats)
+    total_solve_time = timeit.default_timer() - start
+
+    start = timeit.default_timer()
+    report = validate(pictures, blackouts, schedule.times)
+    validate_time = timeit.default_timer() - start
+
+    status = schedule.status if report.ok else "INFEASIBLE"
+    # Building the model is a phase of its own, so it is left out of the solve
+    build_time = stats.phases.get("build", 0.) + stats.phases.get("load", 0.)
+    solve_time = total_solve_time - build_time
+    times = {"parse": parse_time, "build": build_time, "solve": solve_time, "validate": validate_time}
+    return (times, status, schedule.total_time)
+
+
+def summarize(values):
+    return {
+        "median": float(numpy.median(values)),
+        "p95": float(numpy.percentile(values, 95)),
+        "mean": float(numpy.mean(values)),
+        "variance": float(numpy.var(values, ddof=1)) if len(values) > 1 else 0.,
+        "min": float(numpy.min(values)),
+    }
+
+
+def run_case(path, formulation, backend, warmup, repetitions, time_limit):
+    samples = {phase: [] for phase in PHASES}
+    for i in range(warmup + repetitions):
+        try:
+            (times, status, total_time) = measure(path, formulation, backend, time_limit)
+        except SystemExit:
+            # fail_with
+            (status, total_time) = ("FAILED", None)
+        if status not in ("OPTIMAL", PROVED_BY_BOUND):
+            return {"status": status, "total_time": total_time}
+        if i >= warmup:
+            for phase in PHASES:
+                samples[phase].append(times[phase])
+
+    return {"status": status, "total_time": total_time, "samples": samples,
+            "summary": {phase: summarize(samples[phase]) for phase in PHASES}}
+
+
+# The results of the latest run of another revision, or of the given revision or file
+def load_baseline(revision, baseline=None):
+    if baseline is not None:
+        path = baseline if os.path.isfile(baseline) else os.path.join(RESULTS_DIR, baseline + ".json")
+        if not os.path.isfile(path):
+            sys.exit(f"No benchmark results {path}")
+        with open(path, "r", encoding="UTF-8") as f:
+            return json.load(f)
+
+    runs = []
+    for path in glob.glob(os.path.join(RESULTS_DIR, "*.json")):
+        with open(path, "r", encoding="UTF-8") as f:
+            run = json.load(f)
+        if run["environment"]["revision"] != revision:
+            runs.append(run)
+    return max(runs, key=lambda run: run["environment"]["date"], default=None)
+
+
+# (case, phase, old, new, p-value, kind) for every difference, where kind is "regression" or "improvement" (old and
+# new are the medians), "total time" (the optimum changed) or "status" (the instance is no longer solved)
+def compare(old, new, threshold=THRESHOLD, alpha=ALPHA):
+    differences = []
+    for (case, result) in new["cases"].items():
+        before = old["cases"].get(case)
+        if before is None:
+            continue
+        # Only solved instances have times, and only their total times are comparable
+        if "samples" in before and "samples" not in result:
+            differences.append((case, "status", before["status"], result["status"], 0., "status"))
+        if "samples" not in before or "samples" not in result:
+            continue
+        if abs(before["total_time"] - result["total_time"]) > TOLERANCE * max(1, abs(before["total_time"])):
+            differences.append((case, "total_time", before["total_time"], result["total_time"], 0., "total time"))
+
+        for phase in PHASES:
+            (a, b) = (before["samples"][phase], result["samples"][phase])
+            (median_a, median_b) = (float(numpy.median(a)), float(numpy.median(b)))
+            if abs(median_b - median_a) < MIN_DIFFERENCE:
+                continue
+            # With very few runs no difference is significant (the smallest p-value is 2 / (n1 + n2 choose n1)), then
+            # the threshold decides on its own
+            p_value = 0.
+            if 2 / math.comb(len(a) + len(b), len(a)) < alpha:
+                p_value = float(mannwhitneyu(a, b).pvalue)
+                if p_value >= alpha:
+                    continue
+            if median_b > median_a * (1 + threshold):
+                differences.append((case, phase, median_a, median_b, p_value, "regression"))
+            elif median_b < median_a / (1 + threshold):
+                differences.append((case, phase, median_a, median_b, p_value, "improvement"))
+    return differences
+
+
+# Ratio of the new to the old median of every phase over the instances both runs timed (geometric mean)
+def overall_ratios(old, new):
+    ratios = {}
+    for phase in PHASES:
+        logs = [numpy.log(result["summary"][phase]["median"] / old["cases"][case]["summary"][phase]["median"])
+                for (case, result) in new["cases"].items()
+                if "summary" in result and "summary" in old["cases"].get(case, {})
+                and old["cases"][case]["summary"][phase]["median"] > 0 and result["summary"][phase]["median"] > 0]
+        if logs:
+            ratios[phase] = float(numpy.exp(numpy.mean(logs)))
+    return ratios
+
+
+def main(sources=BENCHMARK_PATHS, cases=None, formulation="standard", backend="scip", warmup=WARMUP,
+         repetitions=REPETITIONS, time_limit=TIME_LIMIT, threshold=THRESHOLD, baseline=None):
+    environment = get_environment(formulation, backend, warmup, repetitions, time_limit)
+    paths = [task for task in get_tasks(sources) if isinstance(task, str)]
+    if cases:
+        paths = [path for path in paths if re.search(cases, case_name(path))]
+    print(f"Benchmarking {len(paths)} instances at {environment['revision']}")
+
+    results = {}
+    for path in paths:
+        result = run_case(path, formulation, backend, warmup, repetitions, time_limit)
+        results[case_name(path)] = result
+        if "summary" in result:
+            medians = ", ".join(f"{phase} {result['summary'][phase]['median'] * 1000:.2f}ms" for phase in PHASES)
+            print(f"{case_name(path)}: {medians}")
+        else:
+            print(f"{case_name(path)}: {result['status']}, not timed")
+
+    # Another run of the same revision (on other instances, say) is added to its results
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output_path = os.path.join(RESULTS_DIR, environment["revision"] + ".json")
+    cases_so_far = {}
+    if os.path.isfile(output_path):
+        with open(output_path, "r", encoding="UTF-8") as f:
+            cases_so_far = json.load(f)["cases"]
+    new = {"environment": environment, "cases": {**cases_so_far, **results}}
+    with open(output_path, "w", encoding="UTF-8") as f:
+        json.dump(new, f, indent=1)
+    print(f"Results written to {output_path}")
+
+    old = load_baseline(environment["revision"], baseline)
+    if old is None:
+        print("No earlier results to compare with")
+        return 0
+
+    print(f"Compared with {old['environment']['revision']} ({old['environment']['date']}):")
+    for (phase, ratio) in overall_ratios(old, new).items():
+        print(f"  {phase}: {ratio:.3f}x the time")
+    differences = compare(old, new, threshold)
+    for (case, phase, before, after, p_value, kind) in differences:
+        show = lambda value: f"{value:.6g}" if isinstance(value, float) else value
+        print(f"  {kind}: {case} {phase} {show(before)} -> {show(after)}" + (f" (p = {p_value:.3g})" if p_value else ""))
+    regressions = sum(1 for d in differences if d[-1] != "improvement")
+    print(f"{regressions} regressions")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark the solver and compare with the results of an earlier revision.")
+    parser.add_argument("sources", nargs="*", default=BENCHMARK_PATHS,
+                        help="instance folders, files, globs or .jsonl lists (the experiment folders by default)")
+    parser.add_argument("--cases", help="only the instances whose folder/file name matches this regular expression")
+    parser.add_argument("--formulation", choices=list(FORMULATIONS), default="standard")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="scip")
+    parser.add_argument("--warmup", type=int, default=WARMUP, help="runs per instance that are not measured")
+    parser.add_argument("--repetitions", type=int, default=REPETITIONS, help="measured runs per instance")
+    parser.add_argument("--time-limit", type=float, default=TIME_LIMIT, help="seconds per solve")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="relative slowdown of a median that counts as a regression")
+    parser.add_argument("--baseline", help="revision or results file to compare with (the latest other one by default)")
+    args = parser.parse_args()
+
+    sys.exit(main(args.sources, args.cases, args.formulation, args.backend, args.warmup, args.repetitions,
+                  args.time_limit, args.threshold, args.baseline))
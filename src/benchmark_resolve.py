@@ -0,0 +1,82 @@
+import os
+import random
+import re
+import statistics
+from argparse import ArgumentParser
+
+from scheduler import Scheduler, read_instance, BACKENDS, FORMULATIONS, from_rows, write_table
+
+# Compares re-solving a Scheduler after a change with solving the changed instance from scratch.
+# Every round makes one change (shift the blackouts a little, add a picture or remove one), re-solves the kept
+# Scheduler and solves a new Scheduler on the same input. The times are written to resolve_results.csv.
+
+DEFAULT_PATHS = ["../experiment_instances_2"]
+CASES = "(17_(0\\d|1[0-4])|16_1|16_00|10_2|10_3|10_7|12_1)\\.txt$"
+COLUMNS = ["case", "round", "change", "resolve_time", "cold_time", "resolve_total_time", "cold_total_time"]
+ROUNDS = 5
+SHIFT = 0.2  # largest shift of a blackout start or end, in seconds
+
+
+# Move every blackout a little (to 3 decimals, like the instances), keeping them apart and in the same order
+def shift_blackouts(blackouts, rng):
+    shifted = []
+    previous_end = 0.
+    for (start, end) in blackouts:
+        start = max(previous_end, round(start + rng.uniform(-SHIFT, SHIFT), 3))
+        end = max(start, round(end + rng.uniform(-SHIFT, SHIFT), 3))
+        shifted.append((start, end))
+        previous_end = end
+    return shifted
+
+
+def main(paths, formulation="standard", backend="scip", rounds=ROUNDS, seed=0):
+    rng = random.Random(seed)
+    rows = []
+
+    for path in paths:
+        for file in sorted(os.listdir(path)):
+            if not re.search(CASES, file):
+                continue
+            pictures, blackouts, _, _ = read_instance(os.path.join(path, file))
+            if not blackouts:
+                continue
+
+            scheduler = Scheduler(pictures, blackouts, formulation, backend)
+            first = scheduler.solve()
+            sizes = dict(enumerate(pictures))
+
+            for i in range(rounds):
+                change = ["shift", "add", "remove"][i % 3]
+                if change == "shift":
+                    blackouts = shift_blackouts(blackouts, rng)
+                    scheduler.update_blackouts(blackouts)
+                elif change == "add":
+                    size = round(rng.uniform(min(pictures), max(pictures)), 3)
+                    [id] = scheduler.add_pictures([size])
+                    sizes[id] = size
+                else:
+                    id = rng.choice(list(sizes))
+                    scheduler.remove_pictures([id])
+                    del sizes[id]
+
+                warm = scheduler.solve()
+                cold = Scheduler(list(sizes.values()), blackouts, formulation, backend).solve()
+                rows.append((file, i, change, warm.elapsed, cold.elapsed, warm.total_time, cold.total_time))
+                print(f"{file} {change}: re-solve {warm.elapsed:.3f}s, from scratch {cold.elapsed:.3f}s (first solve {first.elapsed:.3f}s)")
+
+    write_table("../resolve_results.csv", from_rows(COLUMNS, rows))
+
+    if rows:
+        print("Median re-solve:", statistics.median(r[3] for r in rows), "from scratch:", statistics.median(r[4] for r in rows))
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark re-solving a Scheduler against solving from scratch.")
+    parser.add_argument("paths", nargs="*", default=DEFAULT_PATHS, help="folders with instance files")
+    parser.add_argument("--formulation", choices=list(FORMULATIONS), default="standard")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="scip")
+    parser.add_argument("--rounds", type=int, default=ROUNDS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    main(args.paths, args.formulation, args.backend, args.rounds, args.seed)
@@ -0,0 +1,94 @@
+import contextlib
+import io
+import os
+import random
+import statistics
+import timeit
+from argparse import ArgumentParser
+
+import formula_2
+from benchmark_resolve import shift_blackouts
+from scheduler import BACKENDS, FORMULATIONS, MAX_BYTES, SolveStats, TemplateCache, read_instance, from_rows, \
+    write_table
+from solve_many import get_tasks
+
+# Compares solving with model templates (scheduler/templates.py) with building every model from scratch. Every round
+# changes the durations of every instance a little (every distinct picture length and every blackout moves, like in a
+# planning run), which keeps the shape of its model, and solves it both ways; the cold solves get a new solver every
+# time, the others share one TemplateCache over the whole run. The time of everything but the solver's search (model
+# building, creating or patching the solver, heuristic, presolve, output) is written to template_results.csv.
+
+DEFAULT_PATHS = ["../experiment_instances_2"]
+RESULTS_PATH = "../template_results.csv"
+ROUNDS = 5
+STRETCH = 0.05  # largest relative change of a picture length
+TOLERANCE = 1e-3
+COLUMNS = ["case", "round", "lengths", "knapsacks", "template_hit", "cold_setup", "template_setup", "cold_time",
+           "template_time", "cold_total_time", "template_total_time"]
+
+
+# Every distinct length is stretched by the same factor, so identical pictures stay identical
+def stretch_pictures(pictures, rng):
+    factors = {size: rng.uniform(1 - STRETCH, 1 + STRETCH) for size in sorted(set(pictures))}
+    return [round(size * factors[size], 3) for size in pictures]
+
+
+def timed_solve(input, formulation, backend, templates):
+    stats = SolveStats()
+    start = timeit.default_timer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        output = formula_2.solve(input, formulation, backend, stats=stats, templates=templates)
+    elapsed = timeit.default_timer() - start
+    return (elapsed - stats.phases.get("solve", 0.), elapsed, output[0])
+
+
+def main(paths=DEFAULT_PATHS, formulation="standard", backend="scip", rounds=ROUNDS, max_bytes=MAX_BYTES, seed=0,
+         output_path=RESULTS_PATH):
+    rng = random.Random(seed)
+    templates = TemplateCache(max_bytes)
+    rows = []
+    for path in get_tasks(paths):
+        pictures, blackouts, _, _ = read_instance(path)
+        if not pictures or not blackouts:
+            continue
+        case = os.path.splitext(os.path.basename(path))[0]
+        for i in range(rounds):
+            input = (stretch_pictures(pictures, rng), shift_blackouts(blackouts, rng)) if i else (pictures, blackouts)
+            (hits, misses) = (templates.hits, templates.misses)
+            template = timed_solve(input, formulation, backend, templates)
+            cold = timed_solve(input, formulation, backend, None)
+            # The shape of the model, which is the template put back last; no model when the bound proved the greedy
+            # schedule optimal
+            built = (templates.hits, templates.misses) != (hits, misses)
+            (lengths, knapsacks) = next(reversed(templates.templates))[2:] if built else (0, 0)
+            rows.append((case, i, lengths, knapsacks, templates.hits > hits, cold[0], template[0], cold[1], template[1],
+                         cold[2], template[2]))
+            if abs(cold[2] - template[2]) > TOLERANCE:
+                print(f"{case} round {i}: total time {template[2]} with a template, {cold[2]} without")
+        print(f"{case}: setup {statistics.median(r[5] for r in rows[-rounds:]) * 1000:.2f} ms cold, "
+              f"{statistics.median(r[6] for r in rows[-rounds:]) * 1000:.2f} ms with templates")
+
+    write_table(output_path, from_rows(COLUMNS, rows))
+    if not rows:
+        return
+    hit = [r for r in rows if r[4]]
+    print(f"{len(rows)} solves, written to {output_path}; {templates.describe()}")
+    print(f"Setup (all but the search): {sum(r[5] for r in rows):.2f} s cold, {sum(r[6] for r in rows):.2f} s with "
+          f"templates; on a hit {statistics.median(r[5] for r in hit) * 1000:.2f} against "
+          f"{statistics.median(r[6] for r in hit) * 1000:.2f} ms (median)" if hit else "No template was used again")
+    print(f"Whole solves: {sum(r[7] for r in rows):.2f} s cold, {sum(r[8] for r in rows):.2f} s with templates")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Benchmark model templates against building every model from scratch.")
+    parser.add_argument("paths", nargs="*", default=DEFAULT_PATHS, help="instance folders, files or globs")
+    parser.add_argument("--formulation", choices=list(FORMULATIONS), default="standard")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="scip")
+    parser.add_argument("--rounds", type=int, default=ROUNDS, help="solves per instance, all but the first changed")
+    parser.add_argument("--max-mb", type=float, default=MAX_BYTES / 2 ** 20, help="memory for the templates")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", dest="output_path", default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    main(args.paths, args.formulation, args.backend, args.rounds, int(args.max_mb * 2 ** 20), args.seed,
+         args.output_path)
@@ -1,12 +1,12 @@
-from ortools.linear_solver import pywraplp # type: ignore
 from random import randint, uniform
+from sys import argv
+import numpy as np
 
-def bool_array_gen(solver, n, m):
-  return [[solver.BoolVar(f"x[{i}][{j}]") for j in range(m)] for i in range(n)]
+from scheduler import block, matrix_model, get_backend
 
 # LP solver
 # (BOP) is the algorithm I picked one in a tutorial might not be the right one for our usecase
-solver = pywraplp.Solver.CreateSolver('SCIP') or exit(1)
+solver = get_backend(argv[1] if len(argv) > 1 else "scip")
 
 # Input
 p = [round(uniform(1, 10), 2) for _ in range(50)]
@@ -15,28 +15,31 @@ n = len(p)
 m = len(c)
 
 # Variable
-x = bool_array_gen(solver, n, m)
+# x[i][j] has index i * m + j
+cells = np.arange(n * m)
+cell_i, cell_j = np.divmod(cells, m)
 
 # Constraints
-for j in range(m):
-  solver.Add(solver.Sum([p[i] * x[i][j] for i in range(n)]) <= c[j])
-
-for i in range(n):
-  solver.Add(solver.Sum(x[i][j] for j in range(m)) == 1)
+blocks = [
+  block(cell_j, cells, np.asarray(p)[cell_i], np.full(m, -np.inf), c),
+  block(cell_i, cells, 1, np.ones(n), 1),
+]
 
 # Objective
-solver.Minimize(solver.Sum(x[i][j] * p[i] * j * j for j in range(m) for i in range(n)))
+objective = np.asarray(p)[cell_i] * cell_j * cell_j
 
 # Output
-status = solver.Solve()
-if status == pywraplp.Solver.OPTIMAL:
+solver.load(matrix_model(blocks, objective, np.ones(n * m), np.ones(n * m, dtype=bool)))
+solution = solver.solve()
+if solution.status == "OPTIMAL":
+    x = solution.values.reshape(n, m).round()
     o = []
     for j in range(m):
         l = []
         for i in range(n):
-            # print(f"x[{i}][{j}]: {x[i][j].solution_value()}")
+            # print(f"x[{i}][{j}]: {x[i][j]}")
 
-            if x[i][j].solution_value():
+            if x[i][j]:
                 l.append(p[i])
         o.append(l)
     print(o)
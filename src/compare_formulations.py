@@ -0,0 +1,88 @@
+import os
+import re
+import timeit
+from argparse import ArgumentParser
+
+import numpy
+
+from scheduler import read_instance, get_knapsacks, get_starts, FORMULATIONS, BACKENDS, get_backend, from_rows, write_table
+
+# Runs the standard and the compact formulation of formula_2 on every instance of the experiment folders,
+# checks that both reach the same makespan and writes the model sizes and timings to formulation_results.csv.
+
+EXPERIMENT_PATHS = ["../experiment_instances", "../experiment_instances_2"]
+TIME_LIMIT = 60  # seconds per solve, the 4_* instances do not finish otherwise
+# SCIP's default relative gap: a proven optimum is within this fraction of the true one, so two of them may differ by
+# that much of the makespan (a fixed tolerance is too tight on makespans of a few hundred)
+RELATIVE_GAP = 1e-4
+COLUMNS = ["case", "optimal_time", "formulation", "status", "total_cost", "time_to_build", "time_to_solve", "variables",
+           "constraints", "nonzeros"]
+
+
+def model_size(model):
+    return model.matrix.shape[1], model.matrix.shape[0], model.matrix.nnz
+
+
+# Whether two proven optima agree, given that each is only optimal up to the relative gap
+def agree(a, b, relative_gap=RELATIVE_GAP):
+    return abs(a - b) <= relative_gap * max(abs(a), abs(b)) + 1e-9
+
+
+def run(pictures, blackouts, formulation, backend, relative_gap=RELATIVE_GAP):
+    knapsacks = get_knapsacks(pictures, blackouts)
+    starts = get_starts(blackouts)
+
+    solver = get_backend(backend)
+    start = timeit.default_timer()
+    model = FORMULATIONS[formulation](pictures, knapsacks, starts)
+    solver.load(model)
+    build_time = timeit.default_timer() - start
+
+    solution = solver.solve(TIME_LIMIT, relative_gap)
+
+    makespan = None
+    if solution.status in ("OPTIMAL", "FEASIBLE"):
+        num_cells = len(pictures) * len(knapsacks)
+        x = solution.values[:num_cells].reshape(len(pictures), len(knapsacks)).round()
+        fill = numpy.asarray(pictures) @ x
+        makespan = max(s + f for s, f in zip(starts, fill) if f > 0)
+
+    return (solution.status, makespan, build_time, solution.solve_time) + model_size(model)
+
+
+def main(paths, backend="scip"):
+    rows = []
+    mismatches = []
+    for path in paths:
+        for file in sorted(os.listdir(path)):
+            file = os.path.join(path, file)
+            pictures, blackouts, opt_val, _ = read_instance(file)
+            case = re.search("([^/]+)$", file).group(1)
+            print(case)
+
+            results = {}
+            for formulation in ("standard", "compact"):
+                results[formulation] = run(pictures, blackouts, formulation, backend)
+                (status, makespan, build_time, solve_time, num_vars, num_constraints, nonzeros) = results[formulation]
+                cost = None if makespan is None else round(makespan, 3)
+                rows.append((case, opt_val, formulation, status, cost, build_time, solve_time, num_vars, num_constraints, nonzeros))
+
+            # Cross-check: proven optima have to agree with each other
+            optima = [r[1] for r in results.values() if r[0] == "OPTIMAL"]
+            if len(optima) == 2 and not agree(*optima):
+                mismatches.append(case)
+                print("Formulations disagree:", case, optima)
+
+    write_table("../formulation_results.csv", from_rows(COLUMNS, rows))
+
+    print("Mismatches:", mismatches)
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Cross-check the standard and the compact formulation.")
+    parser.add_argument("paths", nargs="*", default=EXPERIMENT_PATHS, help="folders with instance files")
+    parser.add_argument("--backend", choices=list(BACKENDS), default="scip")
+    args = parser.parse_args()
+
+    main(args.paths, args.backend)
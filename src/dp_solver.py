@@ -0,0 +1,278 @@
+from argparse import ArgumentParser
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Optional
+import sys
+import timeit
+import numpy as np
+
+from scheduler import Input, Output, Schedule, SolutionCache, fail_with, parse_input, get_knapsacks, get_starts, \
+  get_times, get_knaps, get_output, greedy_schedule, lower_bound, proves_optimal
+from scheduler.backends import get_decimals
+
+# Exact solver without an ILP, for durations with a few decimals.
+
+# Algorithm overview:
+
+# Knapsack k is the gap before blackout k (the last one is after the last blackout and holds everything).
+# The pictures of a knapsack are sent back to back from its start, so if L is the last knapsack that is used,
+# the total time is start[L] + (the pictures in L). Every knapsack before L is at most full, so any schedule whose
+# last knapsack comes after L ends after the end of L. The optimum therefore uses the first knapsack L that can hold
+# whatever does not fit in the knapsacks before it, and among those schedules puts as much as possible before L.
+
+# So for L = 0, 1, 2, ... we look for the largest total of pictures that can be packed into knapsacks 0..L-1
+# (a multiple subset sum problem). The first L for which the remainder fits in knapsack L gives the optimum.
+
+# All durations are scaled to integers (ticks), so the subset sums can be kept as bitsets: bit t of a Python integer
+# is set if some pictures add up to exactly t ticks. Pictures of the same length are grouped together and
+# handled as a count, so identical pictures are never swapped around.
+
+# Only the total that is packed matters, so the knapsacks can be filled in any order. They are filled one by one,
+# smallest first, in a depth-first search. In every knapsack we try the reachable fills from the largest one down,
+# and prune with:
+# * the bound: what is packed so far plus, for every knapsack left, the largest fill the remaining pictures can reach,
+#   never more than the remaining pictures that fit in it and the smaller knapsacks. A branch that cannot beat the
+#   best packing is dropped.
+# * dominance: a knapsack is only closed when none of the remaining pictures fits in its leftover space, since moving
+#   such a picture into it never makes the schedule worse.
+# * states that were already explored: the same remaining pictures at the same knapsack are only searched once.
+
+# The search can take very long on some instances, so it can be given a time limit. It then stops with the best
+# packing it found for the last knapsack it got to, or the greedy schedule when that is better (see solve_anytime).
+
+# Add `count` pictures of length `size` to the bitset of reachable sums, keeping the sums up to `mask`.
+# The pictures are added in chunks of 1, 2, 4, ..., so a group of c pictures takes log(c) shifts.
+def add_group(bits: int, size: int, count: int, mask: int) -> int:
+  chunk = 1
+  while count > 0:
+    take = min(chunk, count)
+    bits |= (bits << (size * take)) & mask
+    count -= take
+    chunk *= 2
+  return bits
+
+# Largest reachable sum that fits in `capacity`.
+def best_fill(bits: int, capacity: int) -> int:
+  return (bits & ((1 << (capacity + 1)) - 1)).bit_length() - 1
+
+# Depth-first search for the largest packing of the pictures into the given knapsacks, if it packs at least `need`.
+# `sizes` holds the distinct picture lengths (in ticks, largest first) and `counts` how many pictures have each length.
+class Search:
+  def __init__(self, sizes: list[int], counts: list[int], capacities: list[int], need: int,
+               deadline: Optional[float] = None):
+    self.sizes = sizes
+    self.capacities = capacities
+    self.mask = (1 << (max(capacities, default=0) + 1)) - 1
+    self.visited: set[tuple[int, tuple[int, ...]]] = set()
+
+    # Best packing found so far, as the picture groups in each knapsack. Packings below `need` are of no use,
+    # so they are pruned like packings that do not beat the best one.
+    self.best = need - 1
+    self.best_fills: Optional[list[list[int]]] = None
+    self.fills: list[list[int]] = []
+
+    # Nothing can beat this bound, so the search stops as soon as it is reached
+    bits = self.reachable(counts)
+    total = sum(s * c for (s, c) in zip(sizes, counts))
+    self.target = min(total, sum(best_fill(bits, c) for c in capacities))
+    self.done = False
+    # The search also stops at the deadline (timeit.default_timer), and the best packing is then not proven
+    self.deadline = deadline
+    self.timed_out = False
+
+  # Bitset of the sums reachable with all remaining pictures
+  def reachable(self, counts: list[int]) -> int:
+    bits = 1
+    for (size, count) in zip(self.sizes, counts):
+      bits = add_group(bits, size, count, self.mask)
+    return bits
+
+  # Total length of the remaining pictures that fit in each of the knapsacks from k on
+  def fits(self, counts: list[int], k: int) -> list[int]:
+    weights = list(accumulate((s * c for (s, c) in zip(reversed(self.sizes), reversed(counts))), initial=0))
+    return [weights[len(self.sizes) - bisect_left(self.sizes, -c, key=lambda s: -s)] for c in self.capacities[k:]]
+
+  # suffix[i] is the bitset of sums up to `capacity` reachable with the groups i, ..., small - 1 on top of
+  # all pictures of the groups from `small` on (the ones that have to go in, see `subsets`)
+  def suffixes(self, counts: list[int], small: int, capacity: int) -> list[int]:
+    mask = (1 << (capacity + 1)) - 1
+    suffix = [0] * (small + 1)
+    suffix[small] = (1 << sum(self.sizes[i] * counts[i] for i in range(small, len(counts)))) & mask
+    for i in range(small - 1, -1, -1):
+      suffix[i] = add_group(suffix[i + 1], self.sizes[i], counts[i], mask)
+    return suffix
+
+  # Count vectors of the remaining pictures that add up to exactly `target`, largest pictures first.
+  # The groups from `small` on fit in the space that is left next to the target, so by dominance they are taken
+  # completely. Only branches that can still reach the target are followed, so every branch yields a subset.
+  def subsets(self, counts: list[int], target: int, suffix: list[int], small: int, i: int = 0):
+    if i == small:
+      yield [(j, counts[j]) for j in range(small, len(counts)) if counts[j]]
+      return
+    size = self.sizes[i]
+    for c in range(min(counts[i], target // size), -1, -1):
+      left = target - c * size
+      if (suffix[i + 1] >> left) & 1:
+        for tail in self.subsets(counts, left, suffix, small, i + 1):
+          yield [(i, c)] + tail if c else tail
+
+  def search(self, k: int, counts: list[int], packed: int) -> None:
+    if packed > self.best:
+      self.best = packed
+      self.best_fills = [list(f) for f in self.fills]
+      self.done = packed >= self.target
+    if k == len(self.capacities) or self.done:
+      return
+    if self.deadline is not None and timeit.default_timer() > self.deadline:
+      self.timed_out = self.done = True
+      return
+
+    state = (k, tuple(counts))
+    if state in self.visited:
+      return
+    self.visited.add(state)
+
+    bits = self.reachable(counts)
+    remaining = self.target - packed
+    capacity = self.capacities[k]
+    fits = self.fits(counts, k + 1)
+    later = [best_fill(bits, c) for c in self.capacities[k + 1:]]
+
+    small = None
+    fill = best_fill(bits, capacity)
+    while fill >= 0:
+      # Bound: every knapsack holds at most its best fill, and the knapsacks up to the j-th one (they are sorted by
+      # capacity) hold at most the pictures that fit in the j-th one
+      bound = fill
+      for (best, weight) in zip(later, fits):
+        bound = min(bound + best, weight)
+      if packed + min(remaining, bound) <= self.best:
+        return
+      # Dominance: the pictures that still fit next to the fill have to be in the knapsack too
+      split = bisect_left(self.sizes, fill - capacity, key=lambda s: -s)
+      if split != small:
+        small = split
+        suffix = self.suffixes(counts, small, capacity)
+      if (suffix[0] >> fill) & 1:
+        for chosen in self.subsets(counts, fill, suffix, small):
+          left = list(counts)
+          for (i, c) in chosen:
+            left[i] -= c
+          self.fills.append([i for (i, c) in chosen for _ in range(c)])
+          self.search(k + 1, left, packed + fill)
+          self.fills.pop()
+          if self.done:
+            return
+      fill = best_fill(bits, fill - 1) if fill > 0 else -1
+
+# The output of the search, whether the schedule is proven optimal, and the knapsack before which no schedule can end.
+# With a time limit (seconds) the search stops there, see solve_anytime.
+def search_output(input: Input, cache: Optional[SolutionCache] = None,
+                  time_limit: Optional[float] = None) -> tuple[Output, bool, int]:
+  (pictures, blackouts) = input
+  num_pictures = len(pictures)
+
+  if not pictures or not blackouts:
+    fail_with("Trivial solution")
+
+  start = timeit.default_timer()
+  deadline = None if time_limit is None else start + time_limit
+  knapsacks = get_knapsacks(pictures, blackouts)
+  num_knapsacks = len(knapsacks)
+
+  if cache is not None:
+    knaps = cache.get(pictures, blackouts)
+    if knaps is not None:
+      print("Pictures in knapsacks:", knaps)
+      return (get_output(pictures, blackouts, knapsacks, knaps, timeit.default_timer() - start, 0.), True, 0)
+
+  # Scale everything to integer ticks; capacities are rounded down, so nothing that fits in ticks overflows a gap
+  scale = 10 ** get_decimals(np.asarray(pictures + knapsacks[:-1]))
+  ticks = [round(p * scale) for p in pictures]
+  capacities = [int(np.floor(k * scale + 1e-6)) for k in knapsacks]
+
+  # Group the pictures by length, largest first. Pictures of length 0 fit anywhere, they go in the first knapsack.
+  sizes = sorted({t for t in ticks if t > 0}, reverse=True)
+  group = {size: i for (i, size) in enumerate(sizes)}
+  counts = [0] * len(sizes)
+  for t in ticks:
+    if t > 0:
+      counts[group[t]] += 1
+  total = sum(ticks)
+  build_time = timeit.default_timer() - start
+
+  # The search recurses once per knapsack and the subsets once per group
+  sys.setrecursionlimit(max(sys.getrecursionlimit(), 2 * (num_knapsacks + len(sizes)) + 100))
+
+  start = timeit.default_timer()
+  for last in range(num_knapsacks):
+    # The pictures that do not fit in knapsacks 0..last-1 have to fit in knapsack `last`
+    need = total - capacities[last]
+    if sum(capacities[:last]) < need:
+      continue
+    # The small knapsacks are the hardest to fill, so they go first while there are many pictures to choose from
+    order = sorted(range(last), key=lambda k: capacities[k])
+    search = Search(sizes, counts, [capacities[k] for k in order], need, deadline)
+    if search.target < need:
+      continue
+    search.search(0, list(counts), 0)
+    if search.best_fills is not None or search.timed_out:
+      break
+  optimal = not search.timed_out
+
+  # Hand out the actual pictures: every group is a queue of picture indices
+  queues: list[list[int]] = [[] for _ in sizes]
+  knaps: list[list[int]] = [[] for _ in range(num_knapsacks)]
+  for (p, t) in enumerate(ticks):
+    if t > 0:
+      queues[group[t]].append(p)
+    else:
+      knaps[0].append(p)
+  for (k, fill) in zip(order, search.best_fills or []):
+    knaps[k] += [queues[i].pop() for i in fill]
+  knaps[last] += [p for queue in queues for p in queue]
+  if not optimal:
+    greedy = greedy_schedule(pictures, knapsacks)
+    better = get_times(pictures, blackouts, greedy)[0] < get_times(pictures, blackouts, knaps)[0]
+    if search.best_fills is None or better:
+      knaps = greedy
+  solve_time = timeit.default_timer() - start
+  print("Pictures in knapsacks:", knaps)
+  if cache is not None and optimal:
+    cache.put(pictures, blackouts, knaps)
+
+  return (get_output(pictures, blackouts, knapsacks, knaps, solve_time, build_time), optimal, last)
+
+# With a cache, an instance that was solved before is answered from the cache (see formula_2.solve)
+def solve(input: Input, cache: Optional[SolutionCache] = None) -> Output:
+  return search_output(input, cache)[0]
+
+# Anytime solving like formula_2.solve_anytime: stops at the time limit (seconds) and returns the best schedule found
+# so far with status FEASIBLE and a lower bound, instead of searching on. No schedule ends before the last knapsack
+# the search got to, since the ones before it were ruled out.
+def solve_anytime(input: Input, time_limit: Optional[float] = None) -> Schedule:
+  start = timeit.default_timer()
+  (pictures, blackouts) = input
+  ((total_time, times, *_), optimal, last) = search_output(input, time_limit=time_limit)
+  bound = total_time
+  if not optimal:
+    starts = get_starts(blackouts)
+    bound = max(starts[last], lower_bound(pictures, get_knapsacks(pictures, blackouts), starts, total_time))
+  status = "OPTIMAL" if optimal or proves_optimal(total_time, bound) else "FEASIBLE"
+  return Schedule(status, total_time, times, get_knaps(blackouts, times), bound, timeit.default_timer() - start)
+
+def main(input_path):
+  input = parse_input(input_path)
+  (total_time, times, solve_time, num_full_knaps, num_used_knaps, num_knapsacks, build_time) = solve(input)
+
+  #print("Total time:", total_time)
+  #print("Sending times:", times)
+
+  return (solve_time, total_time, num_full_knaps, num_used_knaps, num_knapsacks, build_time)
+
+if __name__ == "__main__":
+  parser = ArgumentParser(description="Find the optimal sending times of the pictures in an instance file, without an ILP.")
+  parser.add_argument("instance", help="path to the instance text file")
+  args = parser.parse_args()
+
+  main(args.instance)
@@ -1,40 +1,191 @@
+import contextlib
+import cProfile
+import io
 import os
-import formula_2
-import re
+import timeit
+from argparse import ArgumentParser
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import wait
+
 import numpy
 
+import formula_2
+import dp_solver
+from scheduler import COLUMNS, SolutionCache, SolveStats, fail_with, is_sidecar, read_instance
+
+# Runs formula_2 and dp_solver on every instance of the experiment folders and writes the results to exp_results.csv.
+# Every solver runs on every instance in a process of its own, a few at a time, so a run that hangs is killed at
+# the timeout without holding up the others. A row is written as soon as both solvers are done with its instance,
+# and a sweep that was interrupted picks up where it stopped: instances that already have a row are skipped.
+# With --cache the solvers look every instance up in a shared SQLite file of solved instances first, which skips
+# the solver for instances that were solved before (the reported times are then lookup times).
+# The F2 columns end with the statistics of formula_2 (see scheduler/stats.py): the time of every phase, the size of
+# the model, the solver's nodes and iterations and the peak memory, averaged over the repetitions. With --profile every
+# solver run also writes a cProfile file.
+
+EXPERIMENT_PATHS = ["../experiment_instances", "../experiment_instances_2"]
+RESULTS_PATH = "../exp_results.csv"
+REPETITIONS = 5
+TIMEOUT = 600  # seconds for all repetitions of one solver on one instance
+
+# The files are read by the main process, so the solvers have no parse time
+STATS = [column for column in COLUMNS if column != "time_parse"]
+STATS_COLUMNS = [f"{column}_F2" for column in STATS]
+HEADER = "case_number;Num_images;Num_blackouts;optimal_time;time_to_solve_F2;time_to_build_F2;total_cost_F2;number_full_knapsacks;number_used_knapsacks;number_all_knapsacks;proved_by_bound_F2;" + ";".join(STATS_COLUMNS) + ";time_to_solve_DP;total_cost_DP;status_F2;status_DP;suite\n"
+
+
+# proved_by_bound_F2 is 1 if the greedy schedule met the lower bound, so formula_2 did not run the solver
+def run_formula_2(input, repetitions, cache):
+    times, build_times, stats = [], [], []
+    proved = formula_2.proved_by_bound
+    for i in range(repetitions):
+        stats.append(SolveStats())
+        total_time, _, solve_time, num_full_knaps, num_used_knaps, num_knapsacks, build_time = formula_2.solve(input, cache=cache, stats=stats[-1])
+        times.append(solve_time)
+        build_times.append(build_time)
+    proved_by_bound = int(formula_2.proved_by_bound > proved)
+    mean_stats = dict(zip(COLUMNS, numpy.mean([s.row() for s in stats], axis=0).tolist()))
+    return (numpy.mean(times), numpy.mean(build_times), round(total_time, 3), num_full_knaps, num_used_knaps, num_knapsacks, proved_by_bound, *(mean_stats[column] for column in STATS))
+
+
+def run_dp(input, repetitions, cache):
+    times = []
+    for i in range(repetitions):
+        total_time, _, solve_time, *_ = dp_solver.solve(input, cache)
+        times.append(solve_time)
+    return (numpy.mean(times), round(total_time, 3))
+
+
+SOLVERS = {"F2": run_formula_2, "DP": run_dp}
+
+
+# Runs in the worker process: send back the averaged results on the instance, which was read by the main process.
+# A solver that fails exits the process without sending anything. With a profile_path the run is profiled into it.
+def run_task(connection, solver, input, repetitions, cache_path, profile_path=None):
+    cache = None if cache_path is None else SolutionCache(path=cache_path)
+    profiler = cProfile.Profile() if profile_path else None
+    with contextlib.redirect_stdout(io.StringIO()):
+        if profiler:
+            profiler.enable()
+        result = SOLVERS[solver](input, repetitions, cache)
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+    connection.send(result)
+
+
+# Runs the tasks (solver, file) with at most `workers` processes at a time and calls on_done(task, status, result)
+# for each of them, where the status is OK, FAILED or TIMEOUT and the result is None unless it is OK.
+# inputs holds the (pictures, blackouts) of every file. With a profile_dir every task writes <file>_<solver>.prof in it.
+def run_tasks(tasks, inputs, workers, timeout, repetitions, on_done, cache_path=None, profile_dir=None):
+    pending = list(tasks)
+    running = {}  # receiving end of the pipe -> (task, process, deadline)
+
+    while pending or running:
+        while pending and len(running) < workers:
+            task = pending.pop(0)
+            (solver, file) = task
+            receiver, sender = Pipe(duplex=False)
+            profile_path = None if profile_dir is None else os.path.join(profile_dir, f"{os.path.basename(file)}_{solver}.prof")
+            process = Process(target=run_task, args=(sender, solver, inputs[file], repetitions, cache_path, profile_path), daemon=True)
+            process.start()
+            sender.close()
+            running[receiver] = (task, process, timeit.default_timer() + timeout)
+
+        first_deadline = min(deadline for (_, _, deadline) in running.values())
+        ready = wait(list(running), timeout=max(0, first_deadline - timeit.default_timer()))
+
+        now = timeit.default_timer()
+        for receiver in list(running):
+            (task, process, deadline) = running[receiver]
+            if receiver in ready:
+                # The pipe is closed without a result if the process exited early
+                try:
+                    (status, result) = ("OK", receiver.recv())
+                except EOFError:
+                    (status, result) = ("FAILED", None)
+            elif now >= deadline:
+                process.kill()
+                (status, result) = ("TIMEOUT", None)
+            else:
+                continue
+            process.join()
+            receiver.close()
+            del running[receiver]
+            on_done(task, status, result)
+
+
+# (suite, case) of the rows that are already in the results file, after checking it has the same columns
+def read_done(path):
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r", encoding="UTF-8") as f:
+        lines = f.readlines()
+    if not lines or lines[0] != HEADER:
+        fail_with(f"{path} has other columns, start over with --fresh")
+    return {(row[-1], row[0]) for row in (line.rstrip("\n").split(";") for line in lines[1:]) if row[0]}
+
+
+def main(paths=EXPERIMENT_PATHS, workers=os.cpu_count() or 1, timeout=TIMEOUT, repetitions=REPETITIONS, fresh=False,
+         cache_path=None, profile_dir=None):
+    done = None if fresh else read_done(RESULTS_PATH)
+    if profile_dir is not None:
+        os.makedirs(profile_dir, exist_ok=True)
+    if done is None:
+        with open(RESULTS_PATH, "w", encoding="UTF-8") as f:
+            f.write(HEADER)
+        done = set()
+
+    cases = {}  # file -> (suite, case)
+    for path in paths:
+        suite = os.path.basename(os.path.normpath(path))
+        for case in sorted(os.listdir(path)):
+            file = os.path.join(path, case)
+            if os.path.isfile(file) and not is_sidecar(file) and (suite, case) not in done:
+                cases[file] = (suite, case)
+    print(f"{len(cases)} instances to run, {len(done)} already done")
+
+    # Every file is read once, here: the solvers get the input and the row gets the rest
+    instances = {file: read_instance(file) for file in cases}
+    inputs = {file: instance[:2] for (file, instance) in instances.items()}
+    results = {file: {} for file in cases}
+    proved = 0  # instances on which formula_2 did not need the solver
+
+    with open(RESULTS_PATH, "a", encoding="UTF-8") as f1:
+        def on_done(task, status, result):
+            nonlocal proved
+            (solver, file) = task
+            results[file][solver] = (status, result)
+            print(cases[file][1], solver, status)
+            if len(results[file]) < len(SOLVERS):
+                return
+
+            (suite, case) = cases[file]
+            pictures, blackouts, opt_val, _ = instances.pop(file)
+            opt_val = "" if opt_val is None else round(opt_val, 3)
+            (status_F2, result_F2) = results[file]["F2"]
+            (status_DP, result_DP) = results[file]["DP"]
+            result_F2 = result_F2 or ("",) * (7 + len(STATS_COLUMNS))
+            proved += bool(result_F2[6])
+            result_DP = result_DP or ("",) * 2
+            f1.write(";".join(map(str, (case, len(pictures), len(blackouts), opt_val, *result_F2, *result_DP, status_F2, status_DP, suite))) + "\n")
+            f1.flush()
+            del results[file]
 
-def main():
-    exp_path = "../experiment_instances_2"
-    experiment_files = [os.path.join(exp_path, f) for f in os.listdir(exp_path) if
-                        os.path.isfile(os.path.join(exp_path, f))]
-
-    with open("../exp_results.csv", "w", encoding="UTF-8") as f:
-        f.write("case_number;Num_images;Num_blackouts;optimal_time;time_to_solve_F2;total_cost_F2;number_full_knapsacks;number_used_knapsacks;number_all_knapsacks\n")
-
-    with open("../exp_results.csv", "a", encoding="UTF-8") as f1:
-        for file in experiment_files:
-            skips_pattern = "(4_[1-5]|10_4|12_2)" # skip because they are either too long to run or in a wrong format
-            if not re.search(skips_pattern, file):
-                print(file)
-                with open(file, "r", encoding="utf-8") as f2:
-                    num_pictures = int(f2.readline())
-                    for _ in range(num_pictures):
-                        next(f2)
-                    num_blackouts = int(f2.readline())
-                    for _ in range(num_blackouts):
-                        next(f2)
-                    opt_val = round(float(f2.readline()), 3)
-
-                times = []
-                for i in range(5):
-                    solve_time_F2, cost_F2, num_full_knaps, num_used_knaps, num_knapsacks = formula_2.main(file)
-                    times.append(solve_time_F2)
-                avg_time_to_solve = numpy.mean(times)
-                file_name = re.search('([0-9_]{3,5}\.txt)$', file).group(1)
-                f1.write(f"{file_name};{num_pictures};{num_blackouts};{opt_val};{avg_time_to_solve};{round(cost_F2, 3)};{num_full_knaps};{num_used_knaps};{num_knapsacks}\n")
+        tasks = [(solver, file) for file in cases for solver in SOLVERS]
+        run_tasks(tasks, inputs, workers, timeout, repetitions, on_done, cache_path, profile_dir)
+    print(f"Solver calls avoided by the lower bound: {proved} of {len(cases)} instances ({proved * repetitions} of {len(cases) * repetitions} solves)")
 
 
 if __name__ == "__main__":
-    main()
+    parser = ArgumentParser(description="Run the solvers on the experiment instances and write the results to exp_results.csv.")
+    parser.add_argument("paths", nargs="*", default=EXPERIMENT_PATHS, help="folders with instance files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of solver processes at a time")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT, help="seconds for all repetitions of one solver on one instance")
+    parser.add_argument("--repetitions", type=int, default=REPETITIONS)
+    parser.add_argument("--fresh", action="store_true", help="start over instead of skipping the instances that are done")
+    parser.add_argument("--cache", dest="cache_path", help="SQLite file of solved instances shared by the solvers")
+    parser.add_argument("--profile", dest="profile_dir", help="folder to write a cProfile file of every solver run to")
+    args = parser.parse_args()
 
+    main(args.paths, args.workers, args.timeout, args.repetitions, args.fresh, args.cache_path, args.profile_dir)
@@ -1,52 +1,39 @@
 
 from pathlib import Path
-from intervaltree import Interval, IntervalTree
 
-def parse_blackout(line: str):
-    [start, duration] = map(float, line.split(","))
-    return start, start + duration
+from scheduler import instance_decimals, read_instance, scale_values, to_fixed_point, validate
 
 def parse_input(path: str) -> tuple[list[float], list[tuple[float, float]], float, list[float]]:
-    with open(path, "r") as f:
-        num_pictures = int(f.readline())
-        pictures = [float(f.readline()) for _ in range(num_pictures)]
+    pictures, blackouts, expected_total_cost, positions = read_instance(str(path))
 
-        num_blackouts = int(f.readline())
-        blackouts = [parse_blackout(f.readline()) for _ in range(num_blackouts)]
-        blackouts.sort()
+    print("Pictures:", pictures)
+    print("Blackouts:", blackouts)
+    print("ExpectedTotalCost:", expected_total_cost)
 
-        expected_total_cost = float(f.readline())
-        positions = [float(f.readline()) for _ in range(num_pictures)]
-
-        print("Pictures:", pictures)
-        print("Blackouts:", blackouts)
-        print("ExpectedTotalCost:", expected_total_cost)
-        
-
-        return pictures, blackouts, expected_total_cost, positions
+    return pictures, blackouts, expected_total_cost, positions
 
 from os import listdir
+
+# Checks the positions in the file against the pictures and blackouts, and the total time against the expected one.
+# Everything is compared in ticks of the smallest unit the file is written in, so exactly.
+# Returns whether they are feasible and prints every violation otherwise.
 def check(path):
     pictures, blackouts, expected_total_cost, positions = parse_input(path)
-
-    assert len(pictures) == len(positions)
-    tree = IntervalTree([Interval(a, b) for a, b in blackouts])
-
-    m = -1
-    for pos, size in zip(positions, pictures):
-        assert pos >= 0
-        assert sorted(tree[pos:pos+size]) == []
-        tree.add(Interval(pos, pos+size))
-        if pos+size > m:
-            m = pos+size
-    assert expected_total_cost == m
-
+    decimals = instance_decimals((pictures, blackouts), positions + [expected_total_cost])
+    ((pictures, blackouts), scale) = to_fixed_point((pictures, blackouts), decimals)
+    (positions, expected_total_cost) = (scale_values(positions, scale), scale_values([expected_total_cost], scale)[0])
+    report = validate(pictures, blackouts, positions, expected_total_cost)
+    print(report.describe())
+    return report.ok
+
+ok = True
 for d in listdir("./assignment"):
     print("Checking:", d)
-    check(Path("./assignment") / d)
-    print("--------OK------")
-
-
-
-
-
+    if check(Path("./assignment") / d):
+        print("--------OK------")
+    else:
+        ok = False
+        print("-------FAILED-----")
+
+if not ok:
+    exit(1)
@@ -1,188 +1,434 @@
-#from more_itertools import pairwise
-from itertools import pairwise   # must have python 3.10 for this to work
-
-from ortools.linear_solver import pywraplp # type: ignore
-from sys import argv
-from typing import NoReturn
+from argparse import ArgumentParser
+import cProfile
+from queue import Queue
+from threading import Thread
+from typing import Callable, Iterator, Optional
 import timeit
+import numpy as np
+
+from scheduler import Input, Output, Schedule, fail_with, parse_input, get_knapsacks, get_starts, get_times, get_output, \
+  FORMULATIONS, SOLUTIONS, total_time_bound, BACKENDS, Backend, get_backend, greedy_schedule, SolutionCache, \
+  Presolved, presolve_instance, no_presolve, reduce_knaps, expand_knaps, describe, PROVED_BY_BOUND, \
+  combinatorial_bound, lower_bound, proves_optimal, SolveStats, WINDOW, rolling_horizon, tick_size, \
+  to_fixed_point, from_fixed_point, assign, get_knaps, write_schedule, MatrixModel, TemplateCache, APPROXIMATE, \
+  DEFAULT_EPSILON, size_classes, round_pictures, within
+
+# The model itself lives in scheduler/formulations.py and the solvers in scheduler/backends.py.
+
+MODES = ["exact", "heuristic", "decompose", "approximate"]
+# The formulations whose optimum is the optimal total time; the weighted one (multi_knap.py) is not exact, so its
+# schedules are neither looked up in nor written to a SolutionCache
+EXACT_FORMULATIONS = ["standard", "compact"]
+
+# How many times solve returned the greedy schedule without running the solver because it meets the lower bound
+proved_by_bound = 0
+
+# The total time and sending times of the greedy schedule if it meets the combinatorial lower bound (see
+# scheduler/bounds.py), which proves it optimal, otherwise None
+def prove_greedy(pictures: list[float], blackouts, knapsacks: list[float], starts: list[float],
+                 greedy: list[list[int]]) -> Optional[tuple[float, list[float]]]:
+  (total_time, times) = get_times(pictures, blackouts, greedy)
+  if not proves_optimal(total_time, combinatorial_bound(pictures, knapsacks, starts)):
+    return None
+  print("Proved optimal by bound")
+  return (total_time, times)
+
+# Presolve the instance (see scheduler/presolve.py), unless that is turned off
+def get_presolved(pictures: list[float], knapsacks: list[float], starts: list[float], greedy: list[list[int]],
+                  presolve: bool) -> Presolved:
+  if not presolve:
+    return no_presolve(pictures, knapsacks, starts)
+  presolved = presolve_instance(pictures, knapsacks, starts, greedy)
+  print(describe(presolved))
+  return presolved
+
+# Build the model of the presolved instance and hand it to the backend, with the greedy schedule as warm start.
+# An existing solver of the backend can be passed in to load the model into, so batches do not create one every time;
+# the model it has loaded is patched where that is cheaper (see Backend.update).
+# Returns the solver, the time it took to build and load the model and the model.
+def load_solver(presolved: Presolved, greedy: list[list[int]], formulation: str, backend: str,
+                warm_start: bool, solver: Optional[Backend] = None,
+                stats: Optional[SolveStats] = None) -> tuple[Backend, float, MatrixModel]:
+  stats = SolveStats() if stats is None else stats
+  build_model = FORMULATIONS.get(formulation) or fail_with(f"Unknown formulation {formulation}")
+  solver = solver or get_backend(backend)
+  if not solver.is_mip:
+    fail_with(f"{backend} only solves the LP relaxation")
+  (sizes, knapsacks, starts) = (presolved.sizes, presolved.knapsacks, presolved.starts)
 
-def fail_with(message: str) -> NoReturn:
-  print(message)
-  exit(1)
-
-Blackout = tuple[float, float]
-Input = tuple[list[float], list[Blackout]]
-
-def parse_blackout(line: str) -> Blackout:
-  [start, duration] = map(float, line.split(","))
-  return (start, start + duration)
-
-def parse_input(path: str) -> Input:
-  with open(path, "r") as f:
-    num_pictures = int(f.readline())
-    pictures = [float(f.readline()) for _ in range(num_pictures)]
-
-    num_blackouts = int(f.readline())
-    blackouts = [parse_blackout(f.readline()) for _ in range(num_blackouts)]
-    blackouts.sort()
-
-    #print("Pictures:", pictures)
-    #print("Blackouts:", blackouts)
-
-    return (pictures, blackouts)
-
-# Turn a list of blackouts into a list of knapsacks.
-def get_knapsacks(pictures: list[float], blackouts: list[Blackout]) -> list[float]:
-  knaps = [blackouts[0][0]] + [start - end for ((_, end), (start, _)) in pairwise(blackouts)] + [sum(pictures)]
-  return [round(k, 3) for k in knaps]
-
-Output = tuple[float, list[float], float, int, int, int]
-
-def solve(input: Input) -> Output:
+  start = timeit.default_timer()
+  with stats.phase("build"):
+    model = build_model(sizes, knapsacks, starts, presolved.counts)
+  stats.count_model(model)
+  with stats.phase("load"):
+    solver.update(model)
+  build_time = timeit.default_timer() - start
+
+  # The greedy schedule is the first solution, nothing worse than it has to be searched
+  if warm_start:
+    with stats.phase("load"):
+      values = SOLUTIONS[formulation](sizes, knapsacks, starts, reduce_knaps(presolved, greedy))
+      solver.warm_start(values)
+
+  return (solver, build_time, model)
+
+# The template of the presolved instance's shape from templates (see scheduler/templates.py), or None without them
+def take_template(templates: Optional[TemplateCache], presolved: Presolved, formulation: str,
+                  backend: str) -> Optional[Backend]:
+  if templates is None:
+    return None
+  return templates.take((formulation, backend, len(presolved.sizes), len(presolved.knapsacks)))
+
+def put_template(templates: Optional[TemplateCache], presolved: Presolved, formulation: str, backend: str,
+                 solver: Backend, model: MatrixModel) -> None:
+  if templates is not None:
+    templates.put((formulation, backend, len(presolved.sizes), len(presolved.knapsacks)), solver, model)
+
+# mode "heuristic" returns the greedy schedule without running the solver, "exact" solves the model to optimality,
+# starting from the greedy schedule unless warm_start is off, after presolving the instance unless presolve is off.
+# "decompose" solves a window of `window` gaps at a time (see scheduler/decompose.py), for instances with too many
+# gaps for one model. It is exact when all gaps fit in one window, and never worse than the greedy schedule.
+# "approximate" returns a schedule proven to be at most 1 + epsilon times the optimum (see solve_approximate).
+# When the greedy schedule meets the lower bound it is optimal, and it is returned without building a model; the
+# solve time is then the time of the heuristic and the bound.
+# With a cache, an instance that was solved before is answered from the cache without building a model; the solve
+# time is then the time of the lookup. The cache only holds optimal schedules, so it is only used with the exact
+# formulations (EXACT_FORMULATIONS). With templates, the model is patched into the solver of the last instance of
+# the same shape instead of loaded into a new one (see scheduler/templates.py).
+# The time of every phase, the size of the model and the solver's statistics go into stats if one is passed in.
+def solve(input: Input, formulation: str = "standard", backend: str = "scip", mode: str = "exact",
+          warm_start: bool = True, cache: Optional[SolutionCache] = None, presolve: bool = True,
+          stats: Optional[SolveStats] = None, window: int = WINDOW,
+          templates: Optional[TemplateCache] = None, epsilon: float = DEFAULT_EPSILON) -> Output:
+  global proved_by_bound
+  stats = SolveStats() if stats is None else stats
   (pictures, blackouts) = input
   num_pictures = len(pictures)
-  num_blackouts = len(blackouts)
+  if formulation not in EXACT_FORMULATIONS:
+    cache = None
 
   if not pictures or not blackouts:
     fail_with("Trivial solution")
 
-  knapsacks = get_knapsacks(pictures, blackouts)
+  with stats.phase("knapsacks"):
+    knapsacks = get_knapsacks(pictures, blackouts)
+    starts = get_starts(blackouts)
   num_knapsacks = len(knapsacks)
   print("Knapsacks:", knapsacks)
   #print()
 
-  solver = pywraplp.Solver.CreateSolver("SCIP") or fail_with("SCIP solver unavailable")
-
-  #
-  # DECISION VARIABLES
-  #
-
-  # x[p][k] is 1 if picture `p` is in knapsack `k`
-  x = [[solver.BoolVar(f"x[{p}, {k}]") for k in range(num_knapsacks)] for p in range(num_pictures)]
-
-  # c[k] if knapsack k is used
-  c = [solver.BoolVar(f"c[{k}]") for k in range(num_knapsacks)]
-
-  # l[k] if knapsack k is last knapsack
-  l = [solver.BoolVar(f"l[{k}]") for k in range(num_knapsacks)]
-
-  # same as x but only for the last knapsack
-  z = [[solver.BoolVar(f"z[{p}, {k}]") for k in range(num_knapsacks)] for p in range(num_pictures)]
-
-  #
-  # CONSTRAINTS
-  #
-
-  # Constraint: Each picture is in exactly one knapsack
-  for p in range(num_pictures):
-    solver.Add(sum(x[p][k] for k in range(num_knapsacks)) == 1)
-
-  # Constraint: The length of the pictures in each knapsack cannot exceed its capacity
-  for k in range(num_knapsacks):
-    solver.Add(sum(x[p][k] * pictures[p] for p in range(num_pictures)) <= knapsacks[k])
-
-  # Constraint: Taking knapsacks from left, group the knapsacks by 1 first, then by  0
-  for k in range(1, num_knapsacks):
-    solver.Add((c[k] - c[k - 1]) <= 0)
-
-  # Constraint: All photos have to fit in used knapsacks
-  for k in range(1, num_knapsacks):
-    solver.Add(sum(x[p][k] - c[k] for p in range(num_pictures)) <= 0)
-
-  # l have to hold last knapsack position only. You can only have it on the position when k is 1
-  for k in range(num_knapsacks):
-    solver.Add(l[k] - c[k] <= 0)
-
-  # If you move by one and multiply it should be 0 (it should be on the position of rightmost 1)
-  for k in range(num_knapsacks - 1):
-    solver.Add(l[k] + c[k + 1] <= 1)
-
-  # There is just one last knapsack
-  solver.Add(sum(l[k] for k in range(num_knapsacks)) == 1)
-
-  # And set z properly (simulate logical operation (l[j] and x[i][j]))
-  for k in range(num_knapsacks):
-    for p in range(num_pictures):
-      solver.Add(1 - l[k] + z[p][k] <= 1)
-      solver.Add(1 - x[p][k] + z[p][k] <= 1)
-      solver.Add(x[p][k] + l[k] - z[p][k] <= 1)
-
-  #
-  # OBJECTIVE FUNCTION
-  #
-
-  knapsacks_used = []
-  for k in range(num_knapsacks - 1):
-    knapsacks_used.append(c[k + 1] * knapsacks[k])
-
-  photo_sizes_in_last_knapsack = []
-  for k in range(num_knapsacks):
-    for p in range(num_pictures):
-      photo_sizes_in_last_knapsack.append(z[p][k] * pictures[p])
-
-  # Objective: Minimize the coefficients of each picture in each knapsack
-  solver.Minimize(solver.Sum(knapsacks_used) + solver.Sum(photo_sizes_in_last_knapsack))
-
+  if mode == "approximate":
+    schedule = solve_approximate(input, epsilon, formulation, backend, stats=stats)
+    print("Pictures in knapsacks:", schedule.knaps)
+    print("Total time:", schedule.total_time, "lower bound:", schedule.bound, "gap:", f"{schedule.gap:.2%}")
+    with stats.phase("output"):
+      return get_output(pictures, blackouts, knapsacks, schedule.knaps, schedule.elapsed, 0.)
+
+  if cache is not None and mode == "exact":
+    start = timeit.default_timer()
+    with stats.phase("cache"):
+      knaps = cache.get(pictures, blackouts)
+    if knaps is not None:
+      print("Pictures in knapsacks:", knaps)
+      with stats.phase("output"):
+        return get_output(pictures, blackouts, knapsacks, knaps, timeit.default_timer() - start, 0.)
+
+  # Greedy schedule: first fit decreasing and swaps between neighbouring knapsacks
   start = timeit.default_timer()
-  # Run the solver
-  status = solver.Solve()
-  if status != pywraplp.Solver.OPTIMAL:
+  with stats.phase("heuristic"):
+    greedy = greedy_schedule(pictures, knapsacks)
+  heuristic_time = timeit.default_timer() - start
+
+  if mode == "heuristic":
+    print("Pictures in knapsacks:", greedy)
+    with stats.phase("output"):
+      output = get_output(pictures, blackouts, knapsacks, greedy, heuristic_time, 0.)
+    with stats.phase("bound"):
+      bound = lower_bound(pictures, knapsacks, starts, output[0])
+    print("Total time:", output[0], "lower bound:", bound, "gap:", f"{(output[0] - bound) / output[0]:.2%}")
+    return output
+
+  with stats.phase("bound"):
+    proved = prove_greedy(pictures, blackouts, knapsacks, starts, greedy)
+  if proved is not None:
+    proved_by_bound += 1
+    print("Pictures in knapsacks:", greedy)
+    if cache is not None:
+      cache.put(pictures, blackouts, greedy)
+    with stats.phase("output"):
+      return get_output(pictures, blackouts, knapsacks, greedy, timeit.default_timer() - start, 0.)
+
+  with stats.phase("presolve"):
+    presolved = get_presolved(pictures, knapsacks, starts, greedy, presolve)
+
+  if mode == "decompose":
+    with stats.phase("solve"):
+      counts = rolling_horizon(presolved, formulation, backend, window)
+    with stats.phase("extract"):
+      knaps = greedy if counts is None else expand_knaps(presolved, counts.ravel())
+    if get_times(pictures, blackouts, greedy)[0] < get_times(pictures, blackouts, knaps)[0]:
+      knaps = greedy
+    print("Pictures in knapsacks:", knaps)
+    with stats.phase("output"):
+      return get_output(pictures, blackouts, knapsacks, knaps, timeit.default_timer() - start, 0.)
+
+  template = take_template(templates, presolved, formulation, backend)
+  (solver, build_time, model) = load_solver(presolved, greedy, formulation, backend, warm_start, template, stats)
+
+  # Run the solver. The total time is a whole number of ticks (see scheduler/fixed_point.py), 10^-decimals seconds
+  # for durations written with that many decimals, so a gap of less than half a tick proves the optimum itself rather
+  # than one within the solver's default relative gap.
+  relative_gap = None
+  tick = tick_size(input)
+  greedy_time = get_times(pictures, blackouts, greedy)[0]
+  if tick is not None and greedy_time > 0:
+    relative_gap = 0.5 * tick / greedy_time
+  with stats.phase("solve"):
+    solution = solver.solve(relative_gap=relative_gap)
+  stats.count_solution(solution)
+  put_template(templates, presolved, formulation, backend, solver, model)
+  if solution.status != "OPTIMAL":
     fail_with("No optimal solution")
-  solve_time = timeit.default_timer() - start
-  #print("Solve time:", time.time() - start, "seconds")
+  # The greedy schedule is only needed for the warm start and the presolve
+  solve_time = solution.solve_time + (heuristic_time if warm_start or presolve else 0.)
+  #print("Solve time:", solve_time, "seconds")
 
-  # Compute list of pictures, grouped by their knapsack
-  knaps = [[p for p in range(num_pictures) if x[p][k].solution_value()] for k in range(num_knapsacks)]
+  with stats.phase("extract"):
+    knaps = expand_knaps(presolved, solution.values)
   print("Pictures in knapsacks:", knaps)
-  filled = []
+  if cache is not None:
+    cache.put(pictures, blackouts, knaps)
 
-  for i in range(len(knaps)):
-      diff = knapsacks[i] - sum(knaps[i])
-      if len(knaps[i]) == 0 or diff > 0:
-          filled.append(False)
-      else:
-          filled.append(True)
-
-  num_full_knaps = sum(1 for i in filled if i)
-  num_used_knaps = max([i for i in range(num_knapsacks) if len(knaps[i]) > 0])
-
-
-  '''
   # Output all variables
-  for k in range(num_knapsacks):
-    print("Is used", c[k].name(), c[k].solution_value(), "  Is last", l[k].name(), l[k].solution_value())
-    for p in range(num_pictures):
-      print(z[p][k].name(), z[p][k].solution_value(), "  ", x[p][k].name(), x[p][k].solution_value())
-  '''
-
-  # Total time required to send all pictures
-  times = [0.] * num_pictures
-  t = 0
-
-  for i, knap in enumerate(knaps):
-    if i > 0:
-      t = blackouts[i - 1][1]
-
-    for p in knap:
-      times[p] = t
-      t += pictures[p]
-
-  last_pic = max(times)
-  total_time = last_pic + pictures[times.index(last_pic)]
+  #print(solution.values)
+
+  with stats.phase("output"):
+    return get_output(pictures, blackouts, knapsacks, knaps, solve_time, build_time)
+
+# Anytime solving: stops at the time limit (seconds) or once the relative gap to the bound is small enough, and returns
+# the best schedule found so far with the solver's status and bound instead of failing. The greedy schedule is the
+# first one, so there always is a schedule, and if it meets the lower bound it comes back with the status
+# PROVED_BY_BOUND without running the solver. on_solution is called with every schedule that improves on the last one.
+# solver is a backend to load the model into instead of a new one (see load_solver), templates are used like by solve
+# when there is none, stats is filled in like by solve.
+def solve_anytime(input: Input, formulation: str = "standard", backend: str = "scip",
+                  time_limit: Optional[float] = None, relative_gap: Optional[float] = None,
+                  on_solution: Optional[Callable[[Schedule], None]] = None, warm_start: bool = True,
+                  presolve: bool = True, solver: Optional[Backend] = None,
+                  stats: Optional[SolveStats] = None, templates: Optional[TemplateCache] = None) -> Schedule:
+  stats = SolveStats() if stats is None else stats
+  (pictures, blackouts) = input
+  if not pictures or not blackouts:
+    fail_with("Trivial solution")
 
-  return (total_time, times, solve_time, num_full_knaps, num_used_knaps, num_knapsacks)
+  start = timeit.default_timer()
+  with stats.phase("knapsacks"):
+    knapsacks = get_knapsacks(pictures, blackouts)
+    starts = get_starts(blackouts)
+  with stats.phase("heuristic"):
+    greedy = greedy_schedule(pictures, knapsacks)
+  with stats.phase("bound"):
+    proved = prove_greedy(pictures, blackouts, knapsacks, starts, greedy)
+  if proved is not None:
+    (total_time, times) = proved
+    schedule = Schedule(PROVED_BY_BOUND, total_time, times, greedy, total_time, timeit.default_timer() - start)
+    if on_solution:
+      on_solution(schedule)
+    return schedule
+  with stats.phase("presolve"):
+    presolved = get_presolved(pictures, knapsacks, starts, greedy, presolve)
+
+  get_bound = lambda bound: total_time_bound(formulation, bound, pictures, presolved.knapsacks, presolved.starts)
+
+  def get_schedule(status: str, knaps: list[list[int]], bound: float) -> Schedule:
+    (total_time, times) = get_times(pictures, blackouts, knaps)
+    return Schedule(status, total_time, times, knaps, bound, timeit.default_timer() - start)
+
+  best = get_schedule("FEASIBLE", greedy, 0.)
+  if on_solution:
+    on_solution(best)
+
+  def improved(values: np.ndarray, objective: float, bound: float) -> None:
+    nonlocal best
+    found = get_schedule("FEASIBLE", expand_knaps(presolved, values), get_bound(bound))
+    if found.total_time < best.total_time:
+      best = found
+      on_solution(found)
+
+  template = None if solver is not None else take_template(templates, presolved, formulation, backend)
+  (solver, _, model) = load_solver(presolved, greedy, formulation, backend, warm_start, solver or template, stats)
+  with stats.phase("solve"):
+    solution = solver.solve(time_limit, relative_gap, improved if on_solution else None)
+  stats.count_solution(solution)
+  if template is not None:
+    put_template(templates, presolved, formulation, backend, solver, model)
+
+  bound = get_bound(solution.bound)
+  if solution.status in ("OPTIMAL", "FEASIBLE"):
+    with stats.phase("extract"):
+      knaps = expand_knaps(presolved, solution.values)
+    found = get_schedule(solution.status, knaps, bound)
+    if solution.status == "OPTIMAL" or found.total_time < best.total_time:
+      return found
+  return best._replace(bound=bound, elapsed=timeit.default_timer() - start)
+
+# The schedules of solve_anytime as a generator: every improving schedule as soon as the solver finds it,
+# then the final one with the solver's status and bound. The solver runs in a thread.
+def iter_solutions(input: Input, formulation: str = "standard", backend: str = "scip",
+                   time_limit: Optional[float] = None, relative_gap: Optional[float] = None,
+                   warm_start: bool = True, presolve: bool = True) -> Iterator[Schedule]:
+  found: Queue = Queue()
+  done = object()
+
+  def run() -> None:
+    try:
+      found.put(solve_anytime(input, formulation, backend, time_limit, relative_gap, found.put, warm_start, presolve))
+    finally:
+      found.put(done)
+
+  Thread(target=run, daemon=True).start()
+  while (schedule := found.get()) is not done:
+    yield schedule
+
+# Approximation (see scheduler/approximate.py): the picture lengths are put into geometric classes of width delta,
+# epsilon / 4 at first. The instance with the lengths rounded up is solved to a relative gap of epsilon / 4 for a
+# schedule and, when the lower bound of the instance itself does not prove that schedule yet, the instance with the
+# lengths rounded down for a better bound. The rounding moves the optimum of each by about delta and each solve stops
+# within epsilon / 4, so the two usually end up within 1 + epsilon of each other. Once the total time is at most
+# 1 + epsilon times the bound the schedule comes back with the status APPROXIMATE, otherwise delta is halved until
+# every length is a class of its own. Larger epsilons give fewer classes, smaller models and larger gaps for the
+# solver. After time_limit seconds the best schedule so far comes back as FEASIBLE with its bound.
+def solve_approximate(input: Input, epsilon: float = DEFAULT_EPSILON, formulation: str = "compact",
+                      backend: str = "scip", time_limit: Optional[float] = None,
+                      stats: Optional[SolveStats] = None) -> Schedule:
+  stats = SolveStats() if stats is None else stats
+  (pictures, blackouts) = input
+  if not pictures or not blackouts:
+    fail_with("Trivial solution")
 
-def main(input_path):
-  input = parse_input(input_path)
-  (total_time, times, solve_time, num_full_knaps, num_used_knaps, num_knapsacks) = solve(input)
+  start = timeit.default_timer()
+  with stats.phase("knapsacks"):
+    knapsacks = get_knapsacks(pictures, blackouts)
+    starts = get_starts(blackouts)
+  with stats.phase("heuristic"):
+    best = greedy_schedule(pictures, knapsacks)
+  (total_time, times) = get_times(pictures, blackouts, best)
+  with stats.phase("bound"):
+    bound = lower_bound(pictures, knapsacks, starts, total_time)
+
+  end = None if time_limit is None else start + time_limit
+  left = lambda: None if end is None else max(0., end - timeit.default_timer())
+  lengths = len(set(pictures))
+  (delta, num_classes) = (epsilon / 4, 0)
+  while not within(total_time, bound, epsilon) and left() != 0.:
+    classes = size_classes(pictures, delta)
+    # A smaller delta that gives the same classes gives the same instances
+    if len(np.unique(classes)) > num_classes:
+      num_classes = len(np.unique(classes))
+      (up, down) = round_pictures(pictures, classes)
+      print(f"Approximation: {num_classes} classes of {lengths} lengths (delta {delta:.3g})")
+      found = solve_anytime((up, blackouts), formulation, backend, left(), epsilon / 4, stats=stats)
+      if get_times(pictures, blackouts, found.knaps)[0] < total_time:
+        best = found.knaps
+        (total_time, times) = get_times(pictures, blackouts, best)
+      if num_classes == lengths:
+        # The lengths were not rounded, so the solver's bound is one of the instance itself
+        bound = max(bound, found.bound)
+        break
+      if not within(total_time, bound, epsilon) and left() != 0.:
+        bound = max(bound, solve_anytime((down, blackouts), formulation, backend, left(), epsilon / 4,
+                                         stats=stats).bound)
+    delta /= 2
+
+  status = APPROXIMATE if within(total_time, bound, epsilon) else "FEASIBLE"
+  return Schedule(status, total_time, times, best, bound, timeit.default_timer() - start)
+
+# Writes a schedule of the instance (in seconds) as a table of its pictures to path and one of its knapsacks next to it,
+# in the format of the extension (see scheduler/results.py)
+def write_output(path: str, input: Input, knaps: list[list[int]]) -> None:
+  (pictures, blackouts) = input
+  knapsacks = get_knapsacks(pictures, blackouts)
+  write_schedule(path, pictures, blackouts, knapsacks, assign(pictures, blackouts, knaps, knapsacks))
+
+# With show_stats the time of every phase and the size of the model are printed. The run can be written as a cProfile
+# file (profile_path, for pstats or snakeviz) and its phases as a Chrome trace (trace_path, for chrome://tracing).
+# The schedule is written to output_path if one is given (see write_output).
+def main(input_path, formulation="standard", backend="scip", mode="exact", warm_start=True, cache_path=None, presolve=True,
+         show_stats=False, profile_path=None, trace_path=None, window=WINDOW, fixed_point=False, output_path=None,
+         epsilon=DEFAULT_EPSILON):
+  stats = SolveStats()
+  profiler = cProfile.Profile() if profile_path else None
+  if profiler:
+    profiler.enable()
+  with stats.phase("parse"):
+    input = seconds = parse_input(input_path)
+    # In ticks from here on, and in seconds again once it is solved
+    if fixed_point:
+      (input, scale) = to_fixed_point(seconds)
+      print("Fixed point:", scale, "ticks per second")
+  cache = None if cache_path is None else SolutionCache(path=cache_path)
+  output = solve(input, formulation, backend, mode, warm_start, cache, presolve, stats, window, epsilon=epsilon)
+  if fixed_point:
+    output = from_fixed_point(output, scale)
+  (total_time, times, solve_time, num_full_knaps, num_used_knaps, num_knapsacks, build_time) = output
+  if cache is not None:
+    cache.close()
+  if profiler:
+    profiler.disable()
+    profiler.dump_stats(profile_path)
+
+  if show_stats:
+    print(stats.describe())
+  if trace_path:
+    stats.write_trace(trace_path, input_path)
+  if output_path:
+    write_output(output_path, seconds, get_knaps(seconds[1], times))
 
   #print("Total time:", total_time)
   #print("Sending times:", times)
 
-  return (solve_time, total_time, num_full_knaps, num_used_knaps, num_knapsacks)
+  return (solve_time, total_time, num_full_knaps, num_used_knaps, num_knapsacks, build_time)
 
 if __name__ == "__main__":
-  INSTANCE_PATH = argv[1]
-  #INSTANCE_PATH = "../../experiment_instances/11_2.txt"
-
-  main(INSTANCE_PATH)
+  parser = ArgumentParser(description="Find the optimal sending times of the pictures in an instance file.")
+  parser.add_argument("instance", help="path to the instance text file")
+  parser.add_argument("--formulation", choices=list(FORMULATIONS), default="standard")
+  parser.add_argument("--backend", choices=list(BACKENDS), default="scip")
+  parser.add_argument("--mode", choices=MODES, default="exact",
+                      help="heuristic: only the greedy schedule, no solver; decompose: a window of gaps at a time; "
+                           "approximate: within 1 + epsilon of the optimum")
+  parser.add_argument("--epsilon", type=float, default=DEFAULT_EPSILON, help="allowed excess in approximate mode")
+  parser.add_argument("--window", type=int, default=WINDOW, help="gaps per model in decompose mode")
+  parser.add_argument("--no-warm-start", dest="warm_start", action="store_false",
+                      help="do not start the solver from the greedy schedule")
+  parser.add_argument("--time-limit", type=float, help="stop after this many seconds with the best schedule so far")
+  parser.add_argument("--gap", type=float, help="stop once the relative gap to the bound is below this")
+  parser.add_argument("--no-presolve", dest="presolve", action="store_false",
+                      help="keep identical pictures apart and all knapsacks in the model")
+  parser.add_argument("--cache", dest="cache_path", help="SQLite file of solved instances to look the instance up in")
+  parser.add_argument("--stats", dest="show_stats", action="store_true",
+                      help="print the time of every phase, the model size and the solver's node and iteration counts")
+  parser.add_argument("--profile", dest="profile_path", help="write a cProfile of the run to this file")
+  parser.add_argument("--trace", dest="trace_path", help="write the phases as a Chrome trace (JSON) to this file")
+  parser.add_argument("--fixed-point", action="store_true",
+                      help="solve in integer ticks of the smallest unit the instance is written in")
+  parser.add_argument("--output", dest="output_path",
+                      help="write the schedule to this .csv, .npz or .parquet file, its knapsacks next to it")
+  args = parser.parse_args()
+  #args.instance = "../../experiment_instances/11_2.txt"
+
+  if args.time_limit is None and args.gap is None:
+    main(args.instance, args.formulation, args.backend, args.mode, args.warm_start, args.cache_path, args.presolve,
+         args.show_stats, args.profile_path, args.trace_path, args.window, args.fixed_point, args.output_path,
+         args.epsilon)
+  else:
+    # Anytime: print every schedule that improves, then the final one
+    seconds = parse_input(args.instance)
+    (input, scale) = to_fixed_point(seconds) if args.fixed_point else (seconds, 1)
+    for schedule in iter_solutions(input, args.formulation, args.backend, args.time_limit, args.gap, args.warm_start,
+                                   args.presolve):
+      print(f"{schedule.elapsed:.3f}s {schedule.status} total time {schedule.total_time / scale:.3f}, "
+            f"gap {schedule.gap:.2%}")
+    print("Pictures in knapsacks:", schedule.knaps)
+    if args.output_path:
+      write_output(args.output_path, seconds, schedule.knaps)
@@ -27,6 +27,8 @@ def main():
         i += 1
 
     # distinguish between images and blackouts and also calculate the cumulative cost
+    # (sets, so finding out what an item is does not take a pass over the lists)
+    indexes_images, indexes_blackouts = set(indexes_images), set(indexes_blackouts)
     optimum, images, blackouts, output_image_start_positions = 0.0, [], [], []
     for i in range(len(items)):
         if i in indexes_images:
@@ -0,0 +1,66 @@
+from argparse import ArgumentParser
+import json
+import os
+import timeit
+import zlib
+
+from scheduler import DISTRIBUTIONS, generate, save_arrays, write_arrays
+
+# Writes a suite of generated instances (see scheduler/generate.py) to a folder: every combination of the numbers of
+# pictures, the numbers of blackouts per picture and the distributions, `repeats` times, with the known optimum and
+# positions in the file like the experiment instances. Every instance has its own seed, from the suite's seed and its
+# name, so an instance comes out the same whatever else is in the suite.
+# The suite is listed in <folder>.jsonl, one line per instance, which solve_many.py takes as it is.
+
+FORMATS = ["text", "npy", "both"]
+
+def main(folder, sizes=(100, 1000, 10000), densities=(0.1, 0.3), distributions=("uniform",), repeats=1,
+         low=1., high=10., decimals=2, seed=0, format="text"):
+  os.makedirs(folder, exist_ok=True)
+  start = timeit.default_timer()
+  (count, items) = (0, 0)
+
+  with open(os.path.normpath(folder) + ".jsonl", "w", encoding="UTF-8") as manifest:
+    for distribution in distributions:
+      for num_pictures in sizes:
+        for density in densities:
+          num_blackouts = round(num_pictures * density)
+          for r in range(repeats):
+            name = f"{distribution}_{num_pictures}_{num_blackouts}_{r}"
+            instance_seed = zlib.crc32(f"{seed}/{name}".encode())
+            arrays = generate(num_pictures, num_blackouts, low, high, decimals, distribution, instance_seed)
+
+            # With both, the .npy is the sidecar of the text file, which read_arrays(sidecar=True) loads instead
+            path = os.path.join(folder, name + (".npy" if format == "npy" else ".txt"))
+            if format != "npy":
+              write_arrays(path, arrays, decimals)
+            if format != "text":
+              save_arrays(path if format == "npy" else path + ".npy", arrays)
+
+            manifest.write(json.dumps({"path": path, "pictures": num_pictures, "blackouts": num_blackouts,
+                                       "distribution": distribution, "seed": instance_seed,
+                                       "optimum": arrays.expected}) + "\n")
+            count += 1
+            items += num_pictures + num_blackouts
+
+  elapsed = timeit.default_timer() - start
+  print(f"Wrote {count} instances ({items} pictures and blackouts) to {folder} in {elapsed:.3f}s")
+
+if __name__ == "__main__":
+  parser = ArgumentParser(description="Generate a suite of instances with known optima.")
+  parser.add_argument("folder", help="folder to write the instances to, the list of them goes to <folder>.jsonl")
+  parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="numbers of pictures")
+  parser.add_argument("--densities", type=float, nargs="+", default=[0.1, 0.3], help="blackouts per picture")
+  parser.add_argument("--distributions", nargs="+", choices=list(DISTRIBUTIONS), default=["uniform"],
+                      help="distributions of the picture and blackout lengths")
+  parser.add_argument("--repeats", type=int, default=1, help="instances per combination")
+  parser.add_argument("--low", type=float, default=1., help="shortest picture and blackout")
+  parser.add_argument("--high", type=float, default=10., help="longest picture and blackout")
+  parser.add_argument("--decimals", type=int, default=2)
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--format", choices=FORMATS, default="text",
+                      help="text files, binary .npy files or both (the .npy next to the text file)")
+  args = parser.parse_args()
+
+  main(args.folder, args.sizes, args.densities, args.distributions, args.repeats, args.low, args.high, args.decimals,
+       args.seed, args.format)
@@ -1,10 +1,9 @@
-#from more_itertools import pairwise
-from itertools import pairwise   # must have python 3.10 for this to work
-from ortools.linear_solver import pywraplp # type: ignore
 from sys import argv
-from typing import NoReturn
 import timeit
 
+from scheduler import Input, fail_with, parse_input, get_knapsacks, get_starts, get_times, build_weighted_model, get_backend, \
+  greedy_schedule, combinatorial_bound, proves_optimal
+
 # Algorithm overview:
 
 # Assuming we have K blackouts, we treat the problem as if we have K+1 knapsacks:
@@ -38,41 +37,9 @@ import timeit
 
 # Reference: https://developers.google.com/optimization/bin/multiple_knapsack
 
-def fail_with(message: str) -> NoReturn:
-  print(message)
-  exit(1)
-
-Blackout = tuple[float, float]
-Input = tuple[list[float], list[Blackout]]
-
-def parse_blackout(line: str) -> Blackout:
-  [start, duration] = map(float, line.split(","))
-  return (start, start + duration)
-
-def parse_input(path: str) -> Input:
-  with open(path, "r") as f:
-    num_pictures = int(f.readline())
-    pictures = [float(f.readline()) for _ in range(num_pictures)]
-
-    num_blackouts = int(f.readline())
-    blackouts = [parse_blackout(f.readline()) for _ in range(num_blackouts)]
-    blackouts.sort()
-
-    #print("Pictures:", pictures)
-    #print("Blackouts:", blackouts)
-
-    return (pictures, blackouts)
-
-# Turn a list of blackouts into a list of knapsacks.
-def get_knapsacks(pictures: list[float], blackouts: list[Blackout]) -> list[float]:
-  return \
-    [blackouts[0][0]] \
-    + [start - end for ((_, end), (start, _)) in pairwise(blackouts)] \
-    + [sum(pictures)]
-
 Output = tuple[float, list[float], float]
 
-def solve(input: Input) -> Output:
+def solve(input: Input, backend: str = "scip") -> Output:
   (pictures, blackouts) = input
   num_pictures = len(pictures)
 
@@ -81,56 +48,42 @@ def solve(input: Input) -> Output:
 
   knapsacks = get_knapsacks(pictures, blackouts)
   num_knapsacks = len(knapsacks)
+  starts = get_starts(blackouts)
   #print("Knapsacks:", knapsacks)
   #print()
 
-  solver = pywraplp.Solver.CreateSolver("SCIP") or fail_with("SCIP solver unavailable")
-
-  # x[p][k] is 1 if picture `p` is in knapsack `k`
-  x = [[solver.BoolVar(f"x[{p}, {k}]") for k in range(num_knapsacks)] for p in range(num_pictures)]
-
-  # Constraint: Each picture is in exactly one knapsack
-  for p in range(num_pictures):
-    solver.Add(sum(x[p][k] for k in range(num_knapsacks)) == 1)
-
-  # Constraint: The length of the pictures in each knapsack cannot exceed its capacity
-  for k in range(num_knapsacks):
-    solver.Add(sum(x[p][k] * pictures[p] for p in range(num_pictures)) <= knapsacks[k])
+  # A greedy schedule that meets the lower bound is optimal, then there is nothing left for the solver to do
+  start = timeit.default_timer()
+  (total_time, times) = get_times(pictures, blackouts, greedy_schedule(pictures, knapsacks))
+  if proves_optimal(total_time, combinatorial_bound(pictures, knapsacks, starts)):
+    print("Proved optimal by bound")
+    return (total_time, times, timeit.default_timer() - start)
 
-  # Objective: Minimize the coefficients of each picture in each knapsack
-  solver.Minimize(solver.Sum(x[p][k] * pictures[p] * (k + 1) ** 2 for k in range(num_knapsacks) for p in range(num_pictures)))
+  # x[p][k] is 1 if picture `p` is in knapsack `k`, each picture is in exactly one knapsack, the length of the
+  # pictures in each knapsack cannot exceed its capacity, and the objective minimizes the coefficients of each
+  # picture in each knapsack. See build_weighted_model in scheduler/formulations.py.
+  solver = get_backend(backend)
+  solver.load(build_weighted_model(pictures, knapsacks, starts))
 
-  start = timeit.default_timer()
   # Run the solver
-  status = solver.Solve()
-  if status != pywraplp.Solver.OPTIMAL:
+  solution = solver.solve()
+  if solution.status != "OPTIMAL":
     fail_with("No optimal solution")
-  solve_time = timeit.default_timer() - start
+  solve_time = solution.solve_time
 
   # Compute the output
-  knaps = [[p for p in range(num_pictures) if x[p][k].solution_value()] for k in range(num_knapsacks)]
+  x = solution.values[:num_pictures * num_knapsacks].reshape(num_pictures, num_knapsacks).round()
+  knaps = [[p for p in range(num_pictures) if x[p][k]] for k in range(num_knapsacks)]
   #print("Pictures in knapsacks:", knaps)
 
-  times = [0.] * num_pictures
-  t = 0
-
-  for i, knap in enumerate(knaps):
-    if i > 0:
-      t = blackouts[i - 1][1]
-
-    for p in knap:
-      times[p] = t
-      t += pictures[p]
-
-  last_pic = max(times)
-  total_time = last_pic + pictures[times.index(last_pic)]
+  (total_time, times) = get_times(pictures, blackouts, knaps)
 
   return (total_time, times, solve_time)
 
-def main(input_path):
+def main(input_path, backend="scip"):
   #input_path = argv[1]
   input = parse_input(input_path)
-  (total_time, times, solve_time) = solve(input)
+  (total_time, times, solve_time) = solve(input, backend)
 
   #print("Total time:", total_time)
   #print("Sending times:", times)
@@ -138,5 +91,5 @@ def main(input_path):
   return (solve_time, total_time)
 
 if __name__ == "__main__":
-  main(argv[1])
+  main(argv[1], argv[2] if len(argv) > 2 else "scip")
   #main("../../experiment_instances/10_4.txt")
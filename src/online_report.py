@@ -0,0 +1,77 @@
+import contextlib
+import io
+import os
+from argparse import ArgumentParser
+
+import numpy
+
+from scheduler import REOPTIMIZE_EVERY, OnlineScheduler, read_instance, validate, from_rows, write_table
+from solve_many import get_tasks
+
+# Competitive ratio of the online scheduler (scheduler/online.py): every instance is scheduled picture by picture in
+# the order of the file, once with first fit only and once with the reoptimizations, and the total times are
+# compared with the optimum in the file. With --rate the pictures arrive over time, `rate` per time unit, so gaps
+# close while the pictures come in; by default they all arrive at time 0 and only their order is unknown.
+# Writes one row per instance to online_results.csv (or .npz/.parquet, see scheduler/results.py) and prints the mean
+# and worst ratios and the throughput.
+
+EXPERIMENT_PATHS = ["../experiment_instances", "../experiment_instances_2"]
+RESULTS_PATH = "../online_results.csv"
+COLUMNS = ["case_number", "Num_images", "Num_blackouts", "optimal_time", "total_time_online", "ratio_online",
+           "total_time_reoptimized", "ratio_reoptimized", "pictures_per_second", "reoptimize_time", "improvements"]
+
+
+def run_online(pictures, blackouts, rate, reoptimize_every, time_limit):
+    scheduler = OnlineScheduler(blackouts, reoptimize_every=reoptimize_every, time_limit=time_limit)
+    for (i, size) in enumerate(pictures):
+        scheduler.add(size, None if rate is None else i / rate)
+    report = validate(pictures, blackouts, scheduler.times)
+    if not report.ok:
+        print("Schedule is not feasible:", report.describe())
+    return scheduler
+
+
+def results_table(rows):
+    table = from_rows(COLUMNS, rows)
+    for (name, decimals) in (("total_time_online", 3), ("ratio_online", 4), ("total_time_reoptimized", 3),
+                             ("ratio_reoptimized", 4), ("pictures_per_second", 0), ("reoptimize_time", 3)):
+        table[name] = table[name].round(decimals)
+    return table
+
+
+def main(paths=EXPERIMENT_PATHS, rate=None, reoptimize_every=REOPTIMIZE_EVERY, time_limit=1., output_path=RESULTS_PATH):
+    rows = []
+    for path in get_tasks(paths):
+        pictures, blackouts, optimum, _ = read_instance(path)
+        if not pictures or not blackouts or not optimum:
+            continue
+        online = run_online(pictures, blackouts, rate, None, time_limit)
+        with contextlib.redirect_stdout(io.StringIO()):
+            reoptimized = run_online(pictures, blackouts, rate, reoptimize_every, time_limit)
+        name = os.path.splitext(os.path.basename(path))[0]
+        rows.append((name, len(pictures), len(blackouts), optimum, online.total_time, online.total_time / optimum,
+                     reoptimized.total_time, reoptimized.total_time / optimum, online.throughput,
+                     reoptimized.reoptimize_time, reoptimized.improvements))
+        print(f"{name}: {rows[-1][5]:.4f} online, {rows[-1][7]:.4f} reoptimized, {rows[-1][8]:.0f} pictures/s")
+        # Written again after every instance, so an interrupted run keeps the rows it finished
+        write_table(output_path, results_table(rows))
+
+    ratios = numpy.array([(row[5], row[7], row[8]) for row in rows])
+    print(f"{len(rows)} instances, written to {output_path}")
+    print(f"Online: mean ratio {ratios[:, 0].mean():.4f}, worst {ratios[:, 0].max():.4f}")
+    print(f"Reoptimized every {reoptimize_every} pictures: mean ratio {ratios[:, 1].mean():.4f}, "
+          f"worst {ratios[:, 1].max():.4f}")
+    print(f"Throughput: {numpy.median(ratios[:, 2]):.0f} pictures/s (median over the instances)")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Compare the online scheduler with the offline optimum.")
+    parser.add_argument("paths", nargs="*", default=EXPERIMENT_PATHS, help="instance folders, files or globs")
+    parser.add_argument("--rate", type=float, help="pictures per time unit (all at time 0 by default)")
+    parser.add_argument("--reoptimize-every", type=int, default=REOPTIMIZE_EVERY,
+                        help="pictures between two reoptimizations")
+    parser.add_argument("--time-limit", type=float, default=1., help="seconds per window of a reoptimization")
+    parser.add_argument("--output", dest="output_path", default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    main(args.paths, args.rate, args.reoptimize_every, args.time_limit, args.output_path)
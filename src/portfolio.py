@@ -0,0 +1,251 @@
+from argparse import ArgumentParser
+from collections import Counter, defaultdict
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import wait
+from typing import Callable, NamedTuple, Optional
+import contextlib
+import io
+import json
+import os
+import timeit
+import numpy as np
+
+import dp_solver
+import formula_2
+from scheduler import Input, Schedule, fail_with, parse_input, get_knapsacks, get_starts, get_times, \
+  build_weighted_model, get_backend, greedy_schedule, PROVED_BY_BOUND, combinatorial_bound, lower_bound, \
+  proves_optimal
+from solve_many import get_tasks
+
+# Races several strategies on one instance, each in a process of its own: the ILP of formula_2 in either formulation
+# with SCIP or CP-SAT, dp_solver, the weighted formulation of multi_knap.py checked against the lower bound, and the
+# greedy schedule with the LP bound. As soon as a strategy proves its schedule optimal the others are killed; the
+# winner is the strategy that sent the best schedule, which is not always the one that proved it. At the deadline the
+# best schedule any of them sent so far wins. The greedy schedule is the first one, and
+# when it meets the combinatorial bound no process is started at all. Every race is appended to a log of JSON lines
+# (which strategy won, how and when every strategy ended), and `--summary` counts the wins per class of instances.
+
+DEFAULT_LOG = "../portfolio_log.jsonl"
+# Part of the deadline the strategies get as their time limit, so the solvers without callbacks still send their
+# best schedule before they are killed
+DEADLINE_SHARE = 0.8
+
+# A strategy solves an instance within the time limit (none if None) with the given number of threads and returns its
+# best Schedule. It calls on_solution with the better schedules it finds on the way, where it can.
+Strategy = Callable[[Input, Optional[float], int, Callable[[Schedule], None]], Schedule]
+
+def anytime(formulation: str, backend: str) -> Strategy:
+  def run(input: Input, time_limit: Optional[float], threads: int, on_solution: Callable[[Schedule], None]) -> Schedule:
+    return formula_2.solve_anytime(input, formulation, backend, time_limit, on_solution=on_solution,
+                                   solver=get_backend(backend, threads))
+  return run
+
+def run_dp(input: Input, time_limit: Optional[float], threads: int, on_solution: Callable[[Schedule], None]) -> Schedule:
+  return dp_solver.solve_anytime(input, time_limit)
+
+# The objective of the weighted formulation is not the total time, so its schedule is only optimal if it meets the
+# lower bound
+def run_weighted(input: Input, time_limit: Optional[float], threads: int,
+                 on_solution: Callable[[Schedule], None]) -> Schedule:
+  start = timeit.default_timer()
+  (pictures, blackouts) = input
+  knapsacks = get_knapsacks(pictures, blackouts)
+  starts = get_starts(blackouts)
+  (P, K) = (len(pictures), len(knapsacks))
+  solver = get_backend("scip", threads)
+  solver.load(build_weighted_model(pictures, knapsacks, starts))
+  solution = solver.solve(time_limit)
+  if solution.status not in ("OPTIMAL", "FEASIBLE"):
+    fail_with("No solution")
+  x = solution.values[:P * K].reshape(P, K).round()
+  knaps = [np.flatnonzero(x[:, k]).tolist() for k in range(K)]
+  (total_time, times) = get_times(pictures, blackouts, knaps)
+  bound = lower_bound(pictures, knapsacks, starts, total_time)
+  status = "OPTIMAL" if proves_optimal(total_time, bound) else "FEASIBLE"
+  return Schedule(status, total_time, times, knaps, bound, timeit.default_timer() - start)
+
+def run_heuristic(input: Input, time_limit: Optional[float], threads: int,
+                  on_solution: Callable[[Schedule], None]) -> Schedule:
+  start = timeit.default_timer()
+  (pictures, blackouts) = input
+  knapsacks = get_knapsacks(pictures, blackouts)
+  knaps = greedy_schedule(pictures, knapsacks)
+  (total_time, times) = get_times(pictures, blackouts, knaps)
+  bound = lower_bound(pictures, knapsacks, get_starts(blackouts), total_time)
+  status = "OPTIMAL" if proves_optimal(total_time, bound) else "FEASIBLE"
+  return Schedule(status, total_time, times, knaps, bound, timeit.default_timer() - start)
+
+STRATEGIES: dict[str, Strategy] = {
+  "compact-scip": anytime("compact", "scip"),
+  "standard-scip": anytime("standard", "scip"),
+  "compact-cp-sat": anytime("compact", "cp-sat"),
+  "dp": run_dp,
+  "weighted": run_weighted,
+  "heuristic": run_heuristic,
+}
+
+# How a strategy ended in a race: its last status (CANCELLED when it was killed, ERROR when it failed), the total time
+# of the best schedule it sent (None without one) and the seconds from the start of the race to its last message
+class Outcome(NamedTuple):
+  status: str
+  total_time: Optional[float]
+  elapsed: float
+
+class Race(NamedTuple):
+  schedule: Schedule
+  # The strategy that sent the schedule ("greedy" for the greedy schedule of the race itself), whichever strategy
+  # proved it optimal
+  winner: str
+  # PROVEN when a strategy proved its schedule optimal (or a bound sent by any strategy meets the best schedule),
+  # DEADLINE when the deadline came first and FINISHED when every strategy ended without a proof
+  reason: str
+  outcomes: dict[str, Outcome]
+
+# Runs in the strategy's process: sends ("solution", schedule) for every better schedule, then ("done", schedule),
+# or ("error", reason) if the strategy fails
+def run_strategy(connection, name: str, input: Input, time_limit: Optional[float], threads: int) -> None:
+  printed = io.StringIO()
+  try:
+    with contextlib.redirect_stdout(printed):
+      schedule = STRATEGIES[name](input, time_limit, threads, lambda found: connection.send(("solution", found)))
+    connection.send(("done", schedule))
+  except (SystemExit, Exception) as error:
+    # fail_with prints the reason before it exits
+    lines = printed.getvalue().splitlines()
+    connection.send(("error", lines[-1] if isinstance(error, SystemExit) and lines else repr(error)))
+
+# Races the strategies on the instance, for at most deadline seconds (until one proves the optimum if None)
+def race(input: Input, strategies: Optional[list[str]] = None, deadline: Optional[float] = None) -> Race:
+  strategies = list(STRATEGIES) if strategies is None else strategies
+  for name in strategies:
+    if name not in STRATEGIES:
+      fail_with(f"Unknown strategy {name}, choose from {', '.join(STRATEGIES)}")
+  (pictures, blackouts) = input
+  if not pictures or not blackouts:
+    fail_with("Trivial solution")
+
+  start = timeit.default_timer()
+  knapsacks = get_knapsacks(pictures, blackouts)
+  greedy = greedy_schedule(pictures, knapsacks)
+  (total_time, times) = get_times(pictures, blackouts, greedy)
+  bound = combinatorial_bound(pictures, knapsacks, get_starts(blackouts))
+  best = Schedule("FEASIBLE", total_time, times, greedy, bound, timeit.default_timer() - start)
+  if proves_optimal(total_time, bound):
+    return Race(best._replace(status=PROVED_BY_BOUND), "greedy", "PROVEN", {})
+
+  # The strategies share the cores, so CP-SAT gets its part of them
+  threads = max(1, (os.cpu_count() or 1) // len(strategies))
+  time_limit = None if deadline is None else max(0., DEADLINE_SHARE * deadline - best.elapsed)
+  running = {}  # receiving end of the pipe -> (strategy, process)
+  for name in strategies:
+    receiver, sender = Pipe(duplex=False)
+    process = Process(target=run_strategy, args=(sender, name, input, time_limit, threads), daemon=True)
+    process.start()
+    sender.close()
+    running[receiver] = (name, process)
+
+  outcomes = {name: Outcome("RUNNING", None, 0.) for name in strategies}
+  (winner, reason) = ("greedy", "FINISHED")
+
+  # Takes one message of a strategy, and the strategy out of the race once it is done
+  def receive(receiver) -> None:
+    nonlocal best, bound, winner, reason
+    (name, process) = running[receiver]
+    try:
+      (kind, found) = receiver.recv()
+    except EOFError:
+      (kind, found) = ("error", f"exit code {process.exitcode}")
+    elapsed = timeit.default_timer() - start
+    if kind == "error":
+      outcomes[name] = Outcome("ERROR", outcomes[name].total_time, elapsed)
+    else:
+      previous = outcomes[name].total_time
+      total_time = found.total_time if previous is None else min(previous, found.total_time)
+      outcomes[name] = Outcome(found.status if kind == "done" else "RUNNING", total_time, elapsed)
+      bound = max(bound, found.bound)
+      if found.total_time < best.total_time:
+        (best, winner) = (found._replace(elapsed=elapsed), name)
+      # A proof for a schedule that is no better than best proves best too; the winner stays the one that sent it
+      if kind == "done" and found.status in ("OPTIMAL", PROVED_BY_BOUND):
+        reason = "PROVEN"
+      elif proves_optimal(best.total_time, bound):
+        reason = "PROVEN"
+    if kind != "solution":
+      process.join()
+      receiver.close()
+      del running[receiver]
+
+  end = None if deadline is None else start + deadline
+  while running and reason != "PROVEN":
+    ready = wait(list(running), timeout=None if end is None else max(0., end - timeit.default_timer()))
+    if not ready:
+      reason = "DEADLINE"
+    for receiver in ready:
+      if receiver in running and reason != "PROVEN":
+        receive(receiver)
+    if reason == "DEADLINE":
+      break
+
+  # The schedules that were already sent still count, then the rest is killed
+  for receiver in list(running):
+    while receiver in running and receiver.poll() and reason != "PROVEN":
+      receive(receiver)
+  for (receiver, (name, process)) in running.items():
+    process.kill()
+    process.join()
+    receiver.close()
+    outcomes[name] = outcomes[name]._replace(status="CANCELLED", elapsed=timeit.default_timer() - start)
+
+  status = "OPTIMAL" if reason == "PROVEN" else "FEASIBLE"
+  schedule = best._replace(status=status, bound=max(bound, best.bound), elapsed=timeit.default_timer() - start)
+  return Race(schedule, winner, reason, outcomes)
+
+# The class of an instance for the summary: the part of its name before the first underscore (4 for 4_5.txt)
+def instance_class(name: str) -> str:
+  return os.path.basename(name).split("_")[0]
+
+def log_race(path: str, name: str, input: Input, result: Race) -> None:
+  schedule = result.schedule
+  entry = {"instance": name, "class": instance_class(name), "pictures": len(input[0]), "blackouts": len(input[1]),
+           "winner": result.winner, "reason": result.reason, "status": schedule.status,
+           "total_time": schedule.total_time, "bound": schedule.bound, "elapsed": schedule.elapsed,
+           "strategies": {strategy: outcome._asdict() for (strategy, outcome) in result.outcomes.items()}}
+  with open(path, "a", encoding="UTF-8") as f:
+    f.write(json.dumps(entry) + "\n")
+
+# The wins of every strategy per class of instances in the log, and per class the strategy that won most
+def summarize(path: str) -> str:
+  wins: dict[str, Counter] = defaultdict(Counter)
+  with open(path, "r", encoding="UTF-8") as f:
+    for line in f:
+      if line.strip():
+        entry = json.loads(line)
+        wins[entry["class"]][entry["winner"]] += 1
+  lines = []
+  for (name, counter) in sorted(wins.items()):
+    counts = ", ".join(f"{strategy} {count}" for (strategy, count) in counter.most_common())
+    lines.append(f"{name}: {counter.most_common(1)[0][0]} ({counts})")
+  return "\n".join(lines)
+
+def main(sources, strategies=None, deadline=None, log_path=DEFAULT_LOG):
+  for task in get_tasks(sources):
+    (name, input) = (task, parse_input(task)) if isinstance(task, str) else task
+    with contextlib.redirect_stdout(io.StringIO()):
+      result = race(input, strategies, deadline)
+    log_race(log_path, name, input, result)
+    print(f"{name}: {result.winner} ({result.reason}) total time {result.schedule.total_time:.3f}, "
+          f"gap {result.schedule.gap:.2%}, {result.schedule.elapsed:.3f}s")
+
+if __name__ == "__main__":
+  parser = ArgumentParser(description="Race several strategies on every instance and keep the first proven optimum.")
+  parser.add_argument("sources", nargs="*", help="instance files, folders, globs, .jsonl files or - for JSON lines on stdin")
+  parser.add_argument("--strategies", nargs="+", choices=list(STRATEGIES), help="all of them by default")
+  parser.add_argument("--deadline", type=float, help="seconds per instance, after which the best schedule wins")
+  parser.add_argument("--log", dest="log_path", default=DEFAULT_LOG, help="JSON lines file the races are appended to")
+  parser.add_argument("--summary", action="store_true", help="print the wins per class of instances in the log")
+  args = parser.parse_args()
+
+  if args.sources:
+    main(args.sources, args.strategies, args.deadline, args.log_path)
+  if args.summary:
+    print(summarize(args.log_path))
@@ -0,0 +1,27 @@
+from .instance import (
+  Blackout, Input, Instance, fail_with, parse_blackout, InstanceArrays, parse_arrays, save_arrays, load_arrays,
+  format_arrays, write_arrays, is_sidecar, read_arrays, read_instance, parse_input, get_knapsacks, get_starts,
+  Assignment, assign, get_times, get_knaps, Output, get_output, Schedule,
+)
+from .formulations import (
+  Block, block, MatrixModel, matrix_model, build_standard_model, build_compact_model, build_weighted_model,
+  FORMULATIONS, get_assignment, standard_solution, compact_solution, weighted_solution, SOLUTIONS, total_time_bound,
+)
+from .backends import Solution, OnSolution, Backend, PywraplpBackend, CpSatBackend, BACKENDS, get_backend
+from .heuristic import first_fit_decreasing, improve, greedy_schedule, lp_bound
+from .incremental import Scheduler
+from .cache import instance_key, SolutionCache
+from .presolve import Presolved, presolve_instance, no_presolve, reduce_knaps, expand_knaps, describe
+from .validate import TOLERANCE, Violation, Report, validate
+from .bounds import PROVED_BY_BOUND, combinatorial_bound, lower_bound, proves_optimal
+from .stats import PHASES, COLUMNS, SolveStats
+from .generate import DISTRIBUTIONS, generate
+from .decompose import WINDOW, fill_counts, rolling_horizon
+from .online import REOPTIMIZE_EVERY, GapIndex, OnlineScheduler
+from .fixed_point import MAX_DECIMALS, instance_decimals, tick_size, scale_values, to_fixed_point, from_fixed_point
+from .results import (
+  Table, FORMATS, as_column, from_rows, table_format, format_csv, write_table, read_table, picture_table,
+  knapsack_table, knapsacks_path, write_schedule,
+)
+from .templates import SOLVER_BYTES, MODEL_FACTOR, MAX_BYTES, Shape, model_bytes, footprint, TemplateCache
+from .approximate import APPROXIMATE, DEFAULT_EPSILON, size_classes, round_pictures, within
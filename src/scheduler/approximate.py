@@ -0,0 +1,47 @@
+import numpy as np
+
+from .bounds import TOLERANCE
+
+# Size classes for the approximation mode of formula_2 (solve_approximate). The picture lengths are put into
+# geometric classes: lengths within a factor 1 + delta of each other share a class, so the presolved model has a
+# group per class instead of per length and gets smaller as delta grows. Every picture is then rounded up to the
+# longest length of its class, which gives an instance whose schedules are also schedules of the instance itself (no
+# gap gets more than it had) with a total time at least as large, and down to the shortest, which gives an instance
+# whose optimum is at most the optimum of the instance itself (every schedule of the instance still fits), so a bound
+# on it is a bound on the instance. No polynomial algorithm can promise a factor 1 + epsilon on every instance, since
+# deciding whether the pictures fit before a long blackout is bin packing; so the factor is proven for the schedule
+# that comes out, against these bounds, and the classes are made finer until it is. With delta 0 every length is a
+# class of its own and both instances are the instance itself.
+
+# Status of a schedule that is proven to be at most 1 + epsilon times the optimum
+APPROXIMATE = "APPROXIMATE"
+DEFAULT_EPSILON = 0.05
+
+# The class of every picture: 0 for the shortest length up to 1 + delta times it, and so on. Pictures of length 0
+# have a class of their own (-1).
+def size_classes(pictures: list[float], delta: float) -> np.ndarray:
+  sizes = np.asarray(pictures, dtype=float)
+  positive = sizes > 0
+  if not positive.any():
+    return np.full(len(sizes), -1)
+  if delta <= 0:
+    return np.where(positive, np.unique(sizes, return_inverse=True)[1], -1)
+  shortest = sizes[positive].min()
+  ratio = np.log(np.where(positive, sizes, shortest) / shortest) / np.log1p(delta)
+  # A length of exactly (1 + delta)^i times the shortest starts class i, whatever the logarithms round to
+  return np.where(positive, np.floor(ratio + TOLERANCE).astype(np.int64), -1)
+
+# The pictures rounded up to the longest and down to the shortest length in their class. The lengths are taken from
+# the pictures themselves, so integers (in ticks, see fixed_point.py) stay integers.
+def round_pictures(pictures: list[float], classes: np.ndarray) -> tuple[list[float], list[float]]:
+  (_, inverse) = np.unique(classes, return_inverse=True)
+  # The pictures by class, shortest first within a class
+  order = np.lexsort((np.asarray(pictures, dtype=float), inverse))
+  ends = np.flatnonzero(np.diff(inverse[order], append=inverse.max() + 1))
+  starts = np.concatenate([[0], ends[:-1] + 1])
+  longest = order[ends][inverse].tolist()
+  shortest = order[starts][inverse].tolist()
+  return ([pictures[p] for p in longest], [pictures[p] for p in shortest])
+
+def within(total_time: float, bound: float, epsilon: float) -> bool:
+  return total_time <= (1 + epsilon) * bound + TOLERANCE * max(1., bound)
@@ -0,0 +1,300 @@
+from ortools.linear_solver import linear_solver_pb2, pywraplp # type: ignore
+from ortools.linear_solver.python import model_builder as mb # type: ignore
+from ortools.sat.python import cp_model # type: ignore
+from abc import ABC, abstractmethod
+from typing import Callable, NamedTuple, Optional
+import os
+import timeit
+import numpy as np
+
+from .formulations import MatrixModel
+from .instance import fail_with
+
+# The solvers a MatrixModel can be handed to. Every backend loads the model once and can then be solved;
+# the status names are shared between backends. A backend implements load, warm_start and solve, and one that does
+# not cannot be created.
+
+class Solution(NamedTuple):
+  status: str
+  values: np.ndarray
+  objective: float
+  bound: float
+  solve_time: float
+  # Branch and bound nodes and LP iterations, -1 where the solver does not report them
+  nodes: int = -1
+  iterations: int = -1
+
+# Called with the values, the objective and the bound of every improving solution while the solver runs
+OnSolution = Callable[[np.ndarray, float, float], None]
+
+class Backend(ABC):
+  name = ""
+  # False for LP solvers, which ignore integrality and only solve the relaxation
+  is_mip = True
+
+  def __init__(self, threads: Optional[int] = None):
+    self.threads = threads
+
+  @abstractmethod
+  def load(self, model: MatrixModel) -> None:
+    ...
+
+  # Replace the loaded model by a changed one. Backends that can change a loaded model in place override this and
+  # only pass on the differences, the others load it again.
+  def update(self, model: MatrixModel) -> None:
+    self.load(model)
+
+  # Start from a known solution (the values of all variables), and drop everything whose objective is above it where
+  # the backend supports that.
+  @abstractmethod
+  def warm_start(self, values: np.ndarray) -> None:
+    ...
+
+  # Stops at the time limit (seconds) or once the relative gap between the solution and the bound is small enough,
+  # with status FEASIBLE if a solution was found by then.
+  @abstractmethod
+  def solve(self, time_limit: Optional[float] = None, relative_gap: Optional[float] = None,
+            on_solution: Optional[OnSolution] = None) -> Solution:
+    ...
+
+PYWRAPLP_STATUS = {
+  pywraplp.Solver.OPTIMAL: "OPTIMAL",
+  pywraplp.Solver.FEASIBLE: "FEASIBLE",
+  pywraplp.Solver.INFEASIBLE: "INFEASIBLE",
+  pywraplp.Solver.UNBOUNDED: "UNBOUNDED",
+  pywraplp.Solver.ABNORMAL: "ABNORMAL",
+  pywraplp.Solver.MODEL_INVALID: "MODEL_INVALID",
+  pywraplp.Solver.NOT_SOLVED: "NOT_SOLVED",
+}
+
+# Any solver pywraplp was built with (SCIP, CBC, HiGHS, ...), or an LP solver (GLOP, PDLP), which then solves the
+# LP relaxation. The matrix is turned into a model proto by the model builder in C++, so pywraplp loads it in bulk.
+class PywraplpBackend(Backend):
+  # Solvers that log even when pywraplp suppresses their output, and their own parameters to turn it off
+  QUIET = {"HIGHS": "output_flag=false\nlog_to_console=false\n"}
+
+  def __init__(self, solver_id: str, threads: Optional[int] = None):
+    super().__init__(threads)
+    self.name = solver_id.lower()
+    self.solver_id = solver_id
+    self.solver = pywraplp.Solver.CreateSolver(solver_id) or fail_with(f"{solver_id} solver unavailable")
+    self.solver.SuppressOutput()
+    if solver_id in self.QUIET:
+      self.solver.SetSolverSpecificParametersAsString(self.QUIET[solver_id])
+    self.is_mip = self.solver.IsMip()
+    self.model: Optional[MatrixModel] = None
+
+  def load(self, model: MatrixModel) -> None:
+    builder = mb.Model()
+    builder.helper.fill_model_from_sparse_data(np.zeros(len(model.objective)), model.var_upper, model.objective,
+                                               model.lower, model.upper, model.matrix)
+    for i in np.flatnonzero(model.integral):
+      builder.helper.set_var_integrality(int(i), True)
+
+    error = self.solver.LoadModelFromProto(builder.export_to_proto())
+    if error:
+      fail_with(f"{self.solver_id} could not load the model: {error}")
+    if self.threads:
+      self.solver.SetNumThreads(self.threads)
+    self.model = model
+
+  # Every change is a call into the solver (about 3 us), four times what a non-zero costs in a load, which also takes
+  # a few milliseconds whatever the size of the model. Past this many changes plus a quarter of the non-zeros, loading
+  # the model again is faster.
+  MAX_CHANGES = 1000
+
+  # Change the bounds, coefficients and objective of the loaded model where they differ from the new one.
+  # If the shape or the non-zeros of the matrix or the integer variables changed, or nearly everything did, the model
+  # is loaded again (into the same solver, which is still cheaper than a new one).
+  def update(self, model: MatrixModel) -> None:
+    if self.model is None:
+      self.load(model)
+      return
+    (old, new) = (self.model.matrix, model.matrix)
+    if old.shape != new.shape or not (np.array_equal(old.indptr, new.indptr) and np.array_equal(old.indices, new.indices)
+                                      and np.array_equal(self.model.integral, model.integral)):
+      self.load(model)
+      return
+
+    bounds = np.flatnonzero((model.lower != self.model.lower) | (model.upper != self.model.upper))
+    coefficients = np.flatnonzero(old.data != new.data)
+    costs = np.flatnonzero(model.objective != self.model.objective)
+    uppers = np.flatnonzero(model.var_upper != self.model.var_upper)
+    if len(bounds) + len(coefficients) + len(costs) + len(uppers) > self.MAX_CHANGES + new.nnz // 4:
+      self.load(model)
+      return
+
+    variables = self.solver.variables()
+    constraints = self.solver.constraints()
+    objective = self.solver.Objective()
+    infinity = self.solver.infinity()
+
+    for i in bounds.tolist():
+      constraints[i].SetBounds(max(model.lower[i], -infinity), min(model.upper[i], infinity))
+    rows = np.repeat(np.arange(new.shape[0]), np.diff(new.indptr))
+    for i in coefficients.tolist():
+      constraints[rows[i]].SetCoefficient(variables[new.indices[i]], new.data[i])
+    for i in costs.tolist():
+      objective.SetCoefficient(variables[i], model.objective[i])
+    for i in uppers.tolist():
+      variables[i].SetUb(min(model.var_upper[i], infinity))
+    # The hint of the last solve belongs to the old model
+    self.solver.SetHint([], [])
+    self.model = model
+
+  # Solvers that take a hint; SetHint crashes HiGHS in this version of OR tools
+  HINTS = {"SCIP", "CBC"}
+
+  # Only the hint is passed on, and HiGHS gets nothing. SCIP uses the hinted solution as its incumbent and prunes
+  # everything that cannot beat it, which is the cutoff; adding the cutoff as a row of the model instead slows SCIP down
+  # a lot.
+  def warm_start(self, values: np.ndarray) -> None:
+    if self.solver_id in self.HINTS:
+      self.solver.SetHint(self.solver.variables(), values.tolist())
+
+  # pywraplp has no solution callbacks, so on_solution is never called, there only is the final solution
+  def solve(self, time_limit: Optional[float] = None, relative_gap: Optional[float] = None,
+            on_solution: Optional[OnSolution] = None) -> Solution:
+    # 0 is no limit, so a solver that is used again does not keep the limit of the last solve
+    self.solver.SetTimeLimit(int(time_limit * 1000) if time_limit is not None else 0)
+    parameters = pywraplp.MPSolverParameters()
+    if relative_gap is not None:
+      parameters.SetDoubleParam(parameters.RELATIVE_MIP_GAP, relative_gap)
+
+    start = timeit.default_timer()
+    status = self.solver.Solve(parameters)
+    solve_time = timeit.default_timer() - start
+
+    response = linear_solver_pb2.MPSolutionResponse()
+    self.solver.FillSolutionResponseProto(response)
+    # LP solvers have no nodes (and complain when asked)
+    nodes = self.solver.nodes() if self.is_mip else -1
+    return Solution(PYWRAPLP_STATUS[status], np.array(response.variable_value), response.objective_value,
+                    response.best_objective_bound, solve_time, nodes, self.solver.iterations())
+
+# Find the number of decimals needed to write all values as integers.
+def get_decimals(values: np.ndarray, max_decimals: int = 6) -> int:
+  for decimals in range(max_decimals + 1):
+    scaled = values * 10 ** decimals
+    if np.all(np.abs(scaled - np.round(scaled)) < 1e-6):
+      return decimals
+  fail_with(f"Values need more than {max_decimals} decimals")
+
+# Scale bounds to integers, replacing infinite ones by `default`.
+def scale_bound(bounds: np.ndarray, scale: int, default: int) -> np.ndarray:
+  finite = np.isfinite(bounds)
+  scaled = np.full(len(bounds), default, dtype=np.int64)
+  scaled[finite] = np.round(bounds[finite] * scale)
+  return scaled
+
+# CP-SAT only accepts integer coefficients, so every row and the objective are multiplied by 10^decimals of the
+# durations. Continuous variables (like the makespan) become integers counted in those 1/10^decimals ticks.
+# CP-SAT runs its portfolio of workers on all cores unless told otherwise.
+class CpSatBackend(Backend):
+  name = "cp-sat"
+
+  # Upper bound for continuous variables without one
+  MAX_VALUE = 2 ** 40
+
+  def load(self, model: MatrixModel) -> None:
+    matrix = model.matrix
+    finite = lambda a: a[np.isfinite(a)]
+    self.scale = 10 ** get_decimals(np.concatenate([matrix.data, finite(model.lower), finite(model.upper), model.objective]))
+    self.continuous = ~model.integral
+
+    # Continuous columns are counted in ticks, which cancels the row scaling for them
+    col_scale = np.where(self.continuous, 1, self.scale)
+    coeffs = np.round(matrix.data * col_scale[matrix.indices]).astype(np.int64)
+    lower = scale_bound(model.lower, self.scale, cp_model.INT_MIN)
+    upper = scale_bound(model.upper, self.scale, cp_model.INT_MAX)
+    var_upper = scale_bound(np.floor(model.var_upper * np.where(self.continuous, self.scale, 1)), 1, self.MAX_VALUE)
+    objective = np.round(model.objective * col_scale).astype(np.int64)
+
+    self.model = cp_model.CpModel()
+    proto = self.model.proto
+    for ub in var_upper.tolist():
+      proto.variables.add().domain.extend([0, ub])
+
+    cols = matrix.indices.tolist()
+    data = coeffs.tolist()
+    bounds = zip(matrix.indptr[:-1].tolist(), matrix.indptr[1:].tolist(), lower.tolist(), upper.tolist())
+    for (begin, end, lb, ub) in bounds:
+      linear = proto.constraints.add().linear
+      linear.vars.extend(cols[begin:end])
+      linear.coeffs.extend(data[begin:end])
+      linear.domain.extend([lb, ub])
+
+    used = np.flatnonzero(objective)
+    proto.objective.vars.extend(used.tolist())
+    proto.objective.coeffs.extend(objective[used].tolist())
+
+  # The hint is scaled like the model, and its objective (a whole number of ticks) becomes the upper end of the
+  # domain of the objective, so nothing worse than the hint is searched.
+  def warm_start(self, values: np.ndarray) -> None:
+    proto = self.model.proto
+    scaled = np.round(values * np.where(self.continuous, self.scale, 1)).astype(np.int64)
+    self.model.clear_hints()
+    proto.solution_hint.vars.extend(range(len(scaled)))
+    proto.solution_hint.values.extend(scaled.tolist())
+
+    cutoff = int(np.dot(proto.objective.coeffs, scaled[list(proto.objective.vars)]))
+    proto.objective.domain.clear()
+    proto.objective.domain.extend([cp_model.INT_MIN, cutoff])
+
+  # Values of the variables in the original units
+  def unscale(self, solution) -> np.ndarray:
+    values = np.array(solution, dtype=float)
+    values[self.continuous] /= self.scale
+    return values
+
+  def solve(self, time_limit: Optional[float] = None, relative_gap: Optional[float] = None,
+            on_solution: Optional[OnSolution] = None) -> Solution:
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = self.threads or os.cpu_count() or 1
+    if time_limit is not None:
+      solver.parameters.max_time_in_seconds = time_limit
+    if relative_gap is not None:
+      solver.parameters.relative_gap_limit = relative_gap
+
+    callback = None
+    if on_solution:
+      callback = SolutionCallback(lambda response: on_solution(self.unscale(response.solution),
+        response.objective_value / self.scale, response.best_objective_bound / self.scale))
+
+    start = timeit.default_timer()
+    status = solver.solve(self.model, callback)
+    solve_time = timeit.default_timer() - start
+
+    status_name = solver.status_name(status)
+    bound = solver.best_objective_bound / self.scale
+    # CP-SAT does not branch like a MIP solver; its branches are the closest thing to nodes
+    nodes = solver.num_branches
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+      return Solution("NOT_SOLVED" if status == cp_model.UNKNOWN else status_name, np.array([]), 0., bound, solve_time,
+                      nodes)
+
+    return Solution(status_name, self.unscale(solver.response_proto.solution), solver.objective_value / self.scale,
+                    bound, solve_time, nodes)
+
+# Passes the response of every solution CP-SAT finds on to a function
+class SolutionCallback(cp_model.CpSolverSolutionCallback):
+  def __init__(self, on_response: Callable):
+    super().__init__()
+    self.on_response = on_response
+
+  def on_solution_callback(self) -> None:
+    self.on_response(self.response_proto)
+
+BACKENDS = {
+  "scip": lambda threads: PywraplpBackend("SCIP", threads),
+  "cbc": lambda threads: PywraplpBackend("CBC", threads),
+  "highs": lambda threads: PywraplpBackend("HIGHS", threads),
+  "cp-sat": lambda threads: CpSatBackend(threads),
+  # LP solvers, these only give the relaxation
+  "glop": lambda threads: PywraplpBackend("GLOP", threads),
+  "pdlp": lambda threads: PywraplpBackend("PDLP", threads),
+}
+
+def get_backend(name: str, threads: Optional[int] = None) -> Backend:
+  create = BACKENDS.get(name) or fail_with(f"Unknown backend {name}, choose one of {', '.join(BACKENDS)}")
+  return create(threads)
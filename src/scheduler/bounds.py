@@ -0,0 +1,51 @@
+import numpy as np
+
+from .heuristic import lp_bound
+
+# Lower bounds on the total time that need no MIP, so a schedule that meets one is known to be optimal without
+# calling the solver at all.
+
+# Status of a schedule that is proven optimal because it meets the lower bound (no solver was run)
+PROVED_BY_BOUND = "OPTIMAL_BY_BOUND"
+
+# Rounding errors allowed when comparing a total time with a bound
+TOLERANCE = 1e-6
+
+# Combinatorial bound: if knapsack L is the last one used, the total time is start[L] plus what does not fit in the
+# knapsacks before L, and at least the shortest picture. What fits in them is limited by their capacity and, for the
+# j smallest of them, by the length of the pictures that fit in the j-th smallest (the same bound as in dp_solver).
+# The bound is the smallest of these over every L that can hold the rest. O(K log K) for every L that is tried, and
+# the L are tried in order until their start alone is above the bound.
+def combinatorial_bound(pictures: list[float], knapsacks: list[float], starts: list[float]) -> float:
+  sizes = np.sort(np.asarray(pictures, dtype=float))
+  caps = np.asarray(knapsacks, dtype=float)
+  total = sizes.sum()
+  shortest = sizes[0] if len(sizes) else 0.
+  # Length of the pictures that are at most as long as c, for every c
+  lengths = np.concatenate([[0.], np.cumsum(sizes)])
+  fitting = lambda c: lengths[np.searchsorted(sizes, c + TOLERANCE, side="right")]
+
+  before = np.concatenate([[0.], np.cumsum(caps)])
+  best = np.inf
+  for L in np.flatnonzero(before[1:] >= total - TOLERANCE).tolist():
+    if starts[L] >= best:
+      break
+    smaller = np.sort(caps[:L])
+    prefix = np.concatenate([[0.], np.cumsum(smaller)])
+    # Packed in the j smallest knapsacks: at most the pictures that fit in the j-th, the others at most full
+    packed = min(total, prefix[-1], float(np.min(fitting(smaller) + prefix[-1] - prefix[1:]))) if L else 0.
+    if packed + caps[L] < total - TOLERANCE:
+      continue
+    best = min(best, starts[L] + max(shortest, total - packed))
+  return float(best)
+
+# The best of the combinatorial bound and the LP relaxation of the compact formulation. The LP is only solved when
+# the combinatorial bound does not already reach `target` (normally the total time of a known schedule).
+def lower_bound(pictures: list[float], knapsacks: list[float], starts: list[float], target: float = np.inf) -> float:
+  bound = combinatorial_bound(pictures, knapsacks, starts)
+  if bound < target - TOLERANCE:
+    bound = max(bound, lp_bound(pictures, knapsacks, starts))
+  return bound
+
+def proves_optimal(total_time: float, bound: float) -> bool:
+  return total_time <= bound + TOLERANCE * max(1., bound)
@@ -0,0 +1,101 @@
+from collections import OrderedDict
+from typing import Optional
+import hashlib
+import json
+import sqlite3
+
+from .instance import Blackout, get_knapsacks
+
+# Cache of optimal schedules, so an instance that was solved before (in any picture or blackout order) skips the
+# solver. The optimal assignment only depends on the picture lengths and the knapsack capacities: the optimum uses the
+# first knapsack that can hold what does not fit before it and packs as much as possible before that one, whatever
+# the length of the blackouts. So the key is a hash of the sorted picture lengths and the capacities, and a schedule
+# is stored as the knapsack of every picture rank (position in the sorted order). Pictures of the same length are
+# interchangeable, so any ordering of the caller maps back to a schedule of the same total time.
+
+# Canonical hash of an instance, and the picture at every rank of the sorted lengths
+def instance_key(pictures: list[float], blackouts: list[Blackout]) -> tuple[str, list[int]]:
+  order = sorted(range(len(pictures)), key=lambda p: pictures[p])
+  lengths = [pictures[p] for p in order]
+  knapsacks = get_knapsacks(lengths, sorted(blackouts))
+  data = json.dumps([lengths, knapsacks]).encode()
+  return (hashlib.sha256(data).hexdigest(), order)
+
+# Knapsacks of picture ranks to knapsacks of the caller's pictures, and back
+def to_pictures(ranks: list[list[int]], order: list[int]) -> list[list[int]]:
+  return [[order[r] for r in knap] for knap in ranks]
+
+def to_ranks(knaps: list[list[int]], order: list[int]) -> list[list[int]]:
+  rank = {p: r for (r, p) in enumerate(order)}
+  return [[rank[p] for p in knap] for knap in knaps]
+
+# Two tiers: an LRU dict in memory with at most max_entries schedules and, if a path is given, an SQLite file with at
+# most max_disk_entries that outlives the process and can be shared between processes. A schedule found on disk is
+# moved into memory. Only optimal schedules should be put in.
+class SolutionCache:
+  def __init__(self, max_entries: int = 1024, path: Optional[str] = None, max_disk_entries: int = 100_000):
+    self.max_entries = max_entries
+    self.max_disk_entries = max_disk_entries
+    self.memory: OrderedDict[str, list[list[int]]] = OrderedDict()
+    self.hits = 0
+    self.disk_hits = 0
+    self.misses = 0
+
+    self.db: Optional[sqlite3.Connection] = None
+    if path is not None:
+      # Workers of the experimenter share the file, so wait for the lock instead of failing
+      self.db = sqlite3.connect(path, timeout=60)
+      self.db.execute("CREATE TABLE IF NOT EXISTS schedules (key TEXT PRIMARY KEY, knaps TEXT NOT NULL, used INTEGER NOT NULL)")
+      self.db.execute("CREATE INDEX IF NOT EXISTS schedules_used ON schedules (used)")
+      self.db.commit()
+
+  # Counter for the LRU order on disk, one more than the last schedule that was used
+  def next_use(self) -> int:
+    [(used,)] = self.db.execute("SELECT COALESCE(MAX(used), 0) + 1 FROM schedules")
+    return used
+
+  def remember(self, key: str, ranks: list[list[int]]) -> None:
+    self.memory[key] = ranks
+    self.memory.move_to_end(key)
+    while len(self.memory) > self.max_entries:
+      self.memory.popitem(last=False)
+
+  # The cached schedule of these pictures as knapsacks of picture indices, None if it is not in the cache
+  def get(self, pictures: list[float], blackouts: list[Blackout]) -> Optional[list[list[int]]]:
+    (key, order) = instance_key(pictures, blackouts)
+    ranks = self.memory.get(key)
+    if ranks is not None:
+      self.memory.move_to_end(key)
+    elif self.db is not None:
+      row = self.db.execute("SELECT knaps FROM schedules WHERE key = ?", (key,)).fetchone()
+      if row is not None:
+        ranks = json.loads(row[0])
+        self.db.execute("UPDATE schedules SET used = ? WHERE key = ?", (self.next_use(), key))
+        self.db.commit()
+        self.remember(key, ranks)
+        self.disk_hits += 1
+
+    if ranks is None:
+      self.misses += 1
+      return None
+    self.hits += 1
+    return to_pictures(ranks, order)
+
+  def put(self, pictures: list[float], blackouts: list[Blackout], knaps: list[list[int]]) -> None:
+    (key, order) = instance_key(pictures, blackouts)
+    ranks = to_ranks(knaps, order)
+    self.remember(key, ranks)
+    if self.db is not None:
+      self.db.execute("INSERT OR REPLACE INTO schedules VALUES (?, ?, ?)", (key, json.dumps(ranks), self.next_use()))
+      # Drop the least recently used schedules above the limit
+      self.db.execute("DELETE FROM schedules WHERE key IN (SELECT key FROM schedules ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                      (self.max_disk_entries,))
+      self.db.commit()
+
+  def stats(self) -> dict[str, int]:
+    return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses, "entries": len(self.memory)}
+
+  def close(self) -> None:
+    if self.db is not None:
+      self.db.close()
+      self.db = None
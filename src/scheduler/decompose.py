@@ -0,0 +1,85 @@
+from typing import Optional
+import numpy as np
+
+from .backends import get_backend
+from .formulations import FORMULATIONS, SOLUTIONS
+from .heuristic import EPSILON
+from .presolve import Presolved
+
+# Rolling horizon for instances with too many gaps for one model (the model has a variable per picture length and
+# gap). Only a window of `window` gaps is modelled at a time, after the gaps before it were fixed: the gaps of the
+# window and, as the last knapsack, the gap after it holding everything that is left. The formulation's objective
+# then packs as much as it can into the window, and when everything fits in the window it is the total time itself.
+# The first `step` gaps of the window are fixed and the window moves on, until the rest fits. Every window is as
+# large as the model of a small instance, so time and memory grow linearly with the number of gaps.
+# An instance whose gaps all fit in one window is solved as one model, like formula_2 does.
+
+WINDOW = 20
+# Seconds per window; the best schedule found by then is kept
+WINDOW_TIME_LIMIT = 1.
+
+# First fit decreasing on picture lengths with counts: every length, longest first, goes into the knapsacks in order,
+# as many as fit in each. Returns the count of every length in every knapsack.
+def fill_counts(sizes: np.ndarray, counts: np.ndarray, capacities: np.ndarray) -> np.ndarray:
+  free = capacities + EPSILON
+  x = np.zeros((len(sizes), len(capacities)), dtype=np.int64)
+  for g in np.argsort(-sizes, kind="stable").tolist():
+    left = int(counts[g])
+    for k in np.flatnonzero(free >= sizes[g]).tolist():
+      take = min(left, int(free[k] // sizes[g]))
+      x[g, k] = take
+      free[k] -= take * sizes[g]
+      left -= take
+      if left == 0:
+        break
+  return x
+
+# The count of every picture length (of the presolved instance) in every kept knapsack, or None when the gaps fixed
+# by the earlier windows leave more than the last kept gap can hold. The window moves on by half its size unless a
+# step is given. Every window gets time_limit, except when all gaps fit in one: that model is the whole instance and
+# gets single_time_limit, by default none, so it is solved to optimality like the exact mode does.
+def rolling_horizon(presolved: Presolved, formulation: str = "compact", backend: str = "scip", window: int = WINDOW,
+                    step: Optional[int] = None, time_limit: Optional[float] = WINDOW_TIME_LIMIT,
+                    single_time_limit: Optional[float] = None) -> Optional[np.ndarray]:
+  sizes = np.asarray(presolved.sizes, dtype=float)
+  capacities = np.asarray(presolved.knapsacks, dtype=float)
+  starts = np.asarray(presolved.starts, dtype=float)
+  remaining = np.asarray(presolved.counts, dtype=np.int64)
+  (G, K) = (len(sizes), len(capacities))
+  build_model = FORMULATIONS[formulation]
+  solver = get_backend(backend)
+  step = step or max(1, window // 2)
+
+  x = np.zeros((G, K), dtype=np.int64)
+  first = 0
+  while remaining.any():
+    # The window and the knapsack after it, which can hold everything unless it is the last kept one
+    last = min(first + window, K - 1)
+    used = np.flatnonzero(remaining)
+    (lengths, counts) = (sizes[used], remaining[used])
+    overflow = capacities[last] if last == K - 1 else max(capacities[last], lengths @ counts)
+    caps = np.append(capacities[first:last], overflow)
+    window_starts = starts[first:last + 1]
+
+    model = build_model(lengths.tolist(), caps.tolist(), window_starts.tolist(), counts.tolist())
+    solver.load(model)
+    start = fill_counts(lengths, counts, caps)
+    knaps = [np.repeat(np.arange(len(used)), start[:, k]).tolist() for k in range(len(caps))]
+    values = SOLUTIONS[formulation](lengths.tolist(), caps.tolist(), window_starts.tolist(), knaps)
+    solver.warm_start(values)
+    solution = solver.solve(single_time_limit if first == 0 and last == K - 1 else time_limit)
+    found = start
+    if solution.status in ("OPTIMAL", "FEASIBLE"):
+      found = solution.values[:len(used) * len(caps)].reshape(len(used), len(caps)).round().astype(np.int64)
+    elif (start.sum(axis=1) < counts).any():
+      return None
+
+    # Done once the window holds the rest, or the knapsack after it is the last one and took it
+    if not found[:, -1].any() or last == K - 1:
+      x[used, first:last + 1] = found
+      break
+    fixed = min(step, last - first)
+    x[used, first:first + fixed] = found[:, :fixed]
+    remaining[used] -= found[:, :fixed].sum(axis=1)
+    first += fixed
+  return x
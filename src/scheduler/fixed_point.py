@@ -0,0 +1,47 @@
+from typing import Optional
+import numpy as np
+
+from .backends import get_decimals
+from .instance import Input, Output
+
+# Instances in whole ticks instead of seconds: the durations of an instance file are written with a few decimals, so
+# scaled by 10^decimals they are integers. The knapsacks, the greedy schedule, the bounds, the model, the sending
+# times and their check then only see integers (Python ints, int64 in NumPy), which floats hold exactly up to 2^53,
+# and no result is off by rounding. Only the output is scaled back.
+
+MAX_DECIMALS = 6
+
+# The decimals needed to write the durations of the instance (and any other values, such as positions from a file)
+# as integers
+def instance_decimals(input: Input, values: Optional[list[float]] = None, max_decimals: int = MAX_DECIMALS) -> int:
+  (pictures, blackouts) = input
+  everything = np.concatenate([np.asarray(pictures, dtype=float), np.asarray(blackouts, dtype=float).ravel(),
+                               np.asarray(values or [], dtype=float)])
+  return get_decimals(everything, max_decimals)
+
+# The length of a tick in seconds: the largest power of ten that all durations are whole multiples of, None when
+# they need more than max_decimals decimals
+def tick_size(input: Input, max_decimals: int = MAX_DECIMALS) -> Optional[float]:
+  (pictures, blackouts) = input
+  everything = np.concatenate([np.asarray(pictures, dtype=float), np.asarray(blackouts, dtype=float).ravel()])
+  for decimals in range(max_decimals + 1):
+    scaled = everything * 10 ** decimals
+    if np.all(np.abs(scaled - np.round(scaled)) < 1e-6):
+      return 10. ** -decimals
+  return None
+
+def scale_values(values: list[float], scale: int) -> list[int]:
+  return np.round(np.asarray(values, dtype=float) * scale).astype(np.int64).tolist()
+
+# The instance in ticks and the number of ticks per second
+def to_fixed_point(input: Input, decimals: Optional[int] = None) -> tuple[Input, int]:
+  (pictures, blackouts) = input
+  scale = 10 ** (instance_decimals(input) if decimals is None else decimals)
+  ends = np.asarray(blackouts, dtype=float).reshape(-1, 2)
+  blackouts = [(start, end) for (start, end) in zip(scale_values(ends[:, 0], scale), scale_values(ends[:, 1], scale))]
+  return ((scale_values(pictures, scale), blackouts), scale)
+
+# The total time and the sending times in seconds again
+def from_fixed_point(output: Output, scale: int) -> Output:
+  (total_time, times, *rest) = output
+  return (total_time / scale, [t / scale for t in times], *rest)
@@ -0,0 +1,259 @@
+from scipy import sparse # type: ignore
+from typing import NamedTuple, Optional
+import math
+import numpy as np
+
+# The ILP formulations of the problem, built as sparse matrices from NumPy arrays.
+# They all take the picture lengths, the knapsack capacities and the time each knapsack starts at.
+# With counts (see presolve.py) every picture stands for counts[p] identical pictures of that length: x[p][k] is then
+# the number of them in knapsack k instead of 0 or 1, which removes the symmetry between identical pictures.
+
+# Sparse constraint block: rows and columns of the non-zeros, their coefficients and the row bounds.
+Block = tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+def block(rows, cols, vals, lower, upper) -> Block:
+  num_rows = len(lower)
+  return (np.asarray(rows), np.asarray(cols), np.broadcast_to(np.asarray(vals, dtype=float), len(cols)),
+          np.asarray(lower, dtype=float), np.broadcast_to(np.asarray(upper, dtype=float), num_rows))
+
+# A model in matrix form: lower <= matrix @ vars <= upper, 0 <= vars <= var_upper, minimizing objective @ vars.
+# Every formulation puts x first, flattened row-major, so x[p][k] has index p*K + k.
+class MatrixModel(NamedTuple):
+  matrix: sparse.csr_matrix
+  lower: np.ndarray
+  upper: np.ndarray
+  objective: np.ndarray
+  var_upper: np.ndarray
+  integral: np.ndarray
+
+# Stack the blocks on top of each other, shifting each one's rows past the previous ones, into one CSR matrix.
+def matrix_model(blocks: list[Block], objective: np.ndarray, upper_bounds: np.ndarray, integral: np.ndarray) -> MatrixModel:
+  num_vars = len(objective)
+  offsets = np.cumsum([0] + [len(b[3]) for b in blocks])
+  rows = np.concatenate([b[0] + offset for b, offset in zip(blocks, offsets)])
+  cols = np.concatenate([b[1] for b in blocks])
+  vals = np.concatenate([b[2] for b in blocks])
+  lower = np.concatenate([b[3] for b in blocks])
+  upper = np.concatenate([b[4] for b in blocks])
+  matrix = sparse.csr_matrix((vals, (rows, cols)), shape=(offsets[-1], num_vars))
+
+  return MatrixModel(matrix, lower, upper, objective, upper_bounds, integral)
+
+# Build the ILP as one sparse CSR matrix instead of one constraint object at a time.
+# Variables are laid out in a single vector: x (P*K), then c (K), then l (K), then z (P*K),
+# where x and z are flattened row-major, so x[p][k] has index p*K + k.
+def build_standard_model(pictures: list[float], knapsacks: list[float], starts: list[float],
+                         counts: Optional[list[int]] = None) -> MatrixModel:
+  P, K = len(pictures), len(knapsacks)
+  sizes = np.asarray(pictures, dtype=float)
+  caps = np.asarray(knapsacks, dtype=float)
+  n = np.ones(P) if counts is None else np.asarray(counts, dtype=float)
+
+  ks = np.arange(K)
+  cells = np.arange(P * K)
+  cell_p, cell_k = np.divmod(cells, K)
+  used = cell_k > 0
+
+  #
+  # DECISION VARIABLES
+  #
+
+  # x[p][k] is 1 if picture `p` is in knapsack `k` (the number of them with counts)
+  x = cells
+  # c[k] if knapsack k is used
+  c = P * K + ks
+  # l[k] if knapsack k is last knapsack
+  l = P * K + K + ks
+  # same as x but only for the last knapsack
+  z = P * K + 2 * K + cells
+  num_vars = 2 * P * K + 2 * K
+
+  #
+  # CONSTRAINTS
+  #
+
+  inf = np.inf
+  blocks = [
+    # Constraint: Each picture is in exactly one knapsack
+    block(cell_p, x, 1, n, n),
+    # Constraint: The length of the pictures in each knapsack cannot exceed its capacity
+    block(cell_k, x, sizes[cell_p], np.full(K, -inf), caps),
+    # Constraint: Taking knapsacks from left, group the knapsacks by 1 first, then by  0
+    block(np.repeat(ks[:-1], 2), np.stack([c[1:], c[:-1]], 1).ravel(), np.tile([1, -1], K - 1), np.full(K - 1, -inf), 0),
+    # Constraint: All photos have to fit in used knapsacks
+    block(np.concatenate([cell_k[used], ks[1:]]) - 1, np.concatenate([x[used], c[1:]]),
+          np.concatenate([np.ones(P * (K - 1)), np.full(K - 1, -n.sum())]), np.full(K - 1, -inf), 0),
+    # l have to hold last knapsack position only. You can only have it on the position when k is 1
+    block(np.repeat(ks, 2), np.stack([l, c], 1).ravel(), np.tile([1, -1], K), np.full(K, -inf), 0),
+    # If you move by one and multiply it should be 0 (it should be on the position of rightmost 1)
+    block(np.repeat(ks[:-1], 2), np.stack([l[:-1], c[1:]], 1).ravel(), 1, np.full(K - 1, -inf), 1),
+    # There is just one last knapsack
+    block(np.zeros(K, dtype=int), l, 1, np.ones(1), 1),
+    # And set z properly (simulate logical operation (l[j] and x[i][j]), with counts z = x if l[j] and 0 otherwise)
+    block(np.repeat(cells, 2), np.stack([z, l[cell_k]], 1).ravel(), np.stack([np.ones(P * K), -n[cell_p]], 1).ravel(),
+          np.full(P * K, -inf), 0),
+    block(np.repeat(cells, 2), np.stack([z, x], 1).ravel(), np.tile([1, -1], P * K), np.full(P * K, -inf), 0),
+    block(np.repeat(cells, 3), np.stack([x, l[cell_k], z], 1).ravel(),
+          np.stack([np.ones(P * K), n[cell_p], -np.ones(P * K)], 1).ravel(), np.full(P * K, -inf), n[cell_p]),
+  ]
+
+  #
+  # OBJECTIVE FUNCTION
+  #
+
+  # Every used knapsack (but the last) counts in full, plus the photo sizes in the last knapsack
+  objective = np.zeros(num_vars)
+  objective[c[1:]] = caps[:-1]
+  objective[z] = sizes[cell_p]
+
+  upper_bounds = np.ones(num_vars)
+  upper_bounds[x] = upper_bounds[z] = n[cell_p]
+  return matrix_model(blocks, objective, upper_bounds, np.ones(num_vars, dtype=bool))
+
+# Compact formulation: instead of pricing the last knapsack through z[p][k] = l[k] AND x[p][k],
+# charge the gap between consecutive knapsack starts for every knapsack that is used after the first,
+# and let a single continuous variable W carry the photo sizes in the last knapsack.
+# For every k, W >= fill[k] - capacity[k] * u[k + 1]: the bound is inactive (<= 0) for knapsacks followed by
+# a used one, so W ends up as the fill of the last knapsack and the objective is exactly the makespan.
+# This needs K + 1 extra variables and 3K - 1 constraints on top of the assignment,
+# instead of 2K + P*K variables and 3*P*K + 4K constraints.
+# Variables: x (P*K, same layout as the standard model), then u (K), then W.
+def build_compact_model(pictures: list[float], knapsacks: list[float], starts: list[float],
+                        counts: Optional[list[int]] = None) -> MatrixModel:
+  P, K = len(pictures), len(knapsacks)
+  sizes = np.asarray(pictures, dtype=float)
+  caps = np.asarray(knapsacks, dtype=float)
+  n = np.ones(P) if counts is None else np.asarray(counts, dtype=float)
+
+  ks = np.arange(K)
+  cells = np.arange(P * K)
+  cell_p, cell_k = np.divmod(cells, K)
+
+  #
+  # DECISION VARIABLES
+  #
+
+  # x[p][k] is 1 if picture `p` is in knapsack `k` (the number of them with counts)
+  x = cells
+  # u[k] if knapsack k is used
+  u = P * K + ks
+  # W is the length of the pictures in the last knapsack
+  W = P * K + K
+  num_vars = P * K + K + 1
+
+  #
+  # CONSTRAINTS
+  #
+
+  inf = np.inf
+  blocks = [
+    # Constraint: Each picture is in exactly one knapsack
+    block(cell_p, x, 1, n, n),
+    # Constraint: The length of the pictures in each knapsack cannot exceed its capacity, and is 0 if it is not used
+    block(np.concatenate([cell_k, ks]), np.concatenate([x, u]), np.concatenate([sizes[cell_p], -caps]),
+          np.full(K, -inf), 0),
+    # Constraint: Taking knapsacks from left, group the knapsacks by 1 first, then by  0
+    block(np.repeat(ks[:-1], 2), np.stack([u[1:], u[:-1]], 1).ravel(), np.tile([1, -1], K - 1), np.full(K - 1, -inf), 0),
+    # Constraint: W holds at least the pictures of the knapsack that is not followed by a used one
+    block(np.concatenate([ks, cell_k, ks[:-1]]), np.concatenate([np.full(K, W), x, u[1:]]),
+          np.concatenate([np.ones(K), -sizes[cell_p], caps[:-1]]), np.zeros(K), inf),
+  ]
+
+  #
+  # OBJECTIVE FUNCTION
+  #
+
+  # Objective: Minimize the start of the last knapsack (the gaps and blackouts before it) plus the pictures in it
+  objective = np.zeros(num_vars)
+  objective[u[1:]] = np.diff(starts)
+  objective[W] = 1
+
+  upper_bounds = np.ones(num_vars)
+  upper_bounds[x] = n[cell_p]
+  upper_bounds[W] = inf
+  integral = np.ones(num_vars, dtype=bool)
+  integral[W] = False
+
+  return matrix_model(blocks, objective, upper_bounds, integral)
+
+# The formulation of multi_knap.py: a multiple knapsack problem where every picture is penalised by the square of
+# its knapsack's position, so that the pictures are pushed towards the first knapsacks. It does not always give
+# the optimal total time. Variables: x (P*K) only.
+def build_weighted_model(pictures: list[float], knapsacks: list[float], starts: list[float],
+                         counts: Optional[list[int]] = None) -> MatrixModel:
+  P, K = len(pictures), len(knapsacks)
+  sizes = np.asarray(pictures, dtype=float)
+  caps = np.asarray(knapsacks, dtype=float)
+  n = np.ones(P) if counts is None else np.asarray(counts, dtype=float)
+
+  cells = np.arange(P * K)
+  cell_p, cell_k = np.divmod(cells, K)
+
+  # x[p][k] is 1 if picture `p` is in knapsack `k` (the number of them with counts)
+  x = cells
+
+  blocks = [
+    # Constraint: Each picture is in exactly one knapsack
+    block(cell_p, x, 1, n, n),
+    # Constraint: The length of the pictures in each knapsack cannot exceed its capacity
+    block(cell_k, x, sizes[cell_p], np.full(K, -np.inf), caps),
+  ]
+
+  # Objective: Minimize the coefficients of each picture in each knapsack
+  objective = sizes[cell_p] * (cell_k + 1) ** 2
+
+  return matrix_model(blocks, objective, n[cell_p], np.ones(P * K, dtype=bool))
+
+FORMULATIONS = {
+  "standard": build_standard_model,
+  "compact": build_compact_model,
+  "weighted": build_weighted_model,
+}
+
+# The values of all variables of a formulation for a given schedule (the pictures in each knapsack), in the
+# same layout as the model. Used to hand a known schedule to the solver as a starting point. With counts a picture
+# appears in a knapsack as often as there are identical pictures of it there.
+
+# x as a (P, K) matrix of 0/1 values (or counts), and whether each knapsack is used up to the last one
+def get_assignment(pictures: list[float], knaps: list[list[int]]) -> tuple[np.ndarray, np.ndarray]:
+  x = np.zeros((len(pictures), len(knaps)))
+  for (k, knap) in enumerate(knaps):
+    np.add.at(x[:, k], knap, 1)
+  last = max(k for k in range(len(knaps)) if knaps[k])
+  return (x, np.arange(len(knaps)) <= last)
+
+def standard_solution(pictures: list[float], knapsacks: list[float], starts: list[float], knaps: list[list[int]]) -> np.ndarray:
+  (x, used) = get_assignment(pictures, knaps)
+  last = np.zeros(len(knaps))
+  last[np.flatnonzero(used)[-1]] = 1
+  return np.concatenate([x.ravel(), used, last, (x * last).ravel()])
+
+def compact_solution(pictures: list[float], knapsacks: list[float], starts: list[float], knaps: list[list[int]]) -> np.ndarray:
+  (x, used) = get_assignment(pictures, knaps)
+  fill = np.asarray(pictures) @ x
+  return np.concatenate([x.ravel(), used, [fill[np.flatnonzero(used)[-1]]]])
+
+def weighted_solution(pictures: list[float], knapsacks: list[float], starts: list[float], knaps: list[list[int]]) -> np.ndarray:
+  (x, _) = get_assignment(pictures, knaps)
+  return x.ravel()
+
+SOLUTIONS = {
+  "standard": standard_solution,
+  "compact": compact_solution,
+  "weighted": weighted_solution,
+}
+
+# Lower bound on the total time from a solver's bound on the objective of a formulation, 0 if there is none.
+# The objective of the compact formulation is the total time after the start of the first knapsack, which is not 0
+# when the presolve left out the knapsacks before it. The standard one leaves out the blackouts, but every schedule
+# waits at least for the blackouts before the first knapsack that all pictures could fit in up to.
+# The weighted formulation has no bound on the total time.
+def total_time_bound(formulation: str, bound: float, pictures: list[float], knapsacks: list[float], starts: list[float]) -> float:
+  if not math.isfinite(bound) or formulation not in ("standard", "compact"):
+    return 0.
+  if formulation == "standard":
+    first_last = int(np.searchsorted(np.cumsum(knapsacks), sum(pictures) - 1e-9))
+    bound += starts[first_last] - sum(knapsacks[:first_last])
+  else:
+    bound += starts[0]
+  return max(0., bound)
@@ -0,0 +1,63 @@
+from typing import Callable, Optional
+import numpy as np
+
+from .instance import InstanceArrays
+
+# Generates instances with a known optimum, like gen_inst_2.py, but seeded and with NumPy instead of a loop: the
+# pictures are laid out back to back from time 0 with the blackouts between them, so every gap is filled exactly and
+# nothing can end before the last picture. Blackouts that do not fit between the pictures come after the end, with
+# room between them. All lengths are whole numbers of 1/10^decimals ticks, so the optimum and the positions are exact.
+
+# Lengths between low and high, n of them
+Distribution = Callable[[np.random.Generator, int, float, float], np.ndarray]
+
+DISTRIBUTIONS: dict[str, Distribution] = {
+  "uniform": lambda rng, n, low, high: rng.uniform(low, high, n),
+  "normal": lambda rng, n, low, high: np.clip(rng.normal((low + high) / 2, (high - low) / 6, n), low, high),
+  # Mostly short ones with a long tail
+  "exponential": lambda rng, n, low, high: np.minimum(low + rng.exponential((high - low) / 5, n), high),
+  # Short and long ones, nothing in between
+  "bimodal": lambda rng, n, low, high: np.where(rng.random(n) < .5, rng.uniform(low, low + (high - low) / 5, n),
+                                                rng.uniform(high - (high - low) / 5, high, n)),
+  # Only a few different lengths, so many identical pictures (see the presolve)
+  "few": lambda rng, n, low, high: rng.choice(rng.uniform(low, high, 8), n),
+}
+
+def to_ticks(values: np.ndarray, decimals: int) -> np.ndarray:
+  return np.maximum(1, np.round(values * 10 ** decimals)).astype(np.int64)
+
+# An instance of num_pictures pictures and num_blackouts blackouts with lengths from the distribution between low and
+# high (the blackouts between blackout_low and blackout_high, the same as the pictures by default), in the order of a
+# random permutation, with the optimum and the optimal positions.
+def generate(num_pictures: int, num_blackouts: int, low: float = 1., high: float = 10., decimals: int = 2,
+             distribution: str = "uniform", seed: Optional[int] = None, blackout_low: Optional[float] = None,
+             blackout_high: Optional[float] = None) -> InstanceArrays:
+  if num_pictures < 1 or num_blackouts < 0 or not 0 < low <= high:
+    raise ValueError("Need at least one picture, no negative number of blackouts and 0 < low <= high")
+  draw = DISTRIBUTIONS[distribution]
+  rng = np.random.default_rng(seed)
+  (blackout_low, blackout_high) = (blackout_low or low, blackout_high or high)
+
+  sizes = to_ticks(draw(rng, num_pictures, low, high), decimals)
+  durations = to_ticks(draw(rng, num_blackouts, blackout_low, blackout_high), decimals)
+
+  # Between the pictures: after distinct pictures, never after the last one
+  inside = min(num_blackouts, num_pictures - 1)
+  after = np.sort(rng.choice(num_pictures - 1, inside, replace=False))
+  delay = np.zeros(num_pictures, dtype=np.int64)
+  delay[after + 1] = durations[:inside]
+  positions = np.cumsum(sizes) - sizes + np.cumsum(delay)
+  optimum = positions[-1] + sizes[-1]
+  starts = positions[after] + sizes[after]
+
+  # The rest after the end, each one a few pictures apart from the one before
+  rest = durations[inside:]
+  spaces = to_ticks(rng.uniform(low, high, len(rest)) * rng.uniform(1, 5, len(rest)), decimals)
+  first = optimum + to_ticks(rng.uniform(0, high, 1), decimals)
+  later = first + np.cumsum(rest + spaces) - rest - spaces
+  starts = np.concatenate([starts, later])
+
+  order = rng.permutation(num_pictures)
+  scale = 10. ** decimals
+  blackouts = np.stack([starts, starts + durations], axis=1) / scale
+  return InstanceArrays(sizes[order] / scale, blackouts, optimum / scale, positions[order] / scale)
@@ -0,0 +1,97 @@
+from bisect import bisect_right
+from itertools import combinations
+import numpy as np
+
+from .backends import get_backend
+from .formulations import build_compact_model
+from .instance import fail_with
+
+# Quick schedules without a solver, used on their own when an answer is needed fast and as a warm start for the MIP.
+
+# Largest rounding error allowed when checking that pictures fit in a knapsack
+EPSILON = 1e-9
+
+# First fit decreasing: take the pictures from longest to shortest and put each one in the first knapsack with enough
+# space left. The last knapsack holds all pictures, so every picture finds a place. O(P log P + P*K).
+def first_fit_decreasing(pictures: list[float], knapsacks: list[float]) -> list[list[int]]:
+  free = np.asarray(knapsacks, dtype=float) + EPSILON
+  knaps: list[list[int]] = [[] for _ in knapsacks]
+
+  for p in np.argsort(pictures, kind="stable")[::-1].tolist():
+    k = int(np.argmax(free >= pictures[p]))
+    knaps[k].append(p)
+    free[k] -= pictures[p]
+
+  return knaps
+
+# The pictures of a knapsack that exchanges are made of, and the sweeps over the knapsacks, are capped so that the
+# local search stays O(P log P + P*K) like first fit decreasing
+CANDIDATES = 24
+MAX_SWEEPS = 8
+
+# The chosen pictures in the order of the knapsack
+def candidates(knap: list[int], chosen: list[int]) -> list[int]:
+  chosen_set = set(chosen)
+  return [p for p in knap if p in chosen_set]
+
+# Groups of up to two of the given pictures, with their total length, shortest first
+def small_groups(pictures: list[float], candidates: list[int]) -> list[tuple[float, tuple[int, ...]]]:
+  groups = [group for r in range(3) for group in combinations(candidates, r)]
+  return sorted((sum(pictures[p] for p in group), group) for group in groups)
+
+# Local search between neighbouring knapsacks: exchange a group of at most two pictures of knapsack k for a longer
+# group of at most two pictures of knapsack k + 1 that still fits in k (an empty group of k moves pictures forward).
+# Single swaps alone never improve first fit decreasing, since every picture of k + 1 was longer than the space
+# left in k when it was placed, but exchanges with pairs do. Every step moves length to an earlier knapsack, so the
+# last knapsack only ever loses pictures and the total time never goes up. The groups of k are made of its
+# CANDIDATES shortest pictures and those of k + 1 of its CANDIDATES longest pictures that can still fit in k, so a
+# sweep takes O(n log n) per knapsack of n pictures, and the knapsacks are swept until nothing changes anymore or
+# MAX_SWEEPS times.
+def improve(pictures: list[float], knapsacks: list[float], knaps: list[list[int]]) -> list[list[int]]:
+  knaps = [list(knap) for knap in knaps]
+
+  for _ in range(MAX_SWEEPS):
+    changed = False
+    last = max(k for k in range(len(knaps)) if knaps[k])
+    for k in range(last):
+      free = knapsacks[k] - sum(pictures[p] for p in knaps[k]) + EPSILON
+      shortest = candidates(knaps[k], sorted(knaps[k], key=lambda p: pictures[p])[:CANDIDATES])
+      # No group of k + 1 longer than this fits in k, whatever group of k it replaces
+      longest = free + sum(sorted(pictures[p] for p in shortest)[-2:])
+      fitting = sorted((p for p in knaps[k + 1] if pictures[p] <= longest), key=lambda p: pictures[p])
+      later = small_groups(pictures, candidates(knaps[k + 1], fitting[-CANDIDATES:]))
+      sums = [size for (size, _) in later]
+
+      # The best exchange for every group of k: the longest group of k + 1 with size(a) < size(b) <= size(a) + free.
+      # It adds size(b) - size(a) to knapsack k.
+      (gain, a, b) = (0., (), ())
+      for (size, group) in small_groups(pictures, shortest):
+        i = bisect_right(sums, size + free) - 1
+        if sums[i] - size > gain:
+          (gain, a, b) = (sums[i] - size, group, later[i][1])
+
+      if gain == 0:
+        continue
+      for p in a:
+        knaps[k].remove(p)
+        knaps[k + 1].append(p)
+      for p in b:
+        knaps[k + 1].remove(p)
+        knaps[k].append(p)
+      changed = True
+    if not changed:
+      break
+
+  return knaps
+
+def greedy_schedule(pictures: list[float], knapsacks: list[float]) -> list[list[int]]:
+  return improve(pictures, knapsacks, first_fit_decreasing(pictures, knapsacks))
+
+# Lower bound on the total time from the LP relaxation of the compact formulation, whose objective is the total time
+def lp_bound(pictures: list[float], knapsacks: list[float], starts: list[float]) -> float:
+  solver = get_backend("glop")
+  solver.load(build_compact_model(pictures, knapsacks, starts))
+  solution = solver.solve()
+  if solution.status != "OPTIMAL":
+    fail_with(f"LP relaxation not solved: {solution.status}")
+  return solution.objective
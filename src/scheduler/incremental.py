@@ -0,0 +1,121 @@
+from typing import Optional
+import timeit
+import numpy as np
+
+from .backends import get_backend
+from .formulations import MatrixModel, FORMULATIONS, SOLUTIONS, total_time_bound
+from .heuristic import greedy_schedule
+from .instance import Blackout, Schedule, fail_with, get_knapsacks, get_starts, get_times
+
+# A model that is built once and then kept up to date while the blackouts and the pictures change between planning
+# rounds. Every change rebuilds the arrays of the model, which takes milliseconds, and the backend only gets the
+# coefficients and bounds that differ (see Backend.update). Each solve starts from the previous schedule.
+
+# Pictures live in slots: a picture id is the index of its slot. Removing a picture empties its slot by fixing its
+# x to 0 and dropping its assignment row (the first P rows of every formulation), so the matrix keeps its shape.
+# New pictures reuse empty slots. When there are none left the number of slots is doubled and the model is loaded
+# again, as it is when the number of blackouts changes.
+class Scheduler:
+  def __init__(self, pictures: list[float], blackouts: list[Blackout], formulation: str = "standard",
+               backend: str = "scip", threads: Optional[int] = None):
+    self.formulation = formulation
+    self.build_model = FORMULATIONS.get(formulation) or fail_with(f"Unknown formulation {formulation}")
+    self.solver = get_backend(backend, threads)
+    if not self.solver.is_mip:
+      fail_with(f"{backend} only solves the LP relaxation")
+
+    self.sizes = list(pictures)
+    self.active = [True] * len(pictures)
+    self.blackouts = sorted(blackouts)
+    self.previous: Optional[list[list[int]]] = None
+    self.reload = True
+
+  # Ids of the pictures that are in the schedule
+  @property
+  def pictures(self) -> list[int]:
+    return [p for p in range(len(self.sizes)) if self.active[p]]
+
+  def update_blackouts(self, blackouts: list[Blackout]) -> None:
+    self.reload |= len(blackouts) != len(self.blackouts)
+    self.blackouts = sorted(blackouts)
+
+  # Returns the ids of the new pictures
+  def add_pictures(self, pictures: list[float]) -> list[int]:
+    free = [p for p in range(len(self.sizes)) if not self.active[p]]
+    if len(free) < len(pictures):
+      # Double the slots, the new ones start out empty
+      grow = max(len(self.sizes), len(pictures) - len(free))
+      free += list(range(len(self.sizes), len(self.sizes) + grow))
+      self.sizes += [1.] * grow
+      self.active += [False] * grow
+      self.reload = True
+
+    ids = free[:len(pictures)]
+    for (p, size) in zip(ids, pictures):
+      self.sizes[p] = size
+      self.active[p] = True
+    return ids
+
+  def remove_pictures(self, ids: list[int]) -> None:
+    for p in ids:
+      self.active[p] = False
+
+  # The model for the current blackouts and pictures, with the empty slots switched off
+  def get_model(self, knapsacks: list[float], starts: list[float]) -> MatrixModel:
+    model = self.build_model(self.sizes, knapsacks, starts)
+    K = len(knapsacks)
+    empty = np.flatnonzero(~np.asarray(self.active))
+    cells = (empty[:, None] * K + np.arange(K)).ravel()
+
+    var_upper = model.var_upper.copy()
+    var_upper[cells] = 0
+    lower = model.lower.copy()
+    lower[empty] = 0
+    upper = model.upper.copy()
+    upper[empty] = 0
+    return model._replace(lower=lower, upper=upper, var_upper=var_upper)
+
+  # Solve for the current blackouts and pictures. The previous schedule is the hint if it still fits, otherwise
+  # (or if it is worse) the greedy schedule. Takes the same limits as formula_2.solve_anytime.
+  def solve(self, time_limit: Optional[float] = None, relative_gap: Optional[float] = None) -> Schedule:
+    if not any(self.active) or not self.blackouts:
+      fail_with("Trivial solution")
+
+    start = timeit.default_timer()
+    # Empty slots have length 0, so they do not count in the last knapsack or the sending times
+    sizes = [size if active else 0. for (size, active) in zip(self.sizes, self.active)]
+    knapsacks = get_knapsacks(sizes, self.blackouts)
+    starts = get_starts(self.blackouts)
+    K = len(knapsacks)
+
+    model = self.get_model(knapsacks, starts)
+    if self.reload:
+      self.solver.load(model)
+      self.reload = False
+    else:
+      self.solver.update(model)
+
+    ids = self.pictures
+    hint = greedy_schedule(sizes, knapsacks)
+    hint = [[p for p in knap if self.active[p]] for knap in hint]
+    if self.previous is not None and len(self.previous) == K:
+      previous = [[p for p in knap if self.active[p]] for knap in self.previous]
+      placed = {p for knap in previous for p in knap}
+      previous[-1] += [p for p in ids if p not in placed]
+      fits = all(sum(sizes[p] for p in knap) <= cap + 1e-9 for (knap, cap) in zip(previous, knapsacks))
+      if fits and get_times(sizes, self.blackouts, previous)[0] <= get_times(sizes, self.blackouts, hint)[0]:
+        hint = previous
+    values = SOLUTIONS[self.formulation](sizes, knapsacks, starts, hint)
+    self.solver.warm_start(values)
+
+    solution = self.solver.solve(time_limit, relative_gap)
+    bound = total_time_bound(self.formulation, solution.bound, sizes, knapsacks, starts)
+    (status, knaps) = ("FEASIBLE", hint)
+    if solution.status in ("OPTIMAL", "FEASIBLE"):
+      P = len(self.sizes)
+      x = solution.values[:P * K].reshape(P, K).round()
+      (status, knaps) = (solution.status, [[p for p in ids if x[p][k]] for k in range(K)])
+    self.previous = knaps
+
+    (total_time, times) = get_times(sizes, self.blackouts, knaps)
+    return Schedule(status, total_time, times, knaps, bound, timeit.default_timer() - start)
@@ -0,0 +1,209 @@
+from itertools import chain, pairwise   # must have python 3.10 for this to work
+from typing import NamedTuple, NoReturn, Optional
+import os
+import numpy as np
+
+from .validate import TOLERANCE, validate
+
+def fail_with(message: str) -> NoReturn:
+  print(message)
+  exit(1)
+
+Blackout = tuple[float, float]
+Input = tuple[list[float], list[Blackout]]
+
+# Everything an instance file can hold: the input, then (if given) the optimal total time and the picture positions
+Instance = tuple[list[float], list[Blackout], Optional[float], list[float]]
+
+def parse_blackout(line: str) -> Blackout:
+  [start, duration] = map(float, line.split(","))
+  return (start, start + duration)
+
+# An instance as NumPy arrays: the picture lengths, the blackouts as rows of start and end sorted like read_instance
+# sorts them, the optimal total time (nan if the file has none) and the picture positions (empty if it has none)
+class InstanceArrays(NamedTuple):
+  pictures: np.ndarray
+  blackouts: np.ndarray
+  expected: float
+  positions: np.ndarray
+
+# Reads the whole file at once and converts every section to floats in one go, instead of a line at a time.
+# The optimum and the positions are optional, and some instances write them in the wrong format (with a decimal
+# comma); both then come out as missing.
+def parse_arrays(data: bytes) -> InstanceArrays:
+  lines = data.splitlines()
+  P = int(lines[0])
+  pictures = np.array(lines[1:1 + P], dtype=float)
+  B = int(lines[1 + P])
+  # "start, duration" on every line
+  pairs = np.array(b" ".join(lines[2 + P:2 + P + B]).replace(b",", b" ").split(), dtype=float).reshape(B, 2)
+  blackouts = np.stack([pairs[:, 0], pairs[:, 0] + pairs[:, 1]], axis=1)
+  blackouts = blackouts[np.lexsort((blackouts[:, 1], blackouts[:, 0]))]
+
+  (expected, positions) = (np.nan, np.empty(0))
+  tail = lines[2 + P + B:3 + 2 * P + B]
+  if len(tail) == P + 1:
+    try:
+      values = np.array(tail, dtype=float)
+      (expected, positions) = (float(values[0]), values[1:])
+    except ValueError:
+      pass
+  return InstanceArrays(pictures, blackouts, expected, positions)
+
+# The arrays of an instance in one flat float64 array: P, B, the optimum, the pictures, the blackouts and the
+# positions. This is the layout of the binary sidecar, which np.load maps into memory instead of parsing.
+def flatten(arrays: InstanceArrays) -> np.ndarray:
+  header = [len(arrays.pictures), len(arrays.blackouts), arrays.expected]
+  return np.concatenate([header, arrays.pictures, arrays.blackouts.ravel(), arrays.positions])
+
+def unflatten(flat: np.ndarray) -> InstanceArrays:
+  (P, B) = (int(flat[0]), int(flat[1]))
+  return InstanceArrays(flat[3:3 + P], flat[3 + P:3 + P + 2 * B].reshape(B, 2), float(flat[2]), flat[3 + P + 2 * B:])
+
+# The binary format: the flat array in a .npy file, loaded memory mapped
+def save_arrays(path: str, arrays: InstanceArrays) -> None:
+  np.save(path, flatten(arrays))
+
+def load_arrays(path: str) -> InstanceArrays:
+  return unflatten(np.load(path, mmap_mode="r"))
+
+# The text of an instance file with every value written with `decimals` decimals, like the experiment instances.
+# Every section is formatted in one % operation instead of a line at a time.
+def format_arrays(arrays: InstanceArrays, decimals: int = 3) -> str:
+  number = f"%.{decimals}f\n"
+  (pictures, blackouts) = (arrays.pictures, arrays.blackouts)
+  (P, B) = (len(pictures), len(blackouts))
+  pairs = np.stack([blackouts[:, 0], blackouts[:, 1] - blackouts[:, 0]], axis=1).ravel()
+  parts = [f"{P}\n", (number * P) % tuple(pictures.tolist()), f"{B}\n",
+           (f"%.{decimals}f, %.{decimals}f\n" * B) % tuple(pairs.tolist())]
+  if not np.isnan(arrays.expected):
+    parts += [number % arrays.expected, (number * P) % tuple(arrays.positions.tolist())]
+  return "".join(parts)
+
+def write_arrays(path: str, arrays: InstanceArrays, decimals: int = 3) -> None:
+  with open(path, "w", encoding="UTF-8") as f:
+    f.write(format_arrays(arrays, decimals))
+
+# A .npy file next to an instance file of the same name, which read_arrays keeps up to date
+def is_sidecar(path: str) -> bool:
+  return path.endswith(".npy") and os.path.isfile(path[:-len(".npy")])
+
+# An instance in the binary format (a .npy file) is loaded as it is. With sidecar, the arrays of a text file are kept
+# next to it in <path>.npy and loaded from there (memory mapped) as long as it is newer than the instance file. Worth
+# it for large generated instances.
+def read_arrays(path: str, sidecar: bool = False) -> InstanceArrays:
+  if path.endswith(".npy"):
+    return load_arrays(path)
+  cached = path + ".npy"
+  if sidecar and os.path.isfile(cached) and os.path.getmtime(cached) >= os.path.getmtime(path):
+    return load_arrays(cached)
+
+  with open(path, "rb") as f:
+    arrays = parse_arrays(f.read())
+  if sidecar:
+    save_arrays(cached, arrays)
+  return arrays
+
+def read_instance(path: str, sidecar: bool = False) -> Instance:
+  (pictures, blackouts, expected, positions) = read_arrays(path, sidecar)
+  return (pictures.tolist(), list(zip(blackouts[:, 0].tolist(), blackouts[:, 1].tolist())),
+          None if np.isnan(expected) else expected, positions.tolist())
+
+def parse_input(path: str, sidecar: bool = False) -> Input:
+  (pictures, blackouts, _, _) = read_instance(path, sidecar)
+  return (pictures, blackouts)
+
+# Turn a list of blackouts into a list of knapsacks.
+def get_knapsacks(pictures: list[float], blackouts: list[Blackout]) -> list[float]:
+  knaps = [blackouts[0][0]] + [start - end for ((_, end), (start, _)) in pairwise(blackouts)] + [sum(pictures)]
+  return [round(k, 3) for k in knaps]
+
+# Knapsack k starts sending when the blackout before it ends
+def get_starts(blackouts: list[Blackout]) -> list[float]:
+  return [0.] + [end for (_, end) in blackouts]
+
+# A schedule as columns. Per picture: its knapsack (-1 if it is in none) and sending time. Per knapsack: the length of
+# its pictures, whether that fills it and whether it holds any.
+class Assignment(NamedTuple):
+  knapsack: np.ndarray
+  times: np.ndarray
+  fill: np.ndarray
+  full: np.ndarray
+  used: np.ndarray
+  total_time: float
+
+# Send the pictures of every knapsack back to back, starting when the knapsack opens. The pictures of all knapsacks
+# are laid out one after the other, so the sending times are one cumulative sum, less what the knapsacks before took.
+# The arrays keep the type of the input: integers stay integers (see scheduler/fixed_point.py).
+def assign(pictures: list[float], blackouts: list[Blackout], knaps: list[list[int]],
+           knapsacks: Optional[list[float]] = None) -> Assignment:
+  sizes = np.asarray(pictures)
+  K = len(knaps)
+  lengths = np.fromiter(map(len, knaps), dtype=np.int64, count=K)
+  order = np.fromiter(chain.from_iterable(knaps), dtype=np.int64, count=int(lengths.sum()))
+  of = np.repeat(np.arange(K), lengths)
+  starts = np.array([0] + [end for (_, end) in blackouts[:K - 1]])
+
+  # Length of all pictures up to the end of every knapsack
+  cumulative = np.concatenate([np.zeros(1, dtype=sizes.dtype), np.cumsum(sizes[order])])
+  ends = np.cumsum(lengths)
+  fill = cumulative[ends] - cumulative[ends - lengths]
+  knapsack = np.full(len(sizes), -1, dtype=np.int64)
+  knapsack[order] = of
+  times = np.zeros(len(sizes), dtype=np.result_type(sizes, starts))
+  times[order] = starts[of] + (cumulative[:-1] - np.repeat(cumulative[ends - lengths], lengths))
+
+  used = lengths > 0
+  full = used if knapsacks is None else used & (fill >= np.asarray(knapsacks[:K]) - TOLERANCE)
+  total_time = (times + sizes).max().item() if len(sizes) else 0.
+  return Assignment(knapsack, times, fill, full, used, total_time)
+
+# Returns the total time required to send all pictures and the sending time of each picture.
+def get_times(pictures: list[float], blackouts: list[Blackout], knaps: list[list[int]]) -> tuple[float, list[float]]:
+  assignment = assign(pictures, blackouts, knaps)
+  return (assignment.total_time, assignment.times.tolist())
+
+# The other way around: the pictures of every knapsack in the order they are sent, from their sending times. A picture
+# sent up to TOLERANCE before a knapsack opens is in it, as times from elsewhere can be rounded differently.
+def get_knaps(blackouts: list[Blackout], times: list[float]) -> list[list[int]]:
+  starts = np.asarray(get_starts(blackouts))
+  times = np.asarray(times)
+  knapsack = np.searchsorted(starts, times + (0 if times.dtype.kind in "iu" else TOLERANCE), side="right") - 1
+  order = np.lexsort((times, knapsack))
+  bounds = np.searchsorted(knapsack[order], np.arange(len(starts) + 1)).tolist()
+  return [order[first:last].tolist() for (first, last) in pairwise(bounds)]
+
+Output = tuple[float, list[float], float, int, int, int, float]
+
+# Everything a solver returns, from the pictures in each knapsack and the time it took to build and solve the model.
+# A knapsack is full when its pictures take all of it.
+def get_output(pictures: list[float], blackouts: list[Blackout], knapsacks: list[float], knaps: list[list[int]],
+               solve_time: float, build_time: float) -> Output:
+  num_knapsacks = len(knapsacks)
+  assignment = assign(pictures, blackouts, knaps, knapsacks)
+  num_full_knaps = int(assignment.full.sum())
+  num_used_knaps = int(np.flatnonzero(assignment.used)[-1])
+
+  # Every schedule a solver returns is checked, a broken one is reported but still returned
+  report = validate(pictures, blackouts, assignment.times)
+  if not report.ok:
+    print("Schedule is not feasible:", report.describe())
+
+  return (assignment.total_time, assignment.times.tolist(), solve_time, num_full_knaps, num_used_knaps, num_knapsacks, build_time)
+
+# A schedule found by a solver that may still be running or was stopped early. The status is the solver's:
+# OPTIMAL once it is proven optimal (up to the relative gap it was given), FEASIBLE before that.
+class Schedule(NamedTuple):
+  status: str
+  total_time: float
+  times: list[float]
+  knaps: list[list[int]]
+  # Lower bound on the total time found by the solver, 0 if there is none
+  bound: float
+  # Seconds since the solver started
+  elapsed: float
+
+  # Relative gap between the total time and the bound, 0 when the schedule is optimal
+  @property
+  def gap(self) -> float:
+    return max(0., (self.total_time - self.bound) / self.total_time) if self.total_time > 0 else 0.
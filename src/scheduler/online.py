@@ -0,0 +1,163 @@
+from typing import Optional
+import math
+import timeit
+
+from .decompose import WINDOW, rolling_horizon
+from .heuristic import EPSILON
+from .instance import Blackout, get_knapsacks, get_starts
+from .presolve import presolve_instance, expand_knaps
+
+# Scheduling pictures as they arrive, without knowing the ones that come later. Every picture goes into the first
+# gap that still has room for it (first fit, by time), which is found in O(log K) with a GapIndex. The pictures of
+# a gap are sent back to back once it opens, or from the moment they arrive if the gap is already open.
+# Time moves on with advance(now): gaps that are over are closed, and a gap that is open only has the time until its
+# blackout left. The pictures of the gaps that have not opened yet are not sent yet and can still be moved: every
+# `reoptimize_every` pictures they are solved again as an instance of their own (with the rolling horizon of
+# decompose.py, so with a time limit per window), and the new schedule is kept when it ends earlier.
+
+REOPTIMIZE_EVERY = 25
+REOPTIMIZE_TIME_LIMIT = 1.
+
+# Segment tree over the free time of the gaps: the first gap from a given one on that has room for a picture, in
+# O(log K), and an update when a gap fills up or closes in O(log K)
+class GapIndex:
+  def __init__(self, free: list[float]):
+    self.count = len(free)
+    self.size = 1
+    while self.size < self.count:
+      self.size *= 2
+    self.tree = [-math.inf] * (2 * self.size)
+    self.tree[self.size:self.size + self.count] = free
+    for i in range(self.size - 1, 0, -1):
+      self.tree[i] = max(self.tree[2 * i], self.tree[2 * i + 1])
+
+  def update(self, k: int, free: float) -> None:
+    i = k + self.size
+    self.tree[i] = free
+    i //= 2
+    while i:
+      self.tree[i] = max(self.tree[2 * i], self.tree[2 * i + 1])
+      i //= 2
+
+  # The first gap from `first` on with at least `size` free, -1 if there is none
+  def first_fit(self, size: float, first: int = 0) -> int:
+    if first >= self.count:
+      return -1
+    i = first + self.size
+    if self.tree[i] >= size:
+      return first
+    # Up until the subtree right next to the part searched so far has room
+    while True:
+      if i == 1:
+        return -1
+      if i % 2 == 0 and self.tree[i + 1] >= size:
+        i += 1
+        break
+      i //= 2
+    # Down to its first gap with room
+    while i < self.size:
+      i = 2 * i if self.tree[2 * i] >= size else 2 * i + 1
+    return i - self.size
+
+class OnlineScheduler:
+  def __init__(self, blackouts: list[Blackout], formulation: str = "compact", backend: str = "scip",
+               reoptimize_every: Optional[int] = REOPTIMIZE_EVERY, time_limit: Optional[float] = REOPTIMIZE_TIME_LIMIT,
+               window: int = WINDOW):
+    self.blackouts = sorted(blackouts)
+    self.starts = get_starts(self.blackouts)
+    # The gap after the last blackout never closes
+    self.capacities = get_knapsacks([], self.blackouts)[:-1] + [math.inf]
+    self.ends = [start + capacity for (start, capacity) in zip(self.starts, self.capacities)]
+    K = len(self.capacities)
+    # When the pictures of every gap are done, and the pictures in it
+    self.queues = list(self.starts)
+    self.knaps: list[list[int]] = [[] for _ in range(K)]
+    self.index = GapIndex(list(self.capacities))
+
+    (self.formulation, self.backend, self.window) = (formulation, backend, window)
+    (self.reoptimize_every, self.time_limit) = (reoptimize_every, time_limit)
+    self.sizes: list[float] = []
+    self.times: list[float] = []
+    self.now = 0.
+    # The first gap that is not over
+    self.current = 0
+    # Seconds spent placing pictures and reoptimizing, how often it ran and how often it found a better schedule
+    self.place_time = 0.
+    self.reoptimize_time = 0.
+    self.reoptimizations = 0
+    self.improvements = 0
+
+  # Moves the clock on: the gaps that are over are closed, the open one only has the time until its blackout left
+  def advance(self, now: float) -> None:
+    self.now = max(self.now, now)
+    K = len(self.capacities)
+    while self.current < K and self.ends[self.current] <= self.now:
+      self.index.update(self.current, -math.inf)
+      self.current += 1
+    if self.current < K and self.starts[self.current] < self.now:
+      k = self.current
+      self.index.update(k, self.ends[k] - max(self.queues[k], self.now))
+
+  # Places a picture that arrives now (or at `now`) and returns its id
+  def add(self, size: float, now: Optional[float] = None) -> int:
+    start = timeit.default_timer()
+    if now is not None:
+      self.advance(now)
+    k = self.index.first_fit(size - EPSILON, self.current)
+    p = len(self.sizes)
+    self.sizes.append(size)
+    self.times.append(max(self.queues[k], self.now))
+    self.queues[k] = self.times[p] + size
+    self.knaps[k].append(p)
+    self.index.update(k, self.ends[k] - self.queues[k])
+    self.place_time += timeit.default_timer() - start
+
+    if self.reoptimize_every and len(self.sizes) % self.reoptimize_every == 0:
+      self.reoptimize()
+    return p
+
+  # The time all pictures so far are sent
+  @property
+  def total_time(self) -> float:
+    return max((self.queues[k] for k in range(len(self.knaps)) if self.knaps[k]), default=0.)
+
+  # Pictures placed per second, not counting the reoptimizations
+  @property
+  def throughput(self) -> float:
+    return len(self.sizes) / self.place_time if self.place_time > 0 else math.inf
+
+  # Solves the pictures of the gaps that have not opened yet again, in those gaps. Returns whether the schedule
+  # got better.
+  def reoptimize(self) -> bool:
+    start = timeit.default_timer()
+    self.reoptimizations += 1
+    first = next((k for k in range(self.current, len(self.knaps)) if self.starts[k] >= self.now), len(self.knaps))
+    used = [k for k in range(first, len(self.knaps)) if self.knaps[k]]
+    improved = False
+    if used:
+      gaps = list(range(first, used[-1] + 1))
+      ids = [p for k in gaps for p in self.knaps[k]]
+      pictures = [self.sizes[p] for p in ids]
+      local = {p: i for (i, p) in enumerate(ids)}
+      knaps = [[local[p] for p in self.knaps[k]] for k in gaps]
+      capacities = [min(self.capacities[k], sum(pictures)) for k in gaps]
+      presolved = presolve_instance(pictures, capacities, [self.starts[k] for k in gaps], knaps)
+      counts = rolling_horizon(presolved, self.formulation, self.backend, self.window, time_limit=self.time_limit,
+                               single_time_limit=self.time_limit)
+
+      if counts is not None:
+        new = expand_knaps(presolved, counts.ravel())
+        end = lambda knaps: max(self.starts[k] + sum(pictures[p] for p in knaps[i]) for (i, k) in enumerate(gaps)
+                                if knaps[i])
+        if end(new) < end(knaps) - EPSILON:
+          for (i, k) in enumerate(gaps):
+            self.knaps[k] = [ids[p] for p in new[i]]
+            self.queues[k] = self.starts[k]
+            for p in self.knaps[k]:
+              self.times[p] = self.queues[k]
+              self.queues[k] += self.sizes[p]
+            self.index.update(k, self.ends[k] - self.queues[k])
+          self.improvements += 1
+          improved = True
+    self.reoptimize_time += timeit.default_timer() - start
+    return improved
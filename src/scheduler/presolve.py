@@ -0,0 +1,75 @@
+from typing import NamedTuple
+import numpy as np
+
+from .heuristic import EPSILON
+
+# Shrinks an instance before the model is built, and maps the solution of the smaller model back:
+# * identical pictures: pictures of the same length are one group, with an integer count per knapsack instead of a
+#   0/1 variable per picture (see the counts of the formulations). Swapping two of them no longer gives another
+#   solution for the solver to branch on.
+# * gaps that are too small: a gap shorter than the shortest picture stays empty in every schedule, so it is left
+#   out. The formulations only look at the starts of the knapsacks that are left, so the total time stays the same.
+# * trailing knapsacks: no schedule at least as good as the greedy one uses a knapsack that opens after the greedy
+#   schedule is done, so the model ends at the last knapsack of the greedy schedule. The gaps after it open after its
+#   capacity runs out, which is after the greedy schedule ends.
+
+class Presolved(NamedTuple):
+  # The length of the pictures in every group, how many pictures it has and which ones
+  sizes: list[float]
+  counts: list[int]
+  groups: list[list[int]]
+  # The original index, capacity and start of every knapsack that is kept
+  kept: list[int]
+  knapsacks: list[float]
+  starts: list[float]
+  num_pictures: int
+  num_knapsacks: int
+  too_small: int
+  trailing: int
+
+def presolve_instance(pictures: list[float], knapsacks: list[float], starts: list[float], greedy: list[list[int]]) -> Presolved:
+  # In the order the lengths first appear, so an instance without duplicates keeps the same model
+  sizes = list(dict.fromkeys(pictures))
+  group = {size: g for (g, size) in enumerate(sizes)}
+  groups: list[list[int]] = [[] for _ in sizes]
+  for (p, size) in enumerate(pictures):
+    groups[group[size]].append(p)
+
+  last = max(k for k in range(len(greedy)) if greedy[k])
+  shortest = min(pictures)
+  kept = [k for k in range(last) if knapsacks[k] + EPSILON >= shortest] + [last]
+
+  return Presolved(sizes, [len(g) for g in groups], groups, kept, [knapsacks[k] for k in kept],
+                   [starts[k] for k in kept], len(pictures), len(knapsacks), last + 1 - len(kept),
+                   len(knapsacks) - last - 1)
+
+# The instance as it is, every picture its own group and all knapsacks kept
+def no_presolve(pictures: list[float], knapsacks: list[float], starts: list[float]) -> Presolved:
+  K = len(knapsacks)
+  return Presolved(list(pictures), [1] * len(pictures), [[p] for p in range(len(pictures))], list(range(K)),
+                   list(knapsacks), list(starts), len(pictures), K, 0, 0)
+
+# A schedule of the pictures as a schedule of the groups in the kept knapsacks. It must only use kept knapsacks,
+# which every schedule at least as good as the greedy one does.
+def reduce_knaps(presolved: Presolved, knaps: list[list[int]]) -> list[list[int]]:
+  group = {p: g for (g, pictures) in enumerate(presolved.groups) for p in pictures}
+  return [[group[p] for p in knaps[k]] for k in presolved.kept]
+
+# The pictures in every knapsack of the original instance from the values of the smaller model (x comes first)
+def expand_knaps(presolved: Presolved, values: np.ndarray) -> list[list[int]]:
+  (G, K) = (len(presolved.sizes), len(presolved.kept))
+  x = values[:G * K].reshape(G, K).round().astype(int)
+  queues = [list(pictures) for pictures in presolved.groups]
+  knaps: list[list[int]] = [[] for _ in range(presolved.num_knapsacks)]
+  for (j, k) in enumerate(presolved.kept):
+    for g in np.flatnonzero(x[:, j]).tolist():
+      knaps[k] += [queues[g].pop() for _ in range(x[g, j])]
+  return knaps
+
+# How much smaller the model got
+def describe(presolved: Presolved) -> str:
+  (P, K) = (presolved.num_pictures, presolved.num_knapsacks)
+  (G, kept) = (len(presolved.sizes), len(presolved.kept))
+  return (f"Presolve: {P} pictures in {G} groups, {kept} of {K} knapsacks kept ({presolved.too_small} too small, "
+          f"{presolved.trailing} after the greedy schedule), {P * K} -> {G * kept} assignment variables")
+
@@ -0,0 +1,115 @@
+import os
+import re
+import numpy as np
+
+from .instance import Assignment, Blackout, fail_with, get_starts
+
+try:
+  import pyarrow
+  import pyarrow.parquet
+except ImportError:
+  pyarrow = None
+
+# Results as columns: a NumPy array per column, all of the same length, in the order they are written. A table is
+# written in one go, in the format of the file's extension: .npz (np.savez_compressed), .parquet (needs pyarrow) or
+# .csv (separated by semicolons like the other result files, missing values left empty).
+
+Table = dict[str, np.ndarray]
+
+FORMATS = ["csv", "npz", "parquet"]
+
+# A column of Python values: numbers with None become floats with nan for None, anything else stays as NumPy makes it
+def as_column(values) -> np.ndarray:
+  column = np.asarray(values)
+  if column.dtype == object and all(v is None or isinstance(v, (int, float)) for v in column.tolist()):
+    column = np.array([np.nan if v is None else v for v in column.tolist()], dtype=float)
+  return column
+
+# The columns of a list of rows, every row a tuple in the order of names
+def from_rows(names: list[str], rows: list[tuple]) -> Table:
+  columns = zip(*rows) if rows else [[]] * len(names)
+  return {name: as_column(list(column)) for (name, column) in zip(names, columns)}
+
+def table_format(path: str) -> str:
+  format = os.path.splitext(path)[1][1:].lower()
+  if format not in FORMATS:
+    fail_with(f"Unknown results format {path}, use one of {', '.join('.' + f for f in FORMATS)}")
+  return format
+
+# Every column is turned into text at once (floats as short as Python writes them), and the file in one write
+def format_csv(table: Table, separator: str = ";") -> str:
+  texts = []
+  for column in table.values():
+    text = column.astype(str)
+    if column.dtype.kind == "f":
+      text[np.isnan(column)] = ""
+    texts.append(text.tolist())
+  lines = [separator.join(table)] + [separator.join(row) for row in zip(*texts)]
+  return "\n".join(lines) + "\n"
+
+def write_table(path: str, table: Table, separator: str = ";") -> None:
+  format = table_format(path)
+  if format == "npz":
+    np.savez_compressed(path, **table)
+  elif format == "parquet":
+    if pyarrow is None:
+      fail_with("Writing Parquet needs pyarrow")
+    pyarrow.parquet.write_table(pyarrow.table(table), path)
+  else:
+    with open(path, "w", encoding="UTF-8") as f:
+      f.write(format_csv(table, separator))
+
+def read_table(path: str, separator: str = ";") -> Table:
+  format = table_format(path)
+  if format == "npz":
+    with np.load(path) as data:
+      return {name: data[name] for name in data.files}
+  if format == "parquet":
+    if pyarrow is None:
+      fail_with("Reading Parquet needs pyarrow")
+    table = pyarrow.parquet.read_table(path)
+    return {name: table[name].to_numpy() for name in table.column_names}
+  with open(path, encoding="UTF-8") as f:
+    lines = f.read().splitlines()
+  names = lines[0].split(separator)
+  columns = zip(*(line.split(separator) for line in lines[1:])) if len(lines) > 1 else [()] * len(names)
+  return {name: parse_column(list(column)) for (name, column) in zip(names, columns)}
+
+# Numbers as format_csv writes them. Python also reads "17_16" (a case name) as a number, so the text is checked
+# against these before it is converted.
+INTEGER = re.compile(r"[+-]?\d+")
+FLOAT = re.compile(r"[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?|[+-]?inf|nan|")
+
+# The type of a CSV column from its text: integers, floats (empty is nan), booleans or else text
+def parse_column(texts: list[str]) -> np.ndarray:
+  column = np.array(texts, dtype=str)
+  if all(text in ("True", "False") for text in texts) and texts:
+    return column == "True"
+  if all(INTEGER.fullmatch(text) for text in texts):
+    return column.astype(np.int64)
+  if all(FLOAT.fullmatch(text) for text in texts):
+    return np.where(column == "", "nan", column).astype(float)
+  return column
+
+# A schedule as two tables. Per picture: its length, knapsack, sending time and end. Per knapsack: when it opens, its
+# capacity, the length of its pictures, whether they fill it and whether it holds any.
+def picture_table(pictures: list[float], assignment: Assignment) -> Table:
+  sizes = np.asarray(pictures)
+  return {"picture": np.arange(len(sizes)), "length": sizes, "knapsack": assignment.knapsack,
+          "time": assignment.times, "end": assignment.times + sizes}
+
+def knapsack_table(blackouts: list[Blackout], knapsacks: list[float], assignment: Assignment) -> Table:
+  K = len(assignment.fill)
+  return {"knapsack": np.arange(K), "start": np.asarray(get_starts(blackouts)[:K]),
+          "capacity": np.asarray(knapsacks[:K]), "fill": assignment.fill, "full": assignment.full,
+          "used": assignment.used}
+
+# The knapsack table goes next to the picture table, as <name>.knapsacks.<extension>
+def knapsacks_path(path: str) -> str:
+  (root, extension) = os.path.splitext(path)
+  return f"{root}.knapsacks{extension}"
+
+def write_schedule(path: str, pictures: list[float], blackouts: list[Blackout], knapsacks: list[float],
+                   assignment: Assignment) -> None:
+  write_table(path, picture_table(pictures, assignment))
+  write_table(knapsacks_path(path), knapsack_table(blackouts, knapsacks, assignment))
@@ -0,0 +1,90 @@
+from contextlib import contextmanager
+from typing import Iterator, Optional
+import json
+import os
+import timeit
+
+from .formulations import MatrixModel
+from .backends import Solution
+
+# Not available on Windows, the peak memory is then left out
+try:
+  import resource
+except ImportError:
+  resource = None
+
+# What a solve did and how long every part of it took. The solve functions take one and fill it in as they go: the
+# time of every phase, the size of the model the solver got, the nodes and iterations the solver needed and the peak
+# memory of the process. The phases are also kept as spans on the timer, for a Chrome trace.
+
+# The phases in the order they run; not every solve goes through all of them
+PHASES = ["parse", "knapsacks", "cache", "heuristic", "bound", "presolve", "build", "load", "solve", "extract", "output"]
+
+# The columns of row(), for result files
+COLUMNS = [f"time_{phase}" for phase in PHASES] + ["variables", "constraints", "nonzeros", "nodes", "iterations",
+                                                   "peak_rss_mb"]
+
+class SolveStats:
+  def __init__(self):
+    # Seconds spent in every phase, and (phase, start, duration) of every time one ran
+    self.phases: dict[str, float] = {}
+    self.spans: list[tuple[str, float, float]] = []
+    # Of the model the solver got, after the presolve; 0 if no model was built
+    self.variables = 0
+    self.constraints = 0
+    self.nonzeros = 0
+    # Branch and bound nodes and simplex iterations, -1 where the backend does not report them
+    self.nodes = -1
+    self.iterations = -1
+    self.peak_rss_mb = float("nan")
+
+  # Times the code in the with block as the phase `name`. A phase that runs more than once adds up. The peak memory
+  # is measured after every phase, so it is up to date whichever phase came last.
+  @contextmanager
+  def phase(self, name: str) -> Iterator[None]:
+    start = timeit.default_timer()
+    try:
+      yield
+    finally:
+      duration = timeit.default_timer() - start
+      self.phases[name] = self.phases.get(name, 0.) + duration
+      self.spans.append((name, start, duration))
+      self.measure_memory()
+
+  def count_model(self, model: MatrixModel) -> None:
+    (self.constraints, self.variables) = model.matrix.shape
+    self.nonzeros = model.matrix.nnz
+
+  def count_solution(self, solution: Solution) -> None:
+    (self.nodes, self.iterations) = (solution.nodes, solution.iterations)
+
+  # The peak resident memory of the process so far (ru_maxrss is in kilobytes on Linux and bytes on macOS)
+  def measure_memory(self) -> None:
+    if resource is not None:
+      peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+      self.peak_rss_mb = peak / (2 ** 20 if os.uname().sysname == "Darwin" else 2 ** 10)
+
+  def total_time(self) -> float:
+    return sum(self.phases.values())
+
+  # The values of COLUMNS, with 0 for the phases that did not run
+  def row(self) -> list[float]:
+    return [self.phases.get(phase, 0.) for phase in PHASES] + [self.variables, self.constraints, self.nonzeros,
+                                                               self.nodes, self.iterations, self.peak_rss_mb]
+
+  def describe(self) -> str:
+    phases = ", ".join(f"{phase} {seconds * 1000:.1f}ms" for (phase, seconds) in self.phases.items())
+    return (f"Phases: {phases}\nModel: {self.variables} variables, {self.constraints} constraints, "
+            f"{self.nonzeros} nonzeros; {self.nodes} nodes, {self.iterations} iterations; "
+            f"peak memory {self.peak_rss_mb:.1f} MB")
+
+  # The phases as a trace for chrome://tracing or Perfetto, with the model size and the memory as metadata
+  def write_trace(self, path: str, name: Optional[str] = None) -> None:
+    origin = min((start for (_, start, _) in self.spans), default=0.)
+    events = [{"name": phase, "cat": "solve", "ph": "X", "pid": os.getpid(), "tid": 0,
+               "ts": (start - origin) * 1e6, "dur": duration * 1e6} for (phase, start, duration) in self.spans]
+    metadata = dict(zip(COLUMNS[len(PHASES):], self.row()[len(PHASES):]))
+    if name is not None:
+      metadata["instance"] = name
+    with open(path, "w", encoding="UTF-8") as f:
+      json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": metadata}, f)
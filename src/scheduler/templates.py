@@ -0,0 +1,76 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+
+from .backends import Backend, get_backend
+from .formulations import MatrixModel
+
+# Models kept loaded between instances of the same shape. A model's matrix only depends on the number of picture
+# lengths and knapsacks (after presolving), the lengths, capacities and starts are its coefficients and bounds. So a
+# solver that solved an instance of a shape is kept as the template of that shape, and the next instance of it is
+# patched into it (Backend.update: only what differs, or a load into the same solver when nearly everything does)
+# instead of creating a solver and loading the model from scratch, which takes most of the time on small models.
+# Templates are evicted least recently used first once they take more than max_bytes together.
+
+# What a template takes in memory: a SCIP solver takes about 2 MB, and up to 64 times the arrays of its model once it
+# has solved it (measured on experiment_instances_2 and generated instances of up to 2000 pictures)
+SOLVER_BYTES = 2 * 2 ** 20
+MODEL_FACTOR = 64
+MAX_BYTES = 256 * 2 ** 20
+
+# Formulation, backend, number of picture lengths and number of knapsacks
+Shape = tuple[str, str, int, int]
+
+def model_bytes(model: MatrixModel) -> int:
+  matrix = model.matrix
+  arrays = (matrix.data, matrix.indices, matrix.indptr, model.lower, model.upper, model.objective, model.var_upper,
+            model.integral)
+  return sum(array.nbytes for array in arrays)
+
+def footprint(model: MatrixModel) -> int:
+  return SOLVER_BYTES + MODEL_FACTOR * model_bytes(model)
+
+# A template is taken out while its solver is in use and put back after the solve, so two solves of the same shape
+# at the same time each get a solver of their own. Only one template per shape is kept.
+class TemplateCache:
+  def __init__(self, max_bytes: int = MAX_BYTES, threads: Optional[int] = None):
+    self.max_bytes = max_bytes
+    self.threads = threads
+    self.templates: OrderedDict[Shape, tuple[Backend, int]] = OrderedDict()
+    self.bytes = 0
+    self.lock = Lock()
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+  # The template of the shape, taken out of the cache, or a new solver of the backend
+  def take(self, shape: Shape) -> Backend:
+    with self.lock:
+      found = self.templates.pop(shape, None)
+      if found is None:
+        self.misses += 1
+        return get_backend(shape[1], self.threads)
+      self.hits += 1
+      self.bytes -= found[1]
+      return found[0]
+
+  # Puts the solver back as the template of the shape, with the model it has loaded
+  def put(self, shape: Shape, solver: Backend, model: MatrixModel) -> None:
+    size = footprint(model)
+    with self.lock:
+      old = self.templates.pop(shape, None)
+      if old is not None:
+        self.bytes -= old[1]
+      self.templates[shape] = (solver, size)
+      self.bytes += size
+      while self.bytes > self.max_bytes and self.templates:
+        (_, (_, evicted)) = self.templates.popitem(last=False)
+        self.bytes -= evicted
+        self.evictions += 1
+
+  def __len__(self) -> int:
+    return len(self.templates)
+
+  def describe(self) -> str:
+    return (f"{len(self)} templates, {self.bytes / 2 ** 20:.1f} MB, {self.hits} hits, {self.misses} misses, "
+            f"{self.evictions} evicted")
@@ -0,0 +1,89 @@
+from typing import NamedTuple, Optional
+import numpy as np
+
+# Checks a schedule (the sending time of every picture) against the instance with NumPy instead of an interval tree:
+# the pictures are sorted by start once, and every picture is compared with the one before it that ends last and,
+# through searchsorted, with the only blackout it could run into. That is O(P log P + P log B) in a few array
+# operations, and every violation is reported instead of stopping at the first one.
+
+# Sending times and lengths are written with a few decimals, so they are compared up to this. A schedule in ticks
+# (all integers, see fixed_point.py) is compared exactly.
+TOLERANCE = 1e-6
+
+# kind is one of "count", "negative", "picture", "blackout" or "total time". picture is the picture that breaks the
+# schedule (-1 for the whole schedule) and other the picture or blackout it overlaps (-1 if none). amount is how far
+# it is off: the length of the overlap, how far before 0 it starts or how far the total time is from the expected one.
+class Violation(NamedTuple):
+  kind: str
+  picture: int
+  other: int
+  amount: float
+
+class Report(NamedTuple):
+  violations: list[Violation]
+  total_time: float
+
+  @property
+  def ok(self) -> bool:
+    return not self.violations
+
+  # A line per kind of violation with the first few of them
+  def describe(self, limit: int = 5) -> str:
+    if self.ok:
+      return f"Feasible, total time {self.total_time}"
+    lines = [f"{len(self.violations)} violations, total time {self.total_time}"]
+    for kind in dict.fromkeys(v.kind for v in self.violations):
+      found = [v for v in self.violations if v.kind == kind]
+      shown = ", ".join(f"{v.picture}/{v.other} by {v.amount:.6g}" for v in found[:limit])
+      lines.append(f"  {kind}: {len(found)} ({shown}{', ...' if len(found) > limit else ''})")
+    return "\n".join(lines)
+
+# Integers stay integers, anything else becomes float
+def as_array(values) -> np.ndarray:
+  array = np.asarray(values)
+  return array if array.dtype.kind in "iu" else array.astype(float)
+
+# blackouts are (start, end) pairs. With expected, the end of the last picture has to be the expected total time.
+def validate(pictures, blackouts, times, expected: Optional[float] = None) -> Report:
+  sizes = as_array(pictures)
+  starts = as_array(times)
+  if len(sizes) != len(starts):
+    return Report([Violation("count", -1, -1, float(len(starts) - len(sizes)))], np.nan)
+  if len(sizes) == 0:
+    return Report([], 0.)
+  ends = starts + sizes
+  spans = as_array(blackouts).reshape(-1, 2)
+  integral = all(array.dtype.kind in "iu" for array in (sizes, starts, spans))
+  integral &= expected is None or isinstance(expected, int)
+  tolerance = 0 if integral else TOLERANCE
+  violations: list[Violation] = []
+
+  negative = np.flatnonzero(starts < -tolerance)
+  violations += [Violation("negative", p, -1, -s) for (p, s) in zip(negative.tolist(), starts[negative].tolist())]
+
+  # Pictures: in the order of their start, every picture has to start after all earlier ones have ended. The one that
+  # ends last is the one it overlaps most.
+  order = np.argsort(starts, kind="stable")
+  sorted_ends = ends[order]
+  latest = np.maximum.accumulate(sorted_ends)
+  # Position (in the sorted order) of the picture that ends last up to every position
+  last = np.maximum.accumulate(np.where(sorted_ends >= latest, np.arange(len(order)), 0))
+  overlap = latest[:-1] - starts[order[1:]]
+  for i in np.flatnonzero(overlap > tolerance).tolist():
+    violations.append(Violation("picture", int(order[i + 1]), int(order[last[i]]), float(overlap[i])))
+
+  # Blackouts: the first blackout that ends after a picture starts is the only one it can run into
+  if len(spans):
+    by_start = np.argsort(spans[:, 0], kind="stable")
+    (b_starts, b_ends) = (spans[by_start, 0], np.maximum.accumulate(spans[by_start, 1]))
+    b = np.searchsorted(b_ends, starts + tolerance, side="right")
+    hit = b < len(b_starts)
+    b_hit = np.minimum(b, len(b_starts) - 1)
+    overlap = np.minimum(ends, b_ends[b_hit]) - np.maximum(starts, b_starts[b_hit])
+    for p in np.flatnonzero(hit & (overlap > tolerance)).tolist():
+      violations.append(Violation("blackout", p, int(by_start[b_hit[p]]), float(overlap[p])))
+
+  total_time = ends.max().item()
+  if expected is not None and abs(total_time - expected) > tolerance:
+    violations.append(Violation("total time", -1, -1, total_time - expected))
+  return Report(violations, total_time)
@@ -0,0 +1,291 @@
+from argparse import ArgumentParser
+from typing import Any, Optional
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import signal
+import sys
+
+import formula_2
+from scheduler import Backend, BACKENDS, FORMULATIONS, Blackout, Schedule, get_backend
+
+# Scheduling from asyncio: `await schedule(pictures, blackouts, deadline=...)` solves an instance in a worker process
+# and returns the Schedule of formula_2.solve_anytime. `python service.py` serves the same over HTTP on localhost or
+# on a Unix socket (POST /schedule, GET /status).
+# * The workers are processes that set up Python, OR tools and their solvers once, like those of solve_many.py, and
+#   solve one instance at a time. A solve that nobody waits for any more (every caller was cancelled or passed its
+#   deadline, or the client went away) is interrupted by killing its worker, and a new worker is started in its place.
+# * Identical requests (the same pictures, blackouts, formulation and backend) that come in while one is solved wait
+#   for that solve instead of starting another one.
+# * At most `max_pending` solves wait for a worker, beyond that a request fails with Overloaded (HTTP 503) at once.
+# * The solver gets part of the deadline as its time limit, so the best schedule found by then comes back in time.
+#   A request that joins a solve waits at most for its own deadline.
+
+MAX_PENDING = 64
+# Part of the deadline the solver gets as its time limit, the rest is for the heuristic, building and loading the
+# model and sending the result back
+DEADLINE_SHARE = 0.6
+# Bytes of a request body
+MAX_BODY = 64 * 2 ** 20
+
+class Overloaded(RuntimeError):
+  pass
+
+# Runs in the worker process: solves every instance that comes in on the connection and sends back the Schedule, or
+# a RuntimeError with the reason the solve failed
+def work(connection, threads: int) -> None:
+  # Ctrl-C is for the server, which stops the workers
+  signal.signal(signal.SIGINT, signal.SIG_IGN)
+  solvers: dict[str, Backend] = {}
+  while True:
+    try:
+      (input, formulation, backend, time_limit) = connection.recv()
+    except EOFError:
+      return
+    printed = io.StringIO()
+    try:
+      with contextlib.redirect_stdout(printed):
+        if backend not in solvers:
+          solvers[backend] = get_backend(backend, threads)
+        result = formula_2.solve_anytime(input, formulation, backend, time_limit, solver=solvers[backend])
+    except (SystemExit, Exception) as error:
+      # fail_with prints the reason before it exits
+      lines = printed.getvalue().splitlines()
+      result = RuntimeError(lines[-1] if isinstance(error, SystemExit) and lines else repr(error))
+    connection.send(result)
+
+class Worker:
+  def __init__(self, context: Any, threads: int):
+    (self.connection, child) = context.Pipe()
+    self.process = context.Process(target=work, args=(child, threads), daemon=True)
+    self.process.start()
+    child.close()
+
+  # Sends the job and waits for the result without blocking the event loop
+  async def run(self, job: tuple) -> Any:
+    loop = asyncio.get_running_loop()
+    ready = loop.create_future()
+    self.connection.send(job)
+    loop.add_reader(self.connection.fileno(), lambda: ready.done() or ready.set_result(None))
+    try:
+      await ready
+    finally:
+      loop.remove_reader(self.connection.fileno())
+    try:
+      return self.connection.recv()
+    except (EOFError, OSError):
+      raise RuntimeError(f"Worker stopped during the solve (exit code {self.process.exitcode})")
+
+  def stop(self) -> None:
+    if self.process.is_alive():
+      self.process.kill()
+    self.process.join()
+    self.connection.close()
+
+# A solve and the number of requests waiting for it
+class Job:
+  def __init__(self, task: asyncio.Task):
+    self.task = task
+    self.waiters = 0
+
+def request_key(input: tuple, formulation: str, backend: str) -> str:
+  return hashlib.sha256(json.dumps([input, formulation, backend]).encode()).hexdigest()
+
+class Service:
+  def __init__(self, workers: Optional[int] = None, max_pending: int = MAX_PENDING, formulation: str = "standard",
+               backend: str = "scip"):
+    self.workers = workers or os.cpu_count() or 1
+    # The workers share the cores, like in solve_many
+    self.threads = max(1, (os.cpu_count() or 1) // self.workers)
+    self.max_pending = max_pending
+    (self.formulation, self.backend) = (formulation, backend)
+    # Spawned rather than forked, so the workers do not inherit the event loop
+    self.context = multiprocessing.get_context("spawn")
+    self.idle: list[Worker] = []
+    self.free = asyncio.Semaphore(self.workers)
+    self.jobs: dict[str, Job] = {}
+    self.running = 0
+    self.counts = {"requests": 0, "solves": 0, "coalesced": 0, "rejected": 0, "interrupted": 0, "timeouts": 0}
+
+  # Starts the workers up front, so the first requests do not wait for Python and OR tools to load
+  def start(self) -> None:
+    while len(self.idle) < self.workers - self.running:
+      self.idle.append(Worker(self.context, self.threads))
+
+  def close(self) -> None:
+    for job in self.jobs.values():
+      job.task.cancel()
+    for worker in self.idle:
+      worker.stop()
+    self.idle.clear()
+
+  def status(self) -> dict[str, Any]:
+    return {**self.counts, "running": self.running, "pending": self.pending(), "workers": self.workers,
+            "max_pending": self.max_pending}
+
+  # Solves waiting for a worker: every solve gets one as soon as one is free
+  def pending(self) -> int:
+    return max(0, len(self.jobs) - self.workers)
+
+  async def solve(self, input: tuple, formulation: str, backend: str, time_limit: Optional[float]) -> Schedule:
+    async with self.free:
+      worker = self.idle.pop() if self.idle else Worker(self.context, self.threads)
+      self.running += 1
+      self.counts["solves"] += 1
+      try:
+        result = await worker.run((input, formulation, backend, time_limit))
+      except BaseException:
+        # Cancelled: killing the worker is the only way to stop the solver in it. The new one loads while no one
+        # waits for it.
+        worker.stop()
+        self.idle.append(Worker(self.context, self.threads))
+        raise
+      finally:
+        self.running -= 1
+      self.idle.append(worker)
+    if isinstance(result, Exception):
+      raise result
+    return result
+
+  # The schedule of the instance (blackouts as (start, end) like formula_2.solve_anytime takes them), found within
+  # `deadline` seconds or raises TimeoutError
+  async def schedule(self, pictures: list[float], blackouts: list[Blackout], deadline: Optional[float] = None,
+                     formulation: Optional[str] = None, backend: Optional[str] = None) -> Schedule:
+    (formulation, backend) = (formulation or self.formulation, backend or self.backend)
+    input = ([float(p) for p in pictures], sorted((float(start), float(end)) for (start, end) in blackouts))
+    self.counts["requests"] += 1
+    key = request_key(input, formulation, backend)
+
+    job = self.jobs.get(key)
+    if job is not None:
+      self.counts["coalesced"] += 1
+    else:
+      if self.pending() >= self.max_pending:
+        self.counts["rejected"] += 1
+        raise Overloaded(f"{self.max_pending} solves are waiting for a worker")
+      time_limit = None if deadline is None else deadline * DEADLINE_SHARE
+      job = self.jobs[key] = Job(asyncio.create_task(self.solve(input, formulation, backend, time_limit)))
+      job.task.add_done_callback(lambda _: self.jobs.pop(key) if self.jobs.get(key) is job else None)
+
+    job.waiters += 1
+    try:
+      return await asyncio.wait_for(asyncio.shield(job.task), deadline)
+    except asyncio.TimeoutError:
+      self.counts["timeouts"] += 1
+      raise
+    finally:
+      job.waiters -= 1
+      if job.waiters == 0 and not job.task.done():
+        self.counts["interrupted"] += 1
+        job.task.cancel()
+
+# The service of `await schedule(...)`, started on the first call
+default_service: Optional[Service] = None
+
+async def schedule(pictures: list[float], blackouts: list[Blackout], deadline: Optional[float] = None,
+                   formulation: Optional[str] = None, backend: Optional[str] = None) -> Schedule:
+  global default_service
+  if default_service is None:
+    default_service = Service()
+  return await default_service.schedule(pictures, blackouts, deadline, formulation, backend)
+
+def to_json(schedule: Schedule) -> dict[str, Any]:
+  return {"status": schedule.status, "total_time": schedule.total_time, "times": schedule.times,
+          "knaps": schedule.knaps, "bound": schedule.bound, "gap": schedule.gap, "solve_time": schedule.elapsed}
+
+async def respond(writer: asyncio.StreamWriter, code: int, reason: str, body: dict[str, Any]) -> None:
+  data = json.dumps(body).encode()
+  writer.write(f"HTTP/1.1 {code} {reason}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+               f"Connection: close\r\n\r\n".encode() + data)
+  with contextlib.suppress(ConnectionError):
+    await writer.drain()
+
+# Solves the request while watching the connection: when the client closes it, the request is cancelled
+async def schedule_request(service: Service, reader: asyncio.StreamReader, request: dict[str, Any]) -> Schedule:
+  # Blackouts as [start, duration], like in the instance files and in the JSON lines of solve_many.py
+  blackouts = [(start, start + duration) for (start, duration) in request["blackouts"]]
+  solve = asyncio.ensure_future(service.schedule(request["pictures"], blackouts, request.get("deadline"),
+                                                 request.get("formulation"), request.get("backend")))
+  closed = asyncio.ensure_future(reader.read())
+  try:
+    await asyncio.wait([solve, closed], return_when=asyncio.FIRST_COMPLETED)
+  finally:
+    closed.cancel()
+    if not solve.done():
+      solve.cancel()
+  return solve.result()
+
+async def handle(service: Service, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+  try:
+    (method, path, _) = (await reader.readline()).decode("latin-1").split(" ", 2)
+    length = 0
+    while (line := (await reader.readline()).decode("latin-1").strip()):
+      (name, _, value) = line.partition(":")
+      if name.strip().lower() == "content-length":
+        length = int(value)
+    if length > MAX_BODY:
+      return await respond(writer, 413, "Payload Too Large", {"error": f"Bodies are at most {MAX_BODY} bytes"})
+    body = await reader.readexactly(length)
+
+    if method == "GET" and path == "/status":
+      return await respond(writer, 200, "OK", service.status())
+    if method != "POST" or path != "/schedule":
+      return await respond(writer, 404, "Not Found", {"error": "POST /schedule or GET /status"})
+    try:
+      request = json.loads(body)
+      schedule = await schedule_request(service, reader, request)
+    except (ValueError, KeyError, TypeError) as error:
+      return await respond(writer, 400, "Bad Request", {"error": repr(error)})
+    except Overloaded as error:
+      return await respond(writer, 503, "Service Unavailable", {"error": str(error)})
+    except asyncio.TimeoutError:
+      return await respond(writer, 504, "Gateway Timeout", {"error": "No schedule within the deadline"})
+    except asyncio.CancelledError:
+      # The client went away, unless the server is stopping
+      if asyncio.current_task().cancelling():
+        raise
+      return
+    except RuntimeError as error:
+      return await respond(writer, 500, "Internal Server Error", {"error": str(error)})
+    await respond(writer, 200, "OK", to_json(schedule))
+  except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+    await respond(writer, 400, "Bad Request", {"error": "Malformed HTTP request"})
+  finally:
+    writer.close()
+
+async def serve(host: str = "127.0.0.1", port: int = 8080, socket_path: Optional[str] = None,
+                workers: Optional[int] = None, max_pending: int = MAX_PENDING, formulation: str = "standard",
+                backend: str = "scip") -> None:
+  service = Service(workers, max_pending, formulation, backend)
+  service.start()
+  callback = lambda reader, writer: handle(service, reader, writer)
+  if socket_path:
+    server = await asyncio.start_unix_server(callback, socket_path)
+  else:
+    server = await asyncio.start_server(callback, host, port)
+  print(f"Serving on {socket_path or f'http://{host}:{port}'} with {service.workers} workers", file=sys.stderr)
+  try:
+    async with server:
+      await server.serve_forever()
+  finally:
+    service.close()
+
+if __name__ == "__main__":
+  parser = ArgumentParser(description="Serve the scheduler over HTTP on localhost or on a Unix socket.")
+  parser.add_argument("--host", default="127.0.0.1")
+  parser.add_argument("--port", type=int, default=8080)
+  parser.add_argument("--socket", dest="socket_path", help="Unix socket to listen on instead of the port")
+  parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of solver processes")
+  parser.add_argument("--max-pending", type=int, default=MAX_PENDING,
+                      help="solves that may wait for a worker before requests are turned away")
+  parser.add_argument("--formulation", choices=list(FORMULATIONS), default="standard")
+  parser.add_argument("--backend", choices=list(BACKENDS), default="scip")
+  args = parser.parse_args()
+
+  with contextlib.suppress(KeyboardInterrupt):
+    asyncio.run(serve(args.host, args.port, args.socket_path, args.workers, args.max_pending, args.formulation,
+                      args.backend))
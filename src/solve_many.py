@@ -0,0 +1,126 @@
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterable, Iterator, Optional, TextIO, Union
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import timeit
+
+import formula_2
+from scheduler import Input, BACKENDS, FORMULATIONS, TemplateCache, is_sidecar, parse_input
+
+# Solves many instances in one go and gives one result per instance, in the order of the instances.
+# Python, OR tools and the solver are set up once per worker process instead of once per instance: every worker keeps
+# a solver per model shape (see scheduler/templates.py) and patches the model of each instance into it. With more
+# than one worker, the instances are handed to a pool of processes, a few ahead of the results, so a long stream of
+# instances is not read in at once.
+
+# An instance is the path to an instance file, or a name with the input
+Task = Union[str, tuple[str, Input]]
+
+# The solvers of this process by model shape, see load_solver in formula_2
+templates: Optional[TemplateCache] = None
+
+def solve_one(task: Task, formulation: str, backend: str, time_limit: Optional[float],
+              relative_gap: Optional[float], threads: Optional[int]) -> dict[str, Any]:
+  global templates
+  start = timeit.default_timer()
+  (name, input) = (task, None) if isinstance(task, str) else task
+  # The solvers print their progress, which would end up between the results
+  printed = io.StringIO()
+  try:
+    with contextlib.redirect_stdout(printed):
+      if input is None:
+        input = parse_input(name)
+      if templates is None:
+        templates = TemplateCache(threads=threads)
+      schedule = formula_2.solve_anytime(input, formulation, backend, time_limit, relative_gap,
+                                         templates=templates)
+  except (SystemExit, Exception) as error:
+    # fail_with prints the reason before it exits
+    lines = printed.getvalue().splitlines()
+    message = lines[-1] if isinstance(error, SystemExit) and lines else repr(error)
+    return {"instance": name, "status": "ERROR", "error": message, "elapsed": timeit.default_timer() - start}
+
+  return {"instance": name, "status": schedule.status, "total_time": schedule.total_time, "times": schedule.times,
+          "bound": schedule.bound, "gap": schedule.gap, "solve_time": schedule.elapsed,
+          "elapsed": timeit.default_timer() - start}
+
+def solve_many(tasks: Iterable[Task], formulation: str = "standard", backend: str = "scip",
+               time_limit: Optional[float] = None, relative_gap: Optional[float] = None,
+               workers: int = 1) -> Iterator[dict[str, Any]]:
+  if workers <= 1:
+    for task in tasks:
+      yield solve_one(task, formulation, backend, time_limit, relative_gap, None)
+    return
+
+  # The workers share the cores, so the solvers that use several threads (CP-SAT) get their part of them
+  threads = max(1, (os.cpu_count() or 1) // workers)
+  with ProcessPoolExecutor(workers) as pool:
+    pending: deque = deque()
+    for task in tasks:
+      pending.append(pool.submit(solve_one, task, formulation, backend, time_limit, relative_gap, threads))
+      if len(pending) >= 2 * workers:
+        yield pending.popleft().result()
+    while pending:
+      yield pending.popleft().result()
+
+# Instances from a JSON-lines stream: every line holds an object with the pictures and the blackouts as
+# [start, duration] pairs (like in an instance file) and optionally a name, or only the path of an instance file
+def read_jsonl(stream: TextIO, source: str) -> Iterator[Task]:
+  for (i, line) in enumerate(stream, 1):
+    if not line.strip():
+      continue
+    item = json.loads(line)
+    if "path" in item:
+      yield item["path"]
+    else:
+      blackouts = sorted((start, start + duration) for (start, duration) in item["blackouts"])
+      yield (item.get("name", f"{source}:{i}"), (item["pictures"], blackouts))
+
+# The instances of every source: a folder (all files in it but the .npy sidecars), a glob, an instance file, a .jsonl file or - for
+# JSON lines on stdin
+def get_tasks(sources: list[str]) -> Iterator[Task]:
+  for source in sources:
+    if source == "-":
+      yield from read_jsonl(sys.stdin, "stdin")
+    elif source.endswith(".jsonl"):
+      with open(source, "r", encoding="UTF-8") as f:
+        yield from read_jsonl(f, source)
+    elif os.path.isdir(source):
+      paths = sorted(glob.glob(os.path.join(source, "*")))
+      yield from (path for path in paths if os.path.isfile(path) and not is_sidecar(path))
+    else:
+      # A path that matches nothing is passed on as it is, and comes out as an error
+      yield from sorted(glob.glob(source)) or [source]
+
+def main(sources, formulation="standard", backend="scip", time_limit=None, relative_gap=None, workers=1,
+         output_path=None):
+  output = open(output_path, "w", encoding="UTF-8") if output_path else sys.stdout
+  start = timeit.default_timer()
+  count = 0
+  for result in solve_many(get_tasks(sources), formulation, backend, time_limit, relative_gap, workers):
+    output.write(json.dumps(result) + "\n")
+    output.flush()
+    count += 1
+  if output_path:
+    output.close()
+  print(f"Solved {count} instances in {timeit.default_timer() - start:.3f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+  parser = ArgumentParser(description="Solve many instances and write one JSON line per instance.")
+  parser.add_argument("sources", nargs="+",
+                      help="instance files, folders, globs, .jsonl files or - for JSON lines on stdin")
+  parser.add_argument("--formulation", choices=list(FORMULATIONS), default="standard")
+  parser.add_argument("--backend", choices=list(BACKENDS), default="scip")
+  parser.add_argument("--time-limit", type=float, help="seconds per instance, after which the best schedule is given")
+  parser.add_argument("--gap", type=float, help="stop once the relative gap to the bound is below this")
+  parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of solver processes")
+  parser.add_argument("--output", dest="output_path", help="file for the results instead of stdout")
+  args = parser.parse_args()
+
+  main(args.sources, args.formulation, args.backend, args.time_limit, args.gap, args.workers, args.output_path)
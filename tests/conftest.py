@@ -0,0 +1,44 @@
+import glob
+import os
+import sys
+
+import pytest
+
+# The scripts and the scheduler package live in src and import each other from there
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC)
+ROOT = os.path.dirname(SRC)
+
+from scheduler import read_instance  # noqa: E402
+
+# Instances with more pictures than this take the solvers more than a few seconds
+SMALL = 12
+
+
+# Tests on instances that take more than a few seconds are marked slow and only run with --slow
+def pytest_addoption(parser):
+    parser.addoption("--slow", action="store_true", help="also run the tests marked slow")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: takes more than a few seconds, only runs with --slow")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--slow"):
+        return
+    skip = pytest.mark.skip(reason="slow, runs with --slow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip)
+
+
+# Every instance in the experiment folders (relative to the root) as a test parameter, the ones with more than SMALL
+# pictures marked slow
+def experiment_instances():
+    found = glob.glob(os.path.join(ROOT, "experiment_instances*", "*.txt"))
+    params = []
+    for path in sorted(os.path.relpath(path, ROOT) for path in found):
+        slow = len(read_instance(os.path.join(ROOT, path))[0]) > SMALL
+        params.append(pytest.param(path, id=path, marks=[pytest.mark.slow] if slow else []))
+    return params
@@ -0,0 +1,41 @@
+from scheduler import SolutionCache, get_times
+
+# Gaps of 4 and 3 seconds before the last one
+PICTURES = [3.0, 1.0, 2.0, 2.0, 5.0]
+BLACKOUTS = [(4.0, 5.0), (8.0, 9.0)]
+KNAPS = [[1, 2], [0], [3, 4]]
+
+
+def lengths(pictures, knaps):
+    return [sorted(pictures[p] for p in knap) for knap in knaps]
+
+
+def test_get_maps_the_schedule_to_reordered_pictures():
+    cache = SolutionCache()
+    cache.put(PICTURES, BLACKOUTS, KNAPS)
+    order = [4, 2, 0, 3, 1]
+    pictures = [PICTURES[p] for p in order]
+    knaps = cache.get(pictures, list(reversed(BLACKOUTS)))
+    assert knaps is not None
+    assert sorted(p for knap in knaps for p in knap) == list(range(len(pictures)))
+    assert lengths(pictures, knaps) == lengths(PICTURES, KNAPS)
+    assert get_times(pictures, BLACKOUTS, knaps)[0] == get_times(PICTURES, BLACKOUTS, KNAPS)[0]
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_get_misses_another_instance():
+    cache = SolutionCache()
+    cache.put(PICTURES, BLACKOUTS, KNAPS)
+    assert cache.get(PICTURES[:-1] + [4.0], BLACKOUTS) is None
+    assert cache.get(PICTURES, [(4.0, 5.0), (7.0, 9.0)]) is None
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_schedules_outlive_the_cache_on_disk(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    SolutionCache(path=path).put(PICTURES, BLACKOUTS, KNAPS)
+    cache = SolutionCache(path=path)
+    knaps = cache.get(list(reversed(PICTURES)), BLACKOUTS)
+    assert knaps is not None
+    assert lengths(list(reversed(PICTURES)), knaps) == lengths(PICTURES, KNAPS)
+    assert cache.disk_hits == 1
@@ -0,0 +1,35 @@
+import contextlib
+import io
+import os
+
+import pytest
+
+import dp_solver
+import formula_2
+from conftest import ROOT, experiment_instances
+from scheduler import parse_input, validate
+
+
+# Both print the schedule they found
+def quietly(solve, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return solve(*args, **kwargs)
+
+
+# The dynamic program has to reach the optimal total time of the MIP on every experiment instance
+@pytest.mark.parametrize("instance", experiment_instances())
+def test_dp_matches_formula_2(instance):
+    input = parse_input(os.path.join(ROOT, instance))
+    (total_time, times, *_) = quietly(dp_solver.solve, input)
+    assert validate(*input, times).ok
+    assert total_time == pytest.approx(quietly(formula_2.solve, input, "compact")[0], abs=1e-6)
+
+
+def test_solve_anytime_stops_at_the_time_limit():
+    # The search on 10_4 takes minutes
+    input = parse_input(os.path.join(ROOT, "experiment_instances", "10_4.txt"))
+    schedule = quietly(dp_solver.solve_anytime, input, time_limit=0.5)
+    assert schedule.status == "FEASIBLE"
+    assert schedule.elapsed < 5
+    assert validate(*input, schedule.times).ok
+    assert 0 < schedule.bound <= schedule.total_time
@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+from compare_formulations import RELATIVE_GAP, agree, run
+from conftest import ROOT, experiment_instances
+from scheduler import read_instance
+
+
+# The compact formulation has to reach the same makespan as the standard one on every experiment instance. Both
+# models are solved as they are, without the heuristic or the presolve of formula_2. When only one of them is proven
+# within the time limit, the other cannot beat it by more than the gap.
+@pytest.mark.parametrize("instance", experiment_instances())
+def test_compact_matches_standard(instance):
+    pictures, blackouts, _, _ = read_instance(os.path.join(ROOT, instance))
+    (standard, compact) = (run(pictures, blackouts, form, "scip", RELATIVE_GAP)[:2] for form in ("standard", "compact"))
+    proven = [makespan for (status, makespan) in (standard, compact) if status == "OPTIMAL"]
+    if not proven:
+        pytest.skip("neither formulation is proven within the time limit")
+    for (status, makespan) in (standard, compact):
+        assert status in ("OPTIMAL", "FEASIBLE")
+        assert makespan >= min(proven) * (1 - RELATIVE_GAP) - 1e-9, (standard, compact)
+    if len(proven) == 2:
+        assert agree(*proven), (standard, compact)
+
+
+def test_agree_uses_the_relative_gap():
+    # Two makespans of about 100 that are each within SCIP's default gap of the optimum
+    assert agree(100.0, 100.0 + 0.5 * RELATIVE_GAP * 100)
+    assert not agree(100.0, 100.0 + 2 * RELATIVE_GAP * 100)
@@ -0,0 +1,51 @@
+import numpy
+import pytest
+
+from scheduler import InstanceArrays, format_arrays, generate, parse_arrays, read_arrays, write_arrays
+from scheduler.instance import flatten, unflatten
+
+
+# The text holds the start and the length of a blackout, so its end can be off by a rounding error
+def assert_same(arrays, expected):
+    for name in ("pictures", "blackouts", "positions"):
+        numpy.testing.assert_allclose(getattr(arrays, name), getattr(expected, name), rtol=0, atol=1e-9)
+    numpy.testing.assert_equal(arrays.expected, expected.expected)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_format_and_parse_are_a_round_trip(seed):
+    # Two decimals, written with three
+    arrays = generate(40, 12, seed=seed)
+    assert_same(parse_arrays(format_arrays(arrays).encode()), arrays)
+
+
+def test_an_instance_without_optimum_has_no_positions():
+    arrays = generate(10, 3, seed=0)._replace(expected=numpy.nan, positions=numpy.empty(0))
+    assert_same(parse_arrays(format_arrays(arrays).encode()), arrays)
+
+
+def test_a_decimal_comma_leaves_out_the_optimum():
+    text = "2\n1.5\n2\n1\n3.0, 1.0\n2,5\n0\n4\n"
+    arrays = parse_arrays(text.encode())
+    assert numpy.isnan(arrays.expected)
+    assert len(arrays.positions) == 0
+    numpy.testing.assert_array_equal(arrays.blackouts, [[3.0, 4.0]])
+
+
+def test_flatten_and_unflatten_are_a_round_trip():
+    arrays = generate(25, 7, seed=1)
+    flat = unflatten(flatten(arrays))
+    for (array, expected) in zip(flat, arrays):
+        numpy.testing.assert_array_equal(array, expected)
+    empty = InstanceArrays(numpy.empty(0), numpy.empty((0, 2)), numpy.nan, numpy.empty(0))
+    assert_same(unflatten(flatten(empty)), empty)
+
+
+def test_the_sidecar_holds_the_parsed_arrays(tmp_path):
+    path = str(tmp_path / "instance.txt")
+    arrays = generate(20, 5, seed=2)
+    write_arrays(path, arrays)
+    assert_same(read_arrays(path, sidecar=True), arrays)
+    assert (tmp_path / "instance.txt.npy").exists()
+    assert_same(read_arrays(path, sidecar=True), arrays)
+    assert_same(read_arrays(path + ".npy"), arrays)
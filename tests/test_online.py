@@ -0,0 +1,41 @@
+import numpy
+
+from scheduler import GapIndex
+
+FREE = [1.0, 4.0, 2.0, 5.0, 3.0]
+
+
+def test_first_fit_finds_the_first_gap_with_room():
+    index = GapIndex(FREE)
+    assert index.first_fit(0.5) == 0
+    assert index.first_fit(3.0) == 1
+    assert index.first_fit(4.5) == 3
+    assert index.first_fit(6.0) == -1
+    assert index.first_fit(3.0, first=2) == 3
+    assert index.first_fit(1.0, first=len(FREE)) == -1
+
+
+def test_update_changes_the_free_time_of_a_gap():
+    index = GapIndex(FREE)
+    index.update(1, 0.5)
+    assert index.first_fit(3.0) == 3
+    index.update(3, 2.0)
+    assert index.first_fit(3.0) == 4
+    index.update(0, 10.0)
+    assert index.first_fit(3.0) == 0
+
+
+def test_first_fit_matches_a_linear_scan():
+    # 37 gaps, so the tree has leaves without a gap
+    rng = numpy.random.default_rng(0)
+    free = rng.uniform(0, 10, 37).tolist()
+    index = GapIndex(free)
+    for _ in range(500):
+        if rng.random() < 0.3:
+            k = int(rng.integers(len(free)))
+            free[k] = float(rng.uniform(0, 10))
+            index.update(k, free[k])
+        size = float(rng.uniform(0, 11))
+        first = int(rng.integers(len(free) + 3))
+        expected = next((k for k in range(first, len(free)) if free[k] >= size), -1)
+        assert index.first_fit(size, first) == expected
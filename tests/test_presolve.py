@@ -0,0 +1,59 @@
+import numpy
+import pytest
+
+from scheduler import (
+    expand_knaps, generate, get_knapsacks, get_starts, get_times, greedy_schedule, no_presolve, presolve_instance,
+    reduce_knaps,
+)
+
+
+def instance(distribution, seed):
+    arrays = generate(30, 8, distribution=distribution, seed=seed)
+    return arrays.pictures.tolist(), [tuple(blackout) for blackout in arrays.blackouts.tolist()]
+
+
+# The values of the assignment variables (x comes first) that put the groups in the kept knapsacks like reduced
+def values(presolved, reduced):
+    x = numpy.zeros((len(presolved.sizes), len(presolved.kept)))
+    for (j, groups) in enumerate(reduced):
+        for g in groups:
+            x[g, j] += 1
+    return x.ravel()
+
+
+def lengths(pictures, knaps):
+    return [sorted(pictures[p] for p in knap) for knap in knaps]
+
+
+@pytest.mark.parametrize("distribution", ["uniform", "few"])
+@pytest.mark.parametrize("seed", range(3))
+def test_expand_knaps_undoes_reduce_knaps(distribution, seed):
+    pictures, blackouts = instance(distribution, seed)
+    knapsacks = get_knapsacks(pictures, blackouts)
+    greedy = greedy_schedule(pictures, knapsacks)
+    presolved = presolve_instance(pictures, knapsacks, get_starts(blackouts), greedy)
+    assert sum(presolved.counts) == len(pictures)
+
+    knaps = expand_knaps(presolved, values(presolved, reduce_knaps(presolved, greedy)))
+    assert sorted(p for knap in knaps for p in knap) == list(range(len(pictures)))
+    assert lengths(pictures, knaps) == lengths(pictures, greedy)
+    assert get_times(pictures, blackouts, knaps)[0] == pytest.approx(get_times(pictures, blackouts, greedy)[0])
+
+
+def test_identical_pictures_are_one_group():
+    pictures, blackouts = instance("few", 0)
+    knapsacks = get_knapsacks(pictures, blackouts)
+    presolved = presolve_instance(pictures, knapsacks, get_starts(blackouts), greedy_schedule(pictures, knapsacks))
+    assert len(presolved.sizes) == len(set(pictures)) < len(pictures)
+    assert all(pictures[p] == size for (size, group) in zip(presolved.sizes, presolved.groups) for p in group)
+
+
+def test_no_presolve_keeps_the_instance():
+    pictures, blackouts = instance("uniform", 0)
+    knapsacks = get_knapsacks(pictures, blackouts)
+    greedy = greedy_schedule(pictures, knapsacks)
+    presolved = no_presolve(pictures, knapsacks, get_starts(blackouts))
+    assert presolved.kept == list(range(len(knapsacks)))
+    # Every picture is a group of its own, so the same pictures come back
+    knaps = expand_knaps(presolved, values(presolved, reduce_knaps(presolved, greedy)))
+    assert [sorted(knap) for knap in knaps] == [sorted(knap) for knap in greedy]
@@ -0,0 +1,37 @@
+import pytest
+
+from scheduler import Violation, validate
+
+PICTURES = [2.0, 3.0, 1.0]
+BLACKOUTS = [(4.0, 6.0)]
+
+
+def test_a_feasible_schedule_is_ok():
+    report = validate(PICTURES, BLACKOUTS, [0.0, 6.0, 2.0])
+    assert report.ok
+    assert report.total_time == 9.0
+
+
+@pytest.mark.parametrize("times, violation", [
+    ([0.0, 1.0, 6.0], Violation("picture", 1, 0, 1.0)),
+    ([0.0, 6.0, 3.5], Violation("blackout", 2, 0, 0.5)),
+    ([-1.0, 6.0, 2.0], Violation("negative", 0, -1, 1.0)),
+    ([0.0, 6.0], Violation("count", -1, -1, -1.0)),
+])
+def test_a_broken_schedule_is_reported(times, violation):
+    report = validate(PICTURES, BLACKOUTS, times)
+    assert not report.ok
+    assert report.violations == [violation]
+    assert violation.kind in report.describe()
+
+
+def test_the_total_time_has_to_be_the_expected_one():
+    report = validate(PICTURES, BLACKOUTS, [0.0, 6.0, 2.0], expected=8.0)
+    assert report.violations == [Violation("total time", -1, -1, 1.0)]
+
+
+def test_ticks_are_compared_exactly():
+    # Within the tolerance in seconds, one tick into the blackout in ticks
+    assert validate(PICTURES, BLACKOUTS, [0.0, 6.0, 3.0000001]).ok
+    report = validate([20, 30, 10], [(40, 60)], [0, 60, 31])
+    assert report.violations == [Violation("blackout", 2, 0, 1)]